@@ -0,0 +1,141 @@
+import gzip
+import json
+import hashlib
+from supabase_clients import get_client, iter_pages, PAGE_SIZE
+from point_service import current_semester
+from member_cache import get_members_bulk
+
+ARCHIVE_BUCKET = "archives"
+
+
+def _semester_rows(sb, semester):
+    """Page through one semester of points_tracking, each row carrying its member's netid."""
+    rows = []
+    start = 0
+    while True:
+        page = (sb.table("points_tracking").select("*, members(netid)").eq("semester", semester)
+                .order("id").range(start, start + PAGE_SIZE - 1).execute().data or [])
+        for row in page:
+            row["netid"] = (row.pop("members", None) or {}).get("netid")
+        rows.extend(page)
+        if len(page) < PAGE_SIZE:
+            return rows
+        start += PAGE_SIZE
+
+
+def _encode_archive(rows):
+    # mtime=0 keeps the bytes (and so the content hash) stable for the same rows
+    body = "".join(json.dumps(row, sort_keys=True, default=str) + "\n" for row in rows).encode()
+    return gzip.compress(body, mtime=0)
+
+
+def _decode_archive(data):
+    return [json.loads(line) for line in gzip.decompress(data).splitlines() if line.strip()]
+
+
+def _points_sum(rows):
+    return sum(row.get("points") or 0 for row in rows)
+
+
+def list_archived_semesters(env: str = "production"):
+    """Return the semesters that have been closed, newest archive first."""
+    sb = get_client(env)
+    latest = {}
+    for page in iter_pages(sb, "points_history", "semester, archived_at", order="semester,member_id"):
+        for row in page:
+            latest[row["semester"]] = max(latest.get(row["semester"], ""), row.get("archived_at") or "")
+    return sorted(latest, key=latest.get, reverse=True)
+
+
+def close_semester(semester: str, env: str = "production"):
+    """
+    Archive a finished semester's raw points and compact it to per-member totals.
+
+    The semester's points_tracking rows are written to a gzipped ndjson object
+    in the archives bucket (named by content hash), downloaded again and
+    checked, and only then swapped for points_history summaries by the
+    close_semester database function, which refuses if the table no longer
+    matches the archive.  Leaderboard totals are unchanged.
+    """
+    results = {"semester": semester, "archive": None, "rows": 0, "members": 0, "errors": []}
+
+    try:
+        if semester == current_semester():
+            raise Exception(f"{semester} is the current semester and can't be closed yet.")
+
+        sb = get_client(env)
+        rows = _semester_rows(sb, semester)
+        if not rows:
+            raise Exception(f"No points found for {semester}.")
+
+        data = _encode_archive(rows)
+        digest = hashlib.sha256(data).hexdigest()
+        key = f"points/{semester}-{digest[:16]}.ndjson.gz"
+        sb.storage.from_(ARCHIVE_BUCKET).upload(key, data, {"content-type": "application/gzip", "x-upsert": "true"})
+
+        # Integrity check: what storage holds must be exactly what we read
+        stored = sb.storage.from_(ARCHIVE_BUCKET).download(key)
+        if hashlib.sha256(stored).hexdigest() != digest:
+            raise Exception(f"Archive {key} did not read back intact; nothing was removed.")
+        check = _decode_archive(stored)
+        if len(check) != len(rows) or _points_sum(check) != _points_sum(rows):
+            raise Exception(f"Archive {key} row count or points sum mismatch; nothing was removed.")
+
+        results["rows"] = sb.rpc("close_semester", {
+            "p_semester": semester, "p_expected_rows": len(rows),
+            "p_expected_total": _points_sum(rows), "p_archive_key": key}).execute().data or 0
+        results["archive"] = key
+        results["members"] = len({row["member_id"] for row in rows if row.get("member_id")})
+        del sb
+        print(f"Closed {semester} in {env}: {results['rows']} rows archived to {key}")
+
+    except Exception as e:
+        results["errors"].append(f"Close semester error: {str(e)}")
+
+    return results
+
+
+def reopen_semester(semester: str, env: str = "production"):
+    """
+    Undo close_semester: restore the raw rows from the archive and drop the summaries.
+
+    Rows are matched to members by netid, so an archive still restores after a
+    sync has reassigned member ids.  Rows whose member no longer exists are
+    skipped and reported (their summaries went with the member row, so totals
+    stay consistent).  The archive object is kept.
+    """
+    results = {"semester": semester, "rows": 0, "errors": []}
+
+    try:
+        sb = get_client(env)
+        keys = {row["archive_key"] for row in
+                sb.table("points_history").select("archive_key").eq("semester", semester).execute().data or []}
+        if not keys:
+            raise Exception(f"{semester} is not archived.")
+        if len(keys) > 1:
+            raise Exception(f"{semester} has more than one archive ({', '.join(sorted(keys))}); fix points_history first.")
+        key = keys.pop()
+
+        data = sb.storage.from_(ARCHIVE_BUCKET).download(key)
+        if not key.split("-")[-1].startswith(hashlib.sha256(data).hexdigest()[:16]):
+            raise Exception(f"Archive {key} does not match its checksum; not restoring.")
+        rows = _decode_archive(data)
+
+        members = get_members_bulk([row.get("netid") for row in rows], env, sb)
+        restored = []
+        for row in rows:
+            member = members.get((row.get("netid") or "").lower())
+            if not member:
+                results["errors"].append(f"Points row {row.get('id')}: no member with netid {row.get('netid')}")
+                continue
+            restored.append({"member_id": member["id"], "points": row.get("points"),
+                             "semester": row.get("semester"), "reason": row.get("reason")})
+
+        results["rows"] = sb.rpc("reopen_semester", {"p_semester": semester, "p_rows": restored}).execute().data or 0
+        del sb
+        print(f"Reopened {semester} in {env}: {results['rows']} rows restored from {key}")
+
+    except Exception as e:
+        results["errors"].append(f"Reopen semester error: {str(e)}")
+
+    return results
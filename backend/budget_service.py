@@ -0,0 +1,180 @@
+import os
+import sys
+import inspect
+import functools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+_REPO_DIR = str(Path(__file__).parent.parent)
+# Frames in these files are plumbing, not the call site worth reporting
+_PLUMBING = {"budget_service.py", "metrics_service.py", "trace_service.py", "supabase_clients.py", "member_cache.py"}
+
+RECENT_OVERRUNS = 50  # overrun reports kept for /metrics
+
+# Budgets open in this context; in_current_trace carries them into worker
+# threads, so calls from unrelated threads (pollers, flushers) never count
+_open = contextvars.ContextVar("round_trip_budgets", default=())
+_overrun_lock = threading.Lock()
+_overruns = deque(maxlen=RECENT_OVERRUNS)
+BUDGETS = {}  # operation name -> declared limits, for reference
+
+
+class RoundTripBudgetExceeded(Exception):
+    pass
+
+
+def budgets_enabled():
+    """ROUND_TRIP_BUDGETS=on checks declared budgets and reports overruns; off (default) skips the counting."""
+    return os.getenv("ROUND_TRIP_BUDGETS", "off").lower() in ("on", "1", "true")
+
+
+def _call_site():
+    """'file:line in fn <- caller' for the innermost app frame that made the call."""
+    frame = sys._getframe(2)
+    while frame is not None:
+        path = frame.f_code.co_filename
+        if path.startswith(_REPO_DIR) and os.path.basename(path) not in _PLUMBING:
+            caller = frame.f_back
+            site = f"{os.path.basename(path)}:{frame.f_lineno} in {frame.f_code.co_name}"
+            if caller is not None and caller.f_code.co_filename.startswith(_REPO_DIR):
+                site += f" <- {caller.f_code.co_name}"
+            return site
+        frame = frame.f_back
+    return "outside the app"
+
+
+class _Counter:
+    def __init__(self, label, limits, args=None):
+        self.label = label
+        self.raw_limits = limits
+        self.args = dict(args or {})
+        self.counts = {}  # sizes recorded by the operation through budget_counts
+        self.lock = threading.Lock()  # worker threads of one operation share the counter
+        self.calls = {}  # upstream -> {call site: count}
+
+    @property
+    def limits(self):
+        """Limits with the callable ones resolved against the call's arguments and recorded counts."""
+        known = {**self.args, **self.counts}
+        return {key: (limit(known) if callable(limit) else limit) for key, limit in self.raw_limits.items()}
+
+    def add(self, upstream, site):
+        with self.lock:
+            sites = self.calls.setdefault(upstream, {})
+            sites[site] = sites.get(site, 0) + 1
+
+    def used(self, key):
+        """Calls charged to a limit key: an exact upstream (google_forms) or a prefix group (supabase, google)."""
+        return sum(sum(sites.values()) for upstream, sites in self.calls.items()
+                   if upstream == key or upstream.startswith(f"{key}_"))
+
+    def exceeded(self):
+        return [(key, self.used(key), limit) for key, limit in self.limits.items() if self.used(key) > limit]
+
+    def report(self):
+        lines = []
+        for key, used, limit in self.exceeded():
+            lines.append(f"{self.label} made {used} {key} calls (budget {limit}):")
+            sites = {}
+            for upstream, counts in self.calls.items():
+                if upstream == key or upstream.startswith(f"{key}_"):
+                    for site, n in counts.items():
+                        sites[(upstream, site)] = sites.get((upstream, site), 0) + n
+            for (upstream, site), n in sorted(sites.items(), key=lambda kv: -kv[1]):
+                lines.append(f"  {n:>5}x {upstream:<20} {site}")
+        return "\n".join(lines)
+
+
+def note_call(upstream):
+    """Charge one outbound call to the budgets open in this context (called by the HTTP instrumentation)."""
+    counters = _open.get()
+    if not counters:
+        return
+    site = _call_site()
+    for counter in counters:
+        counter.add(upstream, site)
+
+
+def budget_counts(**counts):
+    """
+    Record sizes only known once an operation is running (responses fetched, rows loaded).
+
+    They go to the innermost open budget and are passed to its callable
+    limits next to the call's arguments when the budget is checked.
+    Outside a budget this does nothing.
+    """
+    counters = _open.get()
+    if not counters:
+        return
+    with counters[-1].lock:
+        counters[-1].counts.update(counts)
+
+
+def recent_overruns():
+    """The latest budget overruns reported by declared budgets, newest first."""
+    with _overrun_lock:
+        return list(_overruns)
+
+
+@contextmanager
+def round_trip_budget(label, on_exceed="raise", args=None, **limits):
+    """
+    Count outbound calls per upstream made while the block runs and check them against limits.
+
+    Limits are keyed by upstream name (supabase_postgrest, google_forms...) or
+    group prefix (supabase, google, slack). Only calls from this context count,
+    including worker threads started through trace_service.in_current_trace.
+    When a limit is exceeded the report lists each offending call site;
+    on_exceed picks between raising RoundTripBudgetExceeded once the block
+    is done (for benchmarks and test harnesses) and reporting it ("report").
+    A limit may be a function of args plus the counts the block records with
+    budget_counts; it is resolved when the block is done.
+    """
+    from metrics_service import install_http_instrumentation
+    install_http_instrumentation()
+    counter = _Counter(label, limits, args)
+    token = _open.set(_open.get() + (counter,))
+    try:
+        yield counter
+    finally:
+        _open.reset(token)
+    if counter.exceeded():
+        report = counter.report()
+        if on_exceed == "raise":
+            raise RoundTripBudgetExceeded(report)
+        with _overrun_lock:
+            _overruns.appendleft({"operation": label, "at": datetime.now().isoformat(), "report": report})
+        print(f"Warning: round-trip budget exceeded\n{report}")
+
+
+def call_budget(**limits):
+    """
+    Declare the most round trips per upstream a function may make.
+
+    A limit is a number or a function of the call's arguments (a dict, with
+    defaults filled in) for operations that legitimately scale by chunks;
+    the dict also holds any budget_counts the function records, for sizes
+    only known once it has fetched its input.
+    Checked only when ROUND_TRIP_BUDGETS=on.  An overrun is reported, never
+    raised: by then the function's writes have committed, and failing the
+    call would invite a retry that writes them again.
+    """
+    def decorate(fn):
+        label = f"{fn.__module__}.{fn.__name__}"
+        signature = inspect.signature(fn)
+        BUDGETS[label] = limits
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not budgets_enabled():
+                return fn(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            with round_trip_budget(label, on_exceed="report", args=bound.arguments, **limits):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
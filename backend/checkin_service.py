@@ -0,0 +1,265 @@
+import re
+import time
+import secrets
+import threading
+from datetime import datetime, timezone
+from supabase_clients import get_client, iter_pages
+from point_service import add_points_batch, _NETID_RE
+from dead_letter_service import record_failures
+
+FLUSH_INTERVAL = 2  # seconds; check-ins reach points_tracking within about this long
+FLUSH_SIZE = 100  # flush early once this many check-ins are waiting
+REFRESH_INTERVAL = 10 * 60  # seconds between full reloads of the roster index
+MAX_PREFIX = 12  # longest token prefix indexed
+MIN_TRIGRAM_SCORE = 0.4
+
+_NON_WORD = re.compile(r"[^a-z0-9 ]+")
+
+
+def _normalize(text):
+    return " ".join(_NON_WORD.sub(" ", (text or "").lower()).split())
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _RosterIndex:
+    """In-memory member search for one environment.
+
+    Every prefix of every name token (and of the netid) maps to the netids
+    that have it, so a prefix search is one dict lookup per query token and a
+    set intersection.  Trigrams back it up for misspellings.
+    """
+
+    def __init__(self):
+        self.names = {}  # netid -> display name
+        self.prefixes = {}  # prefix -> set(netid)
+        self.trigrams = {}  # trigram -> set(netid)
+        self.loaded_at = 0.0
+
+    def add(self, netid, name):
+        netid = netid.lower()
+        if self.names.get(netid) == name:
+            return
+        self.names[netid] = name
+        normalized = _normalize(name)
+        for token in normalized.split() + [netid]:
+            for i in range(1, min(len(token), MAX_PREFIX) + 1):
+                self.prefixes.setdefault(token[:i], set()).add(netid)
+        for gram in _trigrams(normalized):
+            self.trigrams.setdefault(gram, set()).add(netid)
+
+    def search(self, query, limit):
+        tokens = _normalize(query).split()
+        if not tokens:
+            return []
+        matches = None
+        for token in tokens:
+            hits = self.prefixes.get(token[:MAX_PREFIX], set())
+            matches = hits if matches is None else matches & hits
+        if matches:
+            # A longer prefix can still miss past MAX_PREFIX; check the full tokens
+            full = [n for n in matches if all(any(part.startswith(t) for part in
+                                                  _normalize(self.names[n]).split() + [n]) for t in tokens)]
+            if full:
+                return sorted(full, key=lambda n: self.names[n].lower())[:limit]
+
+        # No name starts with every query word: rank by shared trigrams instead
+        grams = _trigrams(" ".join(tokens))
+        scores = {}
+        for gram in grams:
+            for netid in self.trigrams.get(gram, ()):
+                scores[netid] = scores.get(netid, 0) + 1
+        ranked = []
+        for netid, shared in scores.items():
+            # Share of the query's trigrams found in the name, so long names aren't penalized
+            score = shared / len(grams)
+            if score >= MIN_TRIGRAM_SCORE:
+                ranked.append((-score, self.names[netid].lower(), netid))
+        return [netid for _, _, netid in sorted(ranked)[:limit]]
+
+
+_index_lock = threading.Lock()
+_indexes = {}  # env -> _RosterIndex
+
+
+def _load_index(env):
+    index = _RosterIndex()
+    sb = get_client(env)
+    for page in iter_pages(sb, "members", "netid, first_name, last_name"):
+        for m in page:
+            if m.get("netid"):
+                index.add(m["netid"], " ".join(p for p in (m.get("first_name"), m.get("last_name")) if p))
+    del sb
+    index.loaded_at = time.monotonic()
+    return index
+
+
+_refreshing = set()
+
+
+def _refresh(env):
+    try:
+        fresh = _load_index(env)
+        with _index_lock:
+            _indexes[env] = fresh
+    except Exception as e:
+        print(f"Warning: roster index refresh failed for {env}: {str(e)}")
+    finally:
+        with _index_lock:
+            _refreshing.discard(env)
+
+
+def _index_for(env):
+    """
+    The env's index, loaded on first use.
+
+    Every REFRESH_INTERVAL it is reloaded in full (one paged read) in the
+    background; in between, only people who check in are added to it.
+    """
+    with _index_lock:
+        index = _indexes.get(env)
+        stale = index is not None and time.monotonic() - index.loaded_at > REFRESH_INTERVAL
+        if stale and env not in _refreshing:
+            _refreshing.add(env)
+            threading.Thread(target=_refresh, args=(env,), name=f"roster-index-{env}", daemon=True).start()
+    if index is None:
+        index = _load_index(env)
+        with _index_lock:
+            index = _indexes.setdefault(env, index)
+    return index
+
+
+def search_members(query: str, env: str = "production", limit: int = 8):
+    """Return up to `limit` [{netid, name}] whose name or netid starts with the query words."""
+    index = _index_for(env)
+    with _index_lock:
+        return [{"netid": n, "name": index.names[n]} for n in index.search(query, limit)]
+
+
+# ── Kiosk sessions and write-behind check-ins ────────────────────────────
+
+_lock = threading.Lock()
+_kiosks = {}  # token -> kiosk state
+_pending = []  # check-in rows waiting to be written
+_wake = threading.Event()
+_flusher = None
+
+
+def start_kiosk(title: str, points: int, env: str = "production"):
+    """Open a check-in kiosk for an event. Returns its state, including the token tablets use."""
+    token = secrets.token_urlsafe(16)
+    kiosk = {
+        "token": token, "title": title, "env": env, "points": int(points),
+        "reason": f"Event Attendance - {title}", "started_at": datetime.now(timezone.utc).isoformat(),
+        "checked_in": set(), "open": True,
+    }
+    with _lock:
+        _kiosks[token] = kiosk
+    _index_for(env)  # warm before the first tablet searches
+    _ensure_flusher()
+    return public_kiosk(kiosk)
+
+
+def close_kiosk(token: str):
+    """Stop accepting check-ins and write out whatever is buffered."""
+    with _lock:
+        kiosk = _kiosks.get(token)
+        if not kiosk:
+            return False
+        kiosk["open"] = False
+    flush_checkins()
+    return True
+
+
+def get_kiosk(token: str):
+    with _lock:
+        kiosk = _kiosks.get(token)
+    return kiosk if kiosk and kiosk["open"] else None
+
+
+def public_kiosk(kiosk):
+    return {k: (len(v) if k == "checked_in" else v) for k, v in kiosk.items()}
+
+
+def list_kiosks(env: str = None):
+    with _lock:
+        return [public_kiosk(k) for k in _kiosks.values() if env is None or k["env"] == env]
+
+
+def check_in(token: str, netid: str, name: str = None):
+    """
+    Record one attendee at a kiosk.
+
+    Answers from memory (no database round trip) and queues the award; the
+    flusher writes queued check-ins in batches.  Returns {status, netid, name}
+    where status is checked_in, already_checked_in or invalid.
+    """
+    kiosk = get_kiosk(token)
+    if not kiosk:
+        raise Exception("This kiosk is closed.")
+    netid = (netid or "").strip().lower()
+    if not _NETID_RE.match(netid):
+        return {"status": "invalid", "netid": netid, "name": None}
+
+    env = kiosk["env"]
+    index = _index_for(env)
+    with _index_lock:
+        known = index.names.get(netid)
+    if known is None:
+        # New since the index loaded (or brand new); index it so the next search finds it
+        with _index_lock:
+            index.add(netid, name or "")
+    display = known or name or netid
+
+    with _lock:
+        if netid in kiosk["checked_in"]:
+            return {"status": "already_checked_in", "netid": netid, "name": display}
+        kiosk["checked_in"].add(netid)
+        _pending.append({"line": len(kiosk["checked_in"]), "netid": netid, "name": name or known,
+                         "points": kiosk["points"], "reason": kiosk["reason"], "error": None,
+                         "_env": env, "_token": token})
+        if len(_pending) >= FLUSH_SIZE:
+            _wake.set()
+    return {"status": "checked_in", "netid": netid, "name": display}
+
+
+def flush_checkins():
+    """Write every buffered check-in now: one add_points_batch call per environment."""
+    with _lock:
+        batch = list(_pending)
+        _pending.clear()
+    by_env = {}
+    for row in batch:
+        by_env.setdefault(row.pop("_env"), []).append(row)
+
+    for env, rows in by_env.items():
+        try:
+            results = add_points_batch(rows, env=env)
+        except Exception as e:
+            results = [{**row, "status": "failed", "error": str(e)} for row in rows]
+        record_failures(env, [("points_row", row.pop("_token"), row["netid"], {
+            "netid": row["netid"], "name": row.get("name"), "points": row["points"],
+            "reason": row["reason"]}, row.get("error")) for row in results if row.get("status") == "failed"])
+    return len(batch)
+
+
+def _ensure_flusher():
+    global _flusher
+    with _lock:
+        if _flusher is not None:
+            return
+        _flusher = threading.Thread(target=_flush_loop, name="checkin-flusher", daemon=True)
+    _flusher.start()
+
+
+def _flush_loop():
+    while True:
+        _wake.wait(FLUSH_INTERVAL)
+        _wake.clear()
+        try:
+            flush_checkins()
+        except Exception as e:
+            print(f"Warning: check-in flush failed: {str(e)}")
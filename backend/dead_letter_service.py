@@ -0,0 +1,94 @@
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime
+from pathlib import Path
+
+DEAD_LETTER_DIR = Path(__file__).parent.parent / 'dead_letters'
+
+_lock = threading.Lock()
+
+
+def failure_id(kind, source, key):
+    """Stable id for one item, so repeated failures (and later successes) find the same entry."""
+    return hashlib.sha1(f"{kind}:{source}:{key}".encode()).hexdigest()[:12]
+
+
+def _path(env):
+    return DEAD_LETTER_DIR / f"{env}.json"
+
+
+def _load(env):
+    try:
+        return json.loads(_path(env).read_text())
+    except FileNotFoundError:
+        return {}
+
+
+def _save(env, entries):
+    DEAD_LETTER_DIR.mkdir(exist_ok=True)
+    tmp = _path(env).with_suffix(".tmp")
+    tmp.write_text(json.dumps(entries, indent=2, default=str))
+    os.replace(tmp, _path(env))
+
+
+def record_failure(env, kind, source, key, payload, error):
+    """
+    Persist a failed item with everything needed to replay it.
+
+    kind says how to replay it (see point_service.retry_failed_responses),
+    source is the form or sheet id, key identifies the item within it and
+    payload holds the raw submission.  Failing again bumps the attempt count.
+    """
+    return record_failures(env, [(kind, source, key, payload, error)])[0]
+
+
+def record_failures(env, failures):
+    """
+    Persist many failed items with a single rewrite of the store.
+
+    failures holds (kind, source, key, payload, error) tuples as taken by
+    record_failure; imports collect them and call this once at the end, as
+    they do with resolve_failures.  Returns the entry ids.
+    """
+    if not failures:
+        return []
+    now = datetime.now().isoformat()
+    ids = []
+    with _lock:
+        entries = _load(env)
+        for kind, source, key, payload, error in failures:
+            entry_id = failure_id(kind, source, key)
+            entry = entries.get(entry_id) or {"id": entry_id, "kind": kind, "source": source, "key": key,
+                                              "attempts": 0, "first_failed_at": now}
+            entry.update({"payload": payload, "error": str(error), "attempts": entry["attempts"] + 1,
+                          "last_failed_at": now})
+            entries[entry_id] = entry
+            ids.append(entry_id)
+        _save(env, entries)
+    return ids
+
+
+def list_failures(env, kind=None):
+    """Return the pending failures for env, oldest first."""
+    with _lock:
+        entries = list(_load(env).values())
+    if kind:
+        entries = [e for e in entries if e["kind"] == kind]
+    return sorted(entries, key=lambda e: e["first_failed_at"])
+
+
+def resolve_failures(env, entry_ids):
+    """Drop entries that have since gone through. Returns how many were removed."""
+    entry_ids = set(entry_ids)
+    if not entry_ids:
+        return 0
+    with _lock:
+        entries = _load(env)
+        removed = [i for i in entry_ids if i in entries]
+        if removed:
+            for i in removed:
+                del entries[i]
+            _save(env, entries)
+    return len(removed)
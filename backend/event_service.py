@@ -0,0 +1,197 @@
+import re
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+import pytz
+from supabase_clients import get_client
+from point_service import semester_for, _read_first_sheet, ingest_flyer
+from trace_service import traced, in_current_trace
+
+EVENT_INSERT_CHUNK = 500
+FLYER_WORKERS = 4
+# Accepted date formats for sheet cells, tried in order
+SHEET_DATE_FORMATS = ["%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%B %d %Y", "%B %d, %Y", "%b %d %Y", "%b %d, %Y"]
+
+
+def _parse_sheet_date(value):
+    value = " ".join(value.split())
+    for fmt in SHEET_DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt).date()
+        except ValueError:
+            continue
+    raise ValueError(f"unrecognized date '{value}'")
+
+
+def _parse_ics_date(value):
+    """Parse an ICS DTSTART value (20260915, 20260915T180000 or ...Z) to a date."""
+    match = re.match(r'^(\d{8})', value.strip())
+    if not match:
+        raise ValueError(f"unrecognized DTSTART '{value}'")
+    return datetime.strptime(match.group(1), "%Y%m%d").date()
+
+
+def _unescape_ics(text):
+    return (text.replace('\\n', '\n').replace('\\N', '\n')
+            .replace('\\,', ',').replace('\\;', ';').replace('\\\\', '\\'))
+
+
+def parse_events_ics(ics_text: str):
+    """
+    Extract candidate events from an iCalendar (.ics) export.
+
+    Returns a list of {name, description, flyer_url, insta, date_raw, parse}
+    candidates for add_events_bulk. Only SUMMARY, DESCRIPTION, DTSTART and URL
+    are read; recurring rules are ignored.
+    """
+    # Unfold continuation lines (RFC 5545 §3.1)
+    lines = []
+    for raw in ics_text.replace('\r\n', '\n').split('\n'):
+        if raw[:1] in (' ', '\t') and lines:
+            lines[-1] += raw[1:]
+        else:
+            lines.append(raw)
+
+    events = []
+    current = None
+    for line in lines:
+        if line == 'BEGIN:VEVENT':
+            current = {}
+        elif line == 'END:VEVENT' and current is not None:
+            events.append({
+                'name': _unescape_ics(current.get('SUMMARY', '')).strip(),
+                'description': _unescape_ics(current.get('DESCRIPTION', '')).strip(),
+                'flyer_url': current.get('URL'),
+                'insta': None,
+                'date_raw': current.get('DTSTART', ''),
+                'parse': _parse_ics_date,
+            })
+            current = None
+        elif current is not None and ':' in line:
+            key, value = line.split(':', 1)
+            current.setdefault(key.split(';', 1)[0].upper(), value)
+    return events
+
+
+def read_events_sheet(sheet_id: str, credentials):
+    """
+    Read candidate events from the first tab of a Google Sheet.
+
+    Expects a header row with name, date and optionally description, flyer and
+    instagram columns (matched loosely, like the eboard sheet).
+    """
+    rows = _read_first_sheet(sheet_id, credentials)
+    if len(rows) < 2:
+        raise Exception("Sheet has no data rows (only header or empty).")
+
+    header = [h.lower().strip() for h in rows[0]]
+    col = {}
+    for i, title in enumerate(header):
+        if 'date' in title:
+            col.setdefault('date', i)
+        elif 'desc' in title:
+            col.setdefault('description', i)
+        elif 'flyer' in title or 'image' in title or 'poster' in title:
+            col.setdefault('flyer_url', i)
+        elif 'insta' in title:
+            col.setdefault('insta', i)
+        elif 'name' in title or 'event' in title or 'title' in title:
+            col.setdefault('name', i)
+    if 'name' not in col or 'date' not in col:
+        raise Exception(f"Could not find name or date columns in sheet headers: {rows[0]}")
+
+    def get_cell(row, key):
+        idx = col.get(key)
+        if idx is None or idx >= len(row):
+            return None
+        return row[idx].strip() or None
+
+    return [{
+        'name': get_cell(row, 'name') or '',
+        'description': get_cell(row, 'description'),
+        'flyer_url': get_cell(row, 'flyer_url'),
+        'insta': get_cell(row, 'insta'),
+        'date_raw': get_cell(row, 'date') or '',
+        'parse': _parse_sheet_date,
+    } for row in rows[1:] if any(cell.strip() for cell in row)]
+
+
+@traced(attrs=("candidates", "env"))
+def add_events_bulk(candidates, env: str = "production", credentials=None):
+    """
+    Validate, deduplicate and insert many events at once.
+
+    Dates are parsed in a single pass (each distinct string once), events that
+    already exist with the same name and date are found with one range query,
+    and the rest go in one chunked insert. Each event's semester comes from its
+    own date rather than today's. With credentials, Drive flyer links are
+    resized into the flyers bucket in parallel before the insert.
+
+    Returns {"added": [names], "duplicates": [names], "invalid": [messages]}.
+    """
+    report = {"added": [], "duplicates": [], "invalid": []}
+
+    parsed_dates = {}
+    valid = []
+    for i, ev in enumerate(candidates, start=1):
+        raw = ev['date_raw']
+        if not ev['name']:
+            report["invalid"].append(f"row {i}: missing event name")
+            continue
+        if raw not in parsed_dates:
+            try:
+                parsed_dates[raw] = ev['parse'](raw)
+            except ValueError as e:
+                parsed_dates[raw] = e
+        day = parsed_dates[raw]
+        if isinstance(day, ValueError):
+            report["invalid"].append(f"row {i} ({ev['name']}): {str(day)}")
+            continue
+        valid.append((ev, day))
+
+    if not valid:
+        return report
+
+    sb = get_client(env)
+    first = min(day for _, day in valid)
+    last = max(day for _, day in valid)
+    existing = (sb.table("events").select("name, date")
+                .gte("date", datetime.combine(first, datetime.min.time()).replace(tzinfo=pytz.UTC).isoformat())
+                .lte("date", datetime.combine(last, datetime.max.time()).replace(tzinfo=pytz.UTC).isoformat())
+                .execute().data or [])
+    seen = {((e.get('name') or '').strip().lower(), (e.get('date') or '')[:10]) for e in existing}
+
+    to_insert = []
+    for ev, day in valid:
+        key = (ev['name'].strip().lower(), day.isoformat())
+        if key in seen:
+            report["duplicates"].append(ev['name'])
+            continue
+        seen.add(key)
+        to_insert.append({
+            'name': ev['name'],
+            'description': ev.get('description'),
+            'flyer_url': ev.get('flyer_url'),
+            'instagram_url': ev.get('insta'),
+            'date': datetime.combine(day, datetime.min.time()).replace(tzinfo=pytz.UTC).isoformat(),
+            'semester': semester_for(day),
+        })
+
+    if credentials:
+        with ThreadPoolExecutor(max_workers=FLYER_WORKERS) as pool:
+            ingest = in_current_trace(lambda e: ingest_flyer(e['flyer_url'], credentials, e['name'], env=env)
+                                      if e.get('flyer_url') else None)
+            flyers = list(pool.map(ingest, to_insert))
+        for event_data, flyer_images in zip(to_insert, flyers):
+            if flyer_images:
+                event_data['flyer_images'] = flyer_images
+
+    for i in range(0, len(to_insert), EVENT_INSERT_CHUNK):
+        chunk = to_insert[i:i + EVENT_INSERT_CHUNK]
+        try:
+            sb.table("events").insert(chunk).execute()
+            report["added"].extend(e['name'] for e in chunk)
+        except Exception as e:
+            report["invalid"].extend(f"{ev['name']}: insert failed: {str(e)}" for ev in chunk)
+
+    print(f"Bulk event import: {len(report['added'])} added, {len(report['duplicates'])} duplicates, {len(report['invalid'])} invalid")
+    return report
@@ -0,0 +1,175 @@
+import os
+import json
+import time
+import uuid
+import threading
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+from trace_service import span, keep_trace
+
+JOB_FILE = Path(__file__).parent.parent / 'jobs' / 'jobs.json'
+JOB_WORKERS = 2  # long operations that may run at once; the rest queue
+KEEP_FINISHED = 50  # finished job records kept for the dashboard
+PERSIST_EVERY = 1.0  # seconds between saves caused by progress updates alone
+
+_lock = threading.Lock()
+_jobs = {}  # id -> job record
+_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="job")
+_current = threading.local()
+_env_locks = {}  # env -> Lock held by the job that is reading or writing that environment
+_last_saved = 0.0
+
+ACTIVE = ("queued", "running")
+
+
+def _now():
+    return datetime.now().isoformat()
+
+
+def _save_locked():
+    global _last_saved
+    finished = sorted((j for j in _jobs.values() if j["status"] not in ACTIVE),
+                      key=lambda j: j["finished_at"] or "", reverse=True)
+    for job in finished[KEEP_FINISHED:]:
+        del _jobs[job["id"]]
+    JOB_FILE.parent.mkdir(exist_ok=True)
+    tmp = JOB_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(list(_jobs.values()), indent=2, default=str))
+    os.replace(tmp, JOB_FILE)
+    _last_saved = time.monotonic()
+
+
+def _load():
+    """Read job records left by a previous process; anything unfinished was cut off by the restart."""
+    try:
+        records = json.loads(JOB_FILE.read_text())
+    except (FileNotFoundError, ValueError):
+        return
+    with _lock:
+        for job in records:
+            if job["status"] in ACTIVE:
+                job["status"] = "interrupted"
+                job["message"] = "Error: The server restarted before this job finished. Run it again."
+                job["finished_at"] = job["finished_at"] or _now()
+            _jobs[job["id"]] = job
+
+
+def submit_job(kind: str, env: str, params, label: str, fn, envs=None):
+    """
+    Run fn() on the job pool and return (job, created).
+
+    envs lists every environment the job reads or writes (default: env).  A
+    job holds all of their locks while it runs, so a sync never empties an
+    environment another sync is copying from, and an import never writes
+    into one that is being replaced; the later job waits as queued.
+
+    fn returns the message to show when it finishes.  A job with the same
+    kind, env and params that is still queued or running is returned instead
+    of starting a duplicate (created is then False), so a double submit or a
+    page refresh doesn't run the same import twice.
+    """
+    dedupe_key = json.dumps([kind, env, params], sort_keys=True, default=str)
+    with _lock:
+        for job in _jobs.values():
+            if job["dedupe_key"] == dedupe_key and job["status"] in ACTIVE:
+                return dict(job), False
+        job = {
+            "id": uuid.uuid4().hex[:12], "kind": kind, "env": env, "label": label,
+            "dedupe_key": dedupe_key, "envs": sorted(set(envs or [env])), "status": "queued",
+            "progress": {"step": None, "done": 0, "total": None},
+            "message": None, "trace_id": None, "created_at": _now(), "started_at": None, "finished_at": None,
+        }
+        _jobs[job["id"]] = job
+        _save_locked()
+    _pool.submit(_run, job, fn)
+    return dict(job), True
+
+
+def _acquire_envs(job):
+    """Take the job's environment locks in a fixed order, so two jobs can't each hold one the other needs."""
+    with _lock:
+        locks = [_env_locks.setdefault(env, threading.Lock()) for env in job["envs"]]
+    held = []
+    for lock in locks:
+        if not lock.acquire(blocking=False):
+            with _lock:
+                job["progress"]["step"] = f"Waiting for another job on {', '.join(job['envs'])}"
+            lock.acquire()
+        held.append(lock)
+    return held
+
+
+def _run(job, fn):
+    held = _acquire_envs(job)
+    with _lock:
+        job["status"] = "running"
+        job["started_at"] = _now()
+        job["progress"]["step"] = None
+        _save_locked()
+    _current.job = job
+    try:
+        # Each job is its own trace; the record links to it for the timeline
+        with span(f"job.{job['kind']}", job_id=job["id"], env=job["env"], label=job["label"]) as job_span:
+            job["trace_id"] = job_span.trace_id
+            keep_trace()
+            message = fn()
+        status = "succeeded"
+    except Exception as e:
+        message = f"Error: {str(e)}"
+        status = "failed"
+    finally:
+        _current.job = None
+        for lock in reversed(held):
+            lock.release()
+    with _lock:
+        job["status"] = status
+        job["message"] = message
+        job["finished_at"] = _now()
+        _save_locked()
+
+
+def report_progress(step=None, done=None, total=None):
+    """
+    Update the progress of the job running on this thread.
+
+    Services call this as they go; outside a job it does nothing.  Passing a
+    new step resets the counters.
+    """
+    job = getattr(_current, "job", None)
+    if job is None:
+        return
+    with _lock:
+        progress = job["progress"]
+        if step is not None and step != progress["step"]:
+            progress.update({"step": step, "done": 0, "total": None})
+        if done is not None:
+            progress["done"] = done
+        if total is not None:
+            progress["total"] = total
+        if time.monotonic() - _last_saved >= PERSIST_EVERY:
+            _save_locked()
+
+
+def _public(job):
+    public = {k: v for k, v in job.items() if k != "dedupe_key"}
+    public["progress"] = dict(job["progress"])
+    return public
+
+
+def get_job(job_id: str):
+    with _lock:
+        job = _jobs.get(job_id)
+        return _public(job) if job else None
+
+
+def list_jobs(env: str = None, limit: int = 20):
+    """Active jobs first, then the most recently finished."""
+    with _lock:
+        jobs = [_public(j) for j in _jobs.values() if env is None or j["env"] == env]
+    active = sorted((j for j in jobs if j["status"] in ACTIVE), key=lambda j: j["created_at"])
+    finished = sorted((j for j in jobs if j["status"] not in ACTIVE), key=lambda j: j["finished_at"], reverse=True)
+    return (active + finished)[:limit]
+
+
+_load()
@@ -0,0 +1,159 @@
+import threading
+from bisect import bisect_left, insort
+from supabase_clients import get_client, iter_pages
+
+RECONCILE_INTERVAL = 15 * 60  # seconds
+LOAD_ATTEMPTS = 3  # reloads when awards keep landing during the scan
+
+
+class _SemesterBoard:
+    """Totals for one semester, kept both by netid and in rank order.
+
+    Lookups by netid are O(1); top-K reads the first K entries of the ranking;
+    an award moves one entry in the ranking with a bisect.
+    """
+
+    def __init__(self):
+        self.totals = {}
+        self.ranking = []  # sorted (-total, netid)
+
+    def set(self, netid, total):
+        old = self.totals.get(netid)
+        if old is not None:
+            i = bisect_left(self.ranking, (-old, netid))
+            if i < len(self.ranking) and self.ranking[i] == (-old, netid):
+                self.ranking.pop(i)
+        self.totals[netid] = total
+        insort(self.ranking, (-total, netid))
+
+    def add(self, netid, delta):
+        self.set(netid, self.totals.get(netid, 0) + delta)
+
+    def rank(self, netid):
+        total = self.totals.get(netid)
+        if total is None:
+            return None
+        return bisect_left(self.ranking, (-total, "")) + 1
+
+
+_lock = threading.Lock()
+_boards = {}  # env -> {semester -> _SemesterBoard}
+_names = {}  # env -> {netid -> display name}
+_missed = {}  # env -> awards recorded while env had no cached board
+
+
+def _load(env):
+    """Read the points_totals aggregate for env in one paged scan."""
+    sb = get_client(env)
+    boards = {}
+    names = {}
+    for page in iter_pages(sb, "points_totals", "semester, total, members(netid, first_name, last_name)",
+                           order="member_id,semester"):
+        for row in page:
+            member = row.get("members") or {}
+            netid = member.get("netid")
+            if not netid:
+                continue
+            boards.setdefault(row["semester"], _SemesterBoard()).set(netid, row["total"] or 0)
+            names[netid] = " ".join(p for p in (member.get("first_name"), member.get("last_name")) if p)
+    return boards, names
+
+
+def _boards_for(env):
+    """
+    The env's cached boards, loading them on first use.
+
+    An award recorded while the scan runs may or may not be in what it read,
+    so such a load is not cached: it is retried, and after LOAD_ATTEMPTS the
+    read is served uncached and the next one loads again.
+    """
+    for _ in range(LOAD_ATTEMPTS):
+        with _lock:
+            if env in _boards:
+                return _boards[env], _names[env]
+            missed = _missed.get(env, 0)
+        boards, names = _load(env)
+        with _lock:
+            # Another thread may have warmed it meanwhile; keep whichever got there first
+            if env in _boards:
+                return _boards[env], _names[env]
+            if _missed.get(env, 0) == missed:
+                _boards[env] = boards
+                _names[env] = names
+                return boards, names
+    return boards, names
+
+
+def record_points(env, netid, semester, points, name=None):
+    """Apply an award to the cached totals; while none are cached, the next load picks it up."""
+    netid = netid.lower()
+    with _lock:
+        boards = _boards.get(env)
+        if boards is None:
+            _missed[env] = _missed.get(env, 0) + 1
+            return
+        boards.setdefault(semester, _SemesterBoard()).add(netid, int(points))
+        if name and not _names[env].get(netid):
+            _names[env][netid] = name
+
+
+def invalidate_totals(env):
+    """Drop the cached totals for env; the next read reloads them (as does a load already running)."""
+    with _lock:
+        _boards.pop(env, None)
+        _names.pop(env, None)
+        _missed[env] = _missed.get(env, 0) + 1
+
+
+def get_leaderboard(semester, limit=10, env="production"):
+    """Return the top `limit` members for a semester as a list of dicts."""
+    boards, names = _boards_for(env)
+    with _lock:
+        board = boards.get(semester)
+        if not board:
+            return []
+        return [{"rank": i + 1, "netid": netid, "name": names.get(netid, ""), "total": -neg_total}
+                for i, (neg_total, netid) in enumerate(board.ranking[:limit])]
+
+
+def get_member_total(netid, semester, env="production"):
+    """Return {netid, name, semester, total, rank} for one member (total 0 if none)."""
+    netid = netid.lower()
+    boards, names = _boards_for(env)
+    with _lock:
+        board = boards.get(semester)
+        total = board.totals.get(netid, 0) if board else 0
+        rank = board.rank(netid) if board else None
+        return {"netid": netid, "name": names.get(netid, ""), "semester": semester, "total": total, "rank": rank}
+
+
+def reconcile_totals(env="production"):
+    """
+    Rebuild points_totals from points_tracking and reload the cache.
+
+    Catches drift from anything the trigger can't see (restored backups,
+    manual edits with triggers disabled). Returns the number of rows fixed.
+    """
+    sb = get_client(env)
+    drift = sb.rpc("reconcile_points_totals").execute().data or 0
+    del sb
+    invalidate_totals(env)
+    if drift:
+        print(f"Reconciled {drift} drifted points totals in {env}")
+    return drift
+
+
+def start_reconciliation_job(envs=("production", "staging"), interval=RECONCILE_INTERVAL):
+    """Run reconcile_totals for each env every `interval` seconds on a daemon thread."""
+    stop = threading.Event()
+
+    def _loop():
+        while not stop.wait(interval):
+            for env in envs:
+                try:
+                    reconcile_totals(env)
+                except Exception as e:
+                    print(f"Warning: points totals reconciliation failed for {env}: {str(e)}")
+
+    threading.Thread(target=_loop, name="points-totals-reconcile", daemon=True).start()
+    return stop
@@ -0,0 +1,184 @@
+import time
+import threading
+from datetime import datetime, timezone
+import requests
+from google.auth.transport.requests import Request
+from point_service import (event_form_questions, add_points_batch, _check_google_api_response,
+                           _answers_key, _text_answer, _NETID_RE)
+from dead_letter_service import record_failures
+
+POLL_INTERVAL = 3  # seconds between polls; awards land within about one interval
+FORM_CHECK_EVERY = 10  # polls between checks that the form is still accepting responses
+MAX_DURATION = 4 * 60 * 60  # seconds; a session stops on its own after this
+
+_lock = threading.Lock()
+_sessions = {}  # (env, form_id) -> session state dict
+
+
+def _headers(credentials):
+    # Sessions outlive the hour-long access token, so refresh it as needed
+    if credentials.expired or not credentials.token:
+        credentials.refresh(Request())
+    return {'Authorization': f'Bearer {credentials.token}'}
+
+
+def _get_json(url, credentials, context, params=None):
+    resp = requests.get(url, headers=_headers(credentials), params=params, timeout=30)
+    _check_google_api_response(resp, context)
+    return resp.json()
+
+
+def _new_responses(form_id, credentials, since):
+    """Fetch responses submitted at or after `since` (RFC 3339), following pagination.
+
+    Inclusive so a response sharing the last-seen timestamp isn't lost; the
+    caller's seen set drops the overlap.
+    """
+    url = f"https://forms.googleapis.com/v1/forms/{form_id}/responses"
+    params = {'filter': f"timestamp >= {since}"} if since else {}
+    responses = []
+    while True:
+        data = _get_json(url, credentials, "Form responses request", params)
+        responses.extend(data.get('responses', []))
+        if not data.get('nextPageToken'):
+            return responses
+        params = {**params, 'pageToken': data['nextPageToken']}
+
+
+def _accepting_responses(form_data):
+    # Forms created before publish settings existed don't report this; treat them as open
+    state = form_data.get('publishSettings', {}).get('publishState', {})
+    return state.get('isAcceptingResponses', True)
+
+
+def _poll_loop(state, credentials, stop):
+    form_id, env = state['form_id'], state['env']
+    form_url = f"https://forms.googleapis.com/v1/forms/{form_id}"
+    seen = set()
+    awarded_netids = set()
+    polls = 0
+
+    while not stop.is_set():
+        try:
+            # When the form has closed, still poll once more for the last sign-ins
+            closing = None
+            if polls % FORM_CHECK_EVERY == 0:
+                form_data = _get_json(form_url, credentials, "Form structure request")
+                if not _accepting_responses(form_data):
+                    closing = 'form closed'
+                elif time.monotonic() - state['_started'] > MAX_DURATION:
+                    closing = 'timed out'
+
+            submissions = _new_responses(form_id, credentials, state['since'])
+            batch = []
+            new_keys, new_netids = set(), set()
+            for submission in submissions:
+                key = submission.get('responseId') or _answers_key(submission.get('answers', {}))
+                answers = submission.get('answers', {})
+                netid = (_text_answer(answers, state['question_ids']['netid']) or '').strip().lower()
+                name = (_text_answer(answers, state['question_ids']['name']) or '').strip()
+                # Edited responses come back with a newer timestamp, and people
+                # sometimes sign in twice; either way award once per person
+                if key in seen or key in new_keys or netid in awarded_netids or netid in new_netids:
+                    continue
+                new_keys.add(key)
+                error = None if _NETID_RE.match(netid) else f"invalid netid '{netid}'"
+                if not error:
+                    new_netids.add(netid)
+                batch.append({'line': key, 'netid': netid, 'name': name, 'points': state['points'],
+                              'reason': state['reason'], 'error': error, 'answers': answers})
+
+            if batch:
+                failed = []
+                for row in add_points_batch(batch, env=env):
+                    if row.get('status') == 'added':
+                        state['awarded'] += 1
+                    elif row.get('status') == 'failed':
+                        state['failed'] += 1
+                        failed.append(("event_points", form_id, row['line'], {
+                            'answers': row['answers'], 'question_ids': state['question_ids'],
+                            'points': state['points'], 'reason': state['reason']}, row['error']))
+                    else:
+                        state['skipped'] += 1
+                record_failures(env, failed)
+            # Only move the cursor once this poll's sign-ins are handled, so a
+            # failed poll is fetched again
+            seen |= new_keys
+            awarded_netids |= new_netids
+            for submission in submissions:
+                state['since'] = max(state['since'] or '', submission.get('lastSubmittedTime', ''))
+            state['last_poll'] = datetime.now(timezone.utc).isoformat()
+            state['error'] = None
+            if closing:
+                state['status'] = closing
+                break
+        except Exception as e:
+            # Keep going through transient API errors; the next poll picks up where this left off
+            print(f"Live sign-in poll failed for {form_id}: {str(e)}")
+            state['error'] = str(e)
+        polls += 1
+        stop.wait(state['interval'])
+
+    if state['status'] == 'running':
+        state['status'] = 'stopped'
+    print(f"Live sign-in for {form_id} ended ({state['status']}): {state['awarded']} awarded")
+
+
+def start_live_event(form_id: str, points_to_add: int, credentials, env: str = "production",
+                     interval: float = POLL_INTERVAL):
+    """
+    Award event points as people sign in, instead of after the event.
+
+    Polls the form's responses every `interval` seconds on a daemon thread,
+    asking only for submissions from the last one seen onward, and awards each
+    poll's new sign-ins together through add_points_batch (so Slack DMs and the
+    leaderboard update within seconds).  Stops when the form stops accepting
+    responses, after MAX_DURATION, or on stop_live_event.  Failed awards go to
+    the dead-letter store.
+    """
+    if not credentials:
+        raise ValueError("Credentials are required")
+    key = (env, form_id)
+    with _lock:
+        existing = _sessions.get(key)
+        if existing and existing['status'] == 'running':
+            raise Exception("Live sign-in is already running for this form.")
+
+    form_data = _get_json(f"https://forms.googleapis.com/v1/forms/{form_id}", credentials, "Form structure request")
+    reason, question_ids = event_form_questions(form_data)
+
+    stop = threading.Event()
+    state = {
+        'form_id': form_id, 'env': env, 'title': form_data.get('info', {}).get('title', form_id),
+        'points': int(points_to_add), 'reason': reason, 'question_ids': question_ids,
+        'interval': interval, 'since': None, 'status': 'running',
+        'started_at': datetime.now(timezone.utc).isoformat(), 'last_poll': None,
+        'awarded': 0, 'failed': 0, 'skipped': 0, 'error': None,
+        '_started': time.monotonic(), '_stop': stop,
+    }
+    with _lock:
+        _sessions[key] = state
+    threading.Thread(target=_poll_loop, args=(state, credentials, stop),
+                     name=f"live-signin-{form_id}", daemon=True).start()
+    return public_state(state)
+
+
+def stop_live_event(form_id: str, env: str = "production"):
+    """Ask a running live session to stop after its current poll. Returns False if none was running."""
+    with _lock:
+        state = _sessions.get((env, form_id))
+    if not state or state['status'] != 'running':
+        return False
+    state['_stop'].set()
+    return True
+
+
+def public_state(state):
+    return {k: v for k, v in state.items() if not k.startswith('_') and k != 'question_ids'}
+
+
+def list_live_events(env: str = None):
+    """Return every live session started in this process (running or finished)."""
+    with _lock:
+        states = list(_sessions.values())
+    return [public_state(s) for s in states if env is None or s['env'] == env]
@@ -0,0 +1,192 @@
+import time
+import threading
+from collections import OrderedDict
+from supabase_clients import get_client, iter_pages
+
+MEMBER_COLUMNS = "id, netid, email, role"
+MAX_ENTRIES = 5000  # per environment
+TTL = 300  # seconds; bounds how long an edit made outside this process can go unseen
+
+_lock = threading.Lock()
+_entries = {}  # env -> OrderedDict(netid -> (expires_at, member))
+
+
+class _SingleFlight:
+    """Run at most one call per key at a time; concurrent callers wait and share its result."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}  # key -> [done Event, result, error]
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+        try:
+            call[1] = fn()
+            return call[1]
+        except Exception as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+
+
+_resolving = _SingleFlight()
+
+
+def _slot(env):
+    return _entries.setdefault(env, OrderedDict())
+
+
+def _store(env, member, now):
+    entries = _slot(env)
+    netid = member["netid"].lower()
+    entries[netid] = (now + TTL, {k: member.get(k) for k in ("id", "netid", "email", "role")})
+    entries.move_to_end(netid)
+    while len(entries) > MAX_ENTRIES:
+        entries.popitem(last=False)
+
+
+def remember_member(env, member):
+    """Record a member row we just wrote (or read) so later lookups skip the database."""
+    if not member or not member.get("netid"):
+        return
+    with _lock:
+        _store(env, member, time.monotonic())
+
+
+def forget_member(env, netid):
+    with _lock:
+        _slot(env).pop(netid.lower(), None)
+
+
+def clear_members(env=None):
+    """Drop every cached member for env (or for all envs)."""
+    with _lock:
+        if env is None:
+            _entries.clear()
+        else:
+            _entries.pop(env, None)
+
+
+def warm_members(env="production", client=None):
+    """Load the whole member directory for env in one paged read. Returns the count loaded."""
+    sb = client or get_client(env)
+    count = 0
+    now = time.monotonic()
+    for page in iter_pages(sb, "members", MEMBER_COLUMNS):
+        with _lock:
+            for member in page:
+                if member.get("netid"):
+                    _store(env, member, now)
+                    count += 1
+    return count
+
+
+def get_member(netid, env="production", client=None):
+    """
+    Return {id, netid, email, role} for netid, or None if no such member.
+
+    Served from the cache when a fresh entry exists; otherwise one select,
+    whose result is cached.  Misses are not cached so a member created
+    elsewhere is found on the next call.
+    """
+    netid = netid.lower()
+    now = time.monotonic()
+    with _lock:
+        entries = _slot(env)
+        hit = entries.get(netid)
+        if hit and hit[0] > now:
+            entries.move_to_end(netid)
+            return dict(hit[1])
+        entries.pop(netid, None)
+
+    sb = client or get_client(env)
+    rows = sb.table("members").select(MEMBER_COLUMNS).eq("netid", netid).execute().data
+    if not rows:
+        return None
+    remember_member(env, rows[0])
+    return dict(rows[0])
+
+
+def uncached_netids(netids, env="production"):
+    """The netids with no fresh cache entry for env, i.e. the ones a lookup would have to select."""
+    now = time.monotonic()
+    with _lock:
+        entries = _slot(env)
+        return {n.lower() for n in netids if not (n.lower() in entries and entries[n.lower()][0] > now)}
+
+
+def get_members_bulk(netids, env="production", client=None, chunk_size=200):
+    """
+    Resolve many netids at once. Returns {netid: member} for those that exist.
+
+    Fresh cache entries are used as-is; the rest are fetched with chunked
+    `in` filters (one round trip per chunk_size netids) and cached.
+    """
+    wanted = {n.lower() for n in netids if n}
+    found = {}
+    now = time.monotonic()
+    with _lock:
+        entries = _slot(env)
+        for netid in wanted:
+            hit = entries.get(netid)
+            if hit and hit[0] > now:
+                entries.move_to_end(netid)
+                found[netid] = dict(hit[1])
+
+    missing = sorted(wanted - set(found))
+    if missing:
+        sb = client or get_client(env)
+        for i in range(0, len(missing), chunk_size):
+            rows = sb.table("members").select(MEMBER_COLUMNS).in_("netid", missing[i:i + chunk_size]).execute().data or []
+            for member in rows:
+                remember_member(env, member)
+                found[member["netid"].lower()] = dict(member)
+    return found
+
+
+def resolve_or_create_member(netid, env="production", client=None, name=None):
+    """
+    Return (member, created) for netid, inserting a bare member row if none exists.
+
+    Concurrent calls for the same netid in this process are coalesced into
+    one lookup-or-insert whose result they all share.  Across processes the
+    insert is an upsert that ignores an existing netid, so a lost race reads
+    the winner's row instead of failing on the unique constraint.
+    """
+    netid = netid.lower()
+
+    def _resolve():
+        sb = client or get_client(env)
+        member = get_member(netid, env, sb)
+        if member:
+            return member, False
+        parts = name.split() if name else []
+        rows = sb.table("members").upsert({
+            "netid": netid,
+            "first_name": parts[0] if parts else "",
+            "last_name": " ".join(parts[1:]),
+            "email": f"{netid}@cornell.edu",
+        }, on_conflict="netid", ignore_duplicates=True).execute().data
+        if rows:
+            remember_member(env, rows[0])
+            return {k: rows[0].get(k) for k in ("id", "netid", "email", "role")}, True
+        # Another writer created it between our lookup and the upsert
+        member = get_member(netid, env, sb)
+        if not member:
+            raise Exception(f"Member {netid} could not be created or found")
+        return member, False
+
+    member, created = _resolving.do((env, netid), _resolve)
+    return dict(member), created
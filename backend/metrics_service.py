@@ -0,0 +1,353 @@
+import os
+import sys
+import time
+import threading
+import contextvars
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlparse
+from trace_service import start_span, finish_span, current_span
+from budget_service import note_call, recent_overruns
+
+# Request latency buckets in milliseconds (Prometheus-style upper bounds)
+LATENCY_BUCKETS_MS = (5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+
+PROFILE_DIR = Path(__file__).parent.parent / 'profiles'
+PROFILE_INTERVAL = 0.005  # seconds between stack samples while profiling
+PROFILE_KEEP = 50  # slow-request profiles kept on disk
+
+_lock = threading.Lock()
+_routes = {}  # (method, route) -> {"count", "sum_ms", "buckets": [..], "errors", "upstreams": {name: [calls, seconds]}}
+_upstreams = {}  # name -> {"calls", "errors", "seconds"}
+_request_stats = contextvars.ContextVar("request_stats", default=None)
+
+
+def classify_upstream(url):
+    """Name the service a URL belongs to, for grouping outbound calls."""
+    parsed = urlparse(str(url))
+    host = (parsed.hostname or "").lower()
+    path = parsed.path or ""
+    # The local stand-in serves each environment under a prefix (/production/rest/v1/...)
+    if host.endswith("supabase.co") or host.endswith("supabase.in") or "/rest/v1/" in path or "/storage/v1/" in path:
+        if "/storage/v1/" in path:
+            return "supabase_storage"
+        if "/rest/v1/" in path:
+            return "supabase_postgrest"
+        return "supabase_other"
+    if host == "forms.googleapis.com":
+        return "google_forms"
+    if host == "sheets.googleapis.com":
+        return "google_sheets"
+    if host == "www.googleapis.com" and path.startswith(("/drive", "/upload/drive")):
+        return "google_drive"
+    if host.endswith("googleapis.com") or host.endswith("google.com"):
+        return "google_other"
+    if host.endswith("slack.com"):
+        return "slack"
+    return "other"
+
+
+def _http_span(method, url, bytes_out):
+    """Open a span for one outbound call; the path is kept but not the query (it can carry tokens).
+
+    Calls outside any span (background pollers, the check-in flusher) are only
+    counted, so they don't each start a one-span trace of their own.
+    """
+    if current_span().trace_id is None:
+        return None
+    parsed = urlparse(str(url))
+    return start_span(f"http.{classify_upstream(url)}", method=method, host=parsed.hostname,
+                      path=parsed.path, bytes_out=bytes_out)
+
+
+def _end_http_span(handle, status, bytes_in, error):
+    if handle:
+        handle[0].set(status=status, bytes_in=bytes_in)
+    finish_span(handle, error)
+
+
+def record_call(url, seconds, failed=False):
+    """Account one outbound HTTP call to its upstream and to the current request, if any."""
+    name = classify_upstream(url)
+    with _lock:
+        totals = _upstreams.setdefault(name, {"calls": 0, "errors": 0, "seconds": 0.0})
+        totals["calls"] += 1
+        totals["seconds"] += seconds
+        if failed:
+            totals["errors"] += 1
+        # Worker threads started with in_current_trace share the request's stats
+        stats = _request_stats.get()
+        if stats is not None:
+            entry = stats["upstreams"].setdefault(name, [0, 0.0])
+            entry[0] += 1
+            entry[1] += seconds
+    note_call(name)
+
+
+# ── Instrumented transports ─────────────────────────────────────────────
+
+_installed = False
+
+
+def install_http_instrumentation():
+    """
+    Wrap the HTTP transports the app talks through so every outbound call is timed.
+
+    requests (Google Forms/Sheets/Drive) is wrapped at HTTPAdapter.send,
+    httpx (Supabase PostgREST and Storage) at HTTPTransport.handle_request and
+    slack_sdk at its urllib request method. Safe to call more than once.
+    """
+    global _installed
+    with _lock:
+        if _installed:
+            return
+        _installed = True
+
+    import requests.adapters
+    original_send = requests.adapters.HTTPAdapter.send
+
+    def send(self, request, *args, **kwargs):
+        handle = _http_span(request.method, request.url, len(request.body or b""))
+        start = time.perf_counter()
+        response, error = None, None
+        try:
+            response = original_send(self, request, *args, **kwargs)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            record_call(request.url, time.perf_counter() - start, response is None or response.status_code >= 400)
+            _end_http_span(handle, response.status_code if response is not None else None,
+                           response.headers.get("Content-Length") if response is not None else None, error)
+
+    requests.adapters.HTTPAdapter.send = send
+
+    import httpx
+    original_handle = httpx.HTTPTransport.handle_request
+
+    def handle_request(self, request):
+        handle = _http_span(request.method, request.url, request.headers.get("Content-Length"))
+        start = time.perf_counter()
+        response, error = None, None
+        try:
+            response = original_handle(self, request)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            record_call(request.url, time.perf_counter() - start, response is None or response.status_code >= 400)
+            _end_http_span(handle, response.status_code if response is not None else None,
+                           response.headers.get("Content-Length") if response is not None else None, error)
+
+    httpx.HTTPTransport.handle_request = handle_request
+
+    try:
+        from slack_sdk.web.base_client import BaseClient
+    except ImportError:
+        return
+    original_perform = BaseClient._perform_urllib_http_request
+
+    def perform(self, *, url, args):
+        handle = _http_span("POST", url, None)
+        start = time.perf_counter()
+        response, error = None, None
+        try:
+            response = original_perform(self, url=url, args=args)
+            return response
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            status = response.get("status", 200) if response is not None else None
+            record_call(url, time.perf_counter() - start, status is None or status >= 400)
+            _end_http_span(handle, status, len(response.get("body") or "") if response is not None else None, error)
+
+    BaseClient._perform_urllib_http_request = perform
+
+
+# ── Per-request accounting ──────────────────────────────────────────────
+
+def start_request():
+    """Begin accounting for the request on this thread. Returns the stats end_request takes."""
+    stats = {"start": time.perf_counter(), "upstreams": {}}
+    _request_stats.set(stats)
+    if profiling_enabled():
+        _profiler.watch(threading.get_ident())
+    return stats
+
+
+def end_request(stats, method, route, status):
+    """Record the request's latency and outbound calls under its route; dump a profile if it was slow."""
+    elapsed_ms = (time.perf_counter() - stats["start"]) * 1000
+    _request_stats.set(None)
+    samples = _profiler.unwatch(threading.get_ident()) if profiling_enabled() else None
+
+    with _lock:
+        entry = _routes.setdefault((method, route), {
+            "count": 0, "sum_ms": 0.0, "errors": 0,
+            "buckets": [0] * (len(LATENCY_BUCKETS_MS) + 1), "upstreams": {}})
+        entry["count"] += 1
+        entry["sum_ms"] += elapsed_ms
+        if status >= 500:
+            entry["errors"] += 1
+        for i, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms <= bound:
+                entry["buckets"][i] += 1
+                break
+        else:
+            entry["buckets"][-1] += 1
+        for name, (calls, seconds) in stats["upstreams"].items():
+            totals = entry["upstreams"].setdefault(name, [0, 0.0])
+            totals[0] += calls
+            totals[1] += seconds
+
+    if samples and elapsed_ms >= profile_threshold_ms():
+        _write_profile(method, route, elapsed_ms, samples)
+    return elapsed_ms
+
+
+# ── Exposition ──────────────────────────────────────────────────────────
+
+def metrics_snapshot():
+    """Everything recorded so far as plain dicts (for the JSON form of /metrics)."""
+    with _lock:
+        routes = []
+        for (method, route), e in sorted(_routes.items(), key=lambda kv: kv[0][1]):
+            routes.append({
+                "method": method, "route": route, "count": e["count"], "errors": e["errors"],
+                "avg_ms": round(e["sum_ms"] / e["count"], 1) if e["count"] else 0,
+                "buckets": dict(zip([str(b) for b in LATENCY_BUCKETS_MS] + ["+Inf"], e["buckets"])),
+                "upstreams": {n: {"calls": c, "seconds": round(s, 3)} for n, (c, s) in e["upstreams"].items()},
+            })
+        upstreams = {n: {**t, "seconds": round(t["seconds"], 3)} for n, t in _upstreams.items()}
+    return {"routes": routes, "upstreams": upstreams, "profiling": profiling_enabled(),
+            "budget_overruns": recent_overruns()}
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+def metrics_text():
+    """Everything recorded so far in the Prometheus text exposition format."""
+    lines = [
+        "# HELP http_request_duration_ms Request latency by route.",
+        "# TYPE http_request_duration_ms histogram",
+    ]
+    with _lock:
+        routes = sorted(_routes.items(), key=lambda kv: kv[0][1])
+        for (method, route), e in routes:
+            labels = f'method="{method}",route="{_label(route)}"'
+            cumulative = 0
+            for bound, count in zip(list(LATENCY_BUCKETS_MS) + ["+Inf"], e["buckets"]):
+                cumulative += count
+                lines.append(f'http_request_duration_ms_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"http_request_duration_ms_sum{{{labels}}} {e['sum_ms']:.3f}")
+            lines.append(f"http_request_duration_ms_count{{{labels}}} {e['count']}")
+
+        lines += ["# HELP http_request_errors_total Requests that ended with a 5xx status.",
+                  "# TYPE http_request_errors_total counter"]
+        for (method, route), e in routes:
+            lines.append(f'http_request_errors_total{{method="{method}",route="{_label(route)}"}} {e["errors"]}')
+
+        lines += ["# HELP http_request_upstream_calls_total Outbound calls made while serving each route.",
+                  "# TYPE http_request_upstream_calls_total counter"]
+        for (method, route), e in routes:
+            for name, (calls, _) in sorted(e["upstreams"].items()):
+                lines.append(f'http_request_upstream_calls_total{{method="{method}",route="{_label(route)}",upstream="{name}"}} {calls}')
+        lines += ["# HELP http_request_upstream_seconds_total Time spent in outbound calls while serving each route.",
+                  "# TYPE http_request_upstream_seconds_total counter"]
+        for (method, route), e in routes:
+            for name, (_, seconds) in sorted(e["upstreams"].items()):
+                lines.append(f'http_request_upstream_seconds_total{{method="{method}",route="{_label(route)}",upstream="{name}"}} {seconds:.6f}')
+
+        upstreams = sorted(_upstreams.items())
+        lines += ["# HELP upstream_calls_total Outbound calls per upstream, including background work.",
+                  "# TYPE upstream_calls_total counter"]
+        lines += [f'upstream_calls_total{{upstream="{n}"}} {t["calls"]}' for n, t in upstreams]
+        lines += ["# HELP upstream_errors_total Outbound calls that failed or returned 4xx/5xx.",
+                  "# TYPE upstream_errors_total counter"]
+        lines += [f'upstream_errors_total{{upstream="{n}"}} {t["errors"]}' for n, t in upstreams]
+        lines += ["# HELP upstream_seconds_total Time spent in outbound calls per upstream.",
+                  "# TYPE upstream_seconds_total counter"]
+        lines += [f'upstream_seconds_total{{upstream="{n}"}} {t["seconds"]:.6f}' for n, t in upstreams]
+    return "\n".join(lines) + "\n"
+
+
+# ── Opt-in sampling profiler ────────────────────────────────────────────
+
+def profile_threshold_ms():
+    """PROFILE_SLOW_MS turns profiling on: requests at least this slow get their stacks dumped."""
+    try:
+        return float(os.getenv("PROFILE_SLOW_MS", "0"))
+    except ValueError:
+        return 0.0
+
+
+def profiling_enabled():
+    return profile_threshold_ms() > 0
+
+
+class _Sampler:
+    """One background thread sampling the stacks of every request thread being watched.
+
+    Stacks are kept folded ("outer;inner;leaf" -> count), which is what
+    flamegraph.pl and speedscope read directly.
+    """
+
+    def __init__(self):
+        self.watched = {}  # thread id -> {folded stack: count}
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def watch(self, thread_id):
+        with self.lock:
+            self.watched[thread_id] = {}
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._loop, name="request-profiler", daemon=True)
+                self.thread.start()
+
+    def unwatch(self, thread_id):
+        with self.lock:
+            return self.watched.pop(thread_id, None)
+
+    def _loop(self):
+        while True:
+            time.sleep(PROFILE_INTERVAL)
+            with self.lock:
+                if not self.watched:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, counts in self.watched.items():
+                    frame = frames.get(thread_id)
+                    if frame is None:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                        frame = frame.f_back
+                    folded = ";".join(reversed(stack))
+                    counts[folded] = counts.get(folded, 0) + 1
+
+
+_profiler = _Sampler()
+
+
+def _write_profile(method, route, elapsed_ms, samples):
+    PROFILE_DIR.mkdir(exist_ok=True)
+    slug = "".join(c if c.isalnum() else "_" for c in route).strip("_") or "root"
+    path = PROFILE_DIR / f"{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{method}-{slug}-{int(elapsed_ms)}ms.folded"
+    path.write_text("".join(f"{stack} {count}\n" for stack, count in sorted(samples.items())))
+    print(f"Slow request {method} {route} took {elapsed_ms:.0f}ms; stacks written to {path.name}")
+    for old in sorted(PROFILE_DIR.glob("*.folded"))[:-PROFILE_KEEP]:
+        old.unlink(missing_ok=True)
+
+
+def list_profiles():
+    """Names of the dumped slow-request profiles, newest first."""
+    if not PROFILE_DIR.exists():
+        return []
+    return sorted((p.name for p in PROFILE_DIR.glob("*.folded")), reverse=True)
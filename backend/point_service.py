@@ -1,30 +1,46 @@
 import os
 import re
 import json
+import csv
+import hashlib
+import math
+from pathlib import Path
+import time
+import threading
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urlparse, parse_qs
 from dotenv import load_dotenv
 import pickle
 import os.path
-from slack_service import send_points_notification
-from supabase_clients import get_client, get_supabase_url
+from slack_service import send_points_notification, queue_points_notification
+from supabase_clients import get_client, PAGE_SIZE
+from storage_service import upload_immutable, delete_unreferenced_headshots
+from leaderboard_service import record_points
+from member_cache import get_members_bulk, remember_member, warm_members, resolve_or_create_member, uncached_netids
+from dead_letter_service import record_failure, record_failures, resolve_failures, failure_id, list_failures
+from job_service import report_progress
+from trace_service import traced, set_attributes, in_current_trace
+from budget_service import call_budget, budget_counts
 from datetime import datetime, date
 import pytz
 
 
-def current_semester():
-    """Return the current semester string (e.g. 'sp26', 'su26', 'fa26')."""
-    today = date.today()
-    year_short = str(today.year % 100)
-    month = today.month
+def semester_for(day):
+    """Return the semester string (e.g. 'sp26', 'su26', 'fa26') containing a date."""
+    year_short = str(day.year % 100)
+    month = day.month
     if 1 <= month <= 5:
         return f"sp{year_short}"
     elif 6 <= month <= 7:
         return f"su{year_short}"
     else:
         return f"fa{year_short}"
+
+def current_semester():
+    """Return the current semester string (e.g. 'sp26', 'su26', 'fa26')."""
+    return semester_for(date.today())
 import io
-import mimetypes
 from PIL import Image, ImageOps
 from pillow_heif import register_heif_opener
 register_heif_opener()  # Adds HEIC/HEIF support to Pillow
@@ -112,6 +128,45 @@ def crop_image_to_square(image_bytes):
         # If cropping fails, return original bytes
         return image_bytes
 
+@traced(attrs=("file_id",))
+def download_drive_file(file_id, credentials, name_for_logging=""):
+    """
+    Download a file from Google Drive.
+
+    Args:
+        file_id: Google Drive file ID
+        credentials: Google API credentials
+        name_for_logging: Name for logging purposes
+
+    Returns:
+        (file bytes, mime type) or None if the file could not be fetched
+    """
+    token = credentials.token
+
+    # First get file metadata (also confirms we can access the file)
+    metadata_url = f"https://www.googleapis.com/drive/v3/files/{file_id}"
+    headers = {'Authorization': f'Bearer {token}'}
+
+    metadata_response = requests.get(metadata_url, headers=headers)
+    if metadata_response.status_code != 200:
+        print(f"Failed to get file metadata for {name_for_logging}: {metadata_response.text}")
+        return None
+
+    metadata = metadata_response.json()
+    mime_type = metadata.get('mimeType', 'application/octet-stream')
+
+    # Download the file content
+    download_url = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
+    download_response = requests.get(download_url, headers=headers)
+
+    if download_response.status_code != 200:
+        print(f"Failed to download file for {name_for_logging}: {download_response.text}")
+        return None
+
+    set_attributes(bytes=len(download_response.content), mime_type=mime_type)
+    return download_response.content, mime_type
+
+@traced(attrs=("netid", "image_type", "env"))
 def download_and_upload_headshot(file_id, netid, image_type, credentials, name_for_logging="", env="production"):
     """
     Downloads a file from Google Drive and uploads it to Supabase storage
@@ -125,80 +180,36 @@ def download_and_upload_headshot(file_id, netid, image_type, credentials, name_f
         env: 'staging' or 'production'
 
     Returns:
-        URL of uploaded file in Supabase storage or None if failed
+        Bucket-relative object key (e.g. 'eboard/ab123Primary-<hash>.jpeg') or None if failed.
+        Use supabase_clients.resolve_storage_url() to turn it into a public URL.
     """
     try:
-        token = credentials.token
-        
-        # First get file metadata to determine file extension
-        metadata_url = f"https://www.googleapis.com/drive/v3/files/{file_id}"
-        headers = {'Authorization': f'Bearer {token}'}
-        
-        metadata_response = requests.get(metadata_url, headers=headers)
-        if metadata_response.status_code != 200:
-            print(f"Failed to get file metadata for {name_for_logging}: {metadata_response.text}")
-            return None
-            
-        metadata = metadata_response.json()
-        file_name = metadata.get('name', 'unknown')
-        mime_type = metadata.get('mimeType', 'application/octet-stream')
-        
-        # Determine file extension
-        extension = mimetypes.guess_extension(mime_type) or '.jpg'
-        if extension == '.jpe':  # Fix common issue with jpeg extension
-            extension = '.jpeg'
-        
-        # Download the file content
-        download_url = f"https://www.googleapis.com/drive/v3/files/{file_id}?alt=media"
-        download_response = requests.get(download_url, headers=headers)
-        
-        if download_response.status_code != 200:
-            print(f"Failed to download file for {name_for_logging}: {download_response.text}")
+        downloaded = download_drive_file(file_id, credentials, name_for_logging)
+        if downloaded is None:
             return None
-        
-        # Create file name for Supabase storage
-        supabase_filename = f"{netid.lower()}{image_type}{extension}"
-        
+
         # Process image: crop to square and convert to JPEG (handles HEIC, PNG, etc.)
-        file_bytes = download_response.content
-        file_bytes = crop_image_to_square(file_bytes)
+        file_bytes = crop_image_to_square(downloaded[0])
         # crop_image_to_square always outputs JPEG, so force extension and mime
         extension = '.jpeg'
         mime_type = 'image/jpeg'
-        supabase_filename = f"{netid.lower()}{image_type}{extension}"
+        # Name the object after its content so it can be cached forever; a new
+        # photo gets a new name and the old one is garbage-collected later
+        content_hash = hashlib.sha256(file_bytes).hexdigest()[:16]
+        supabase_filename = f"{netid.lower()}{image_type}-{content_hash}{extension}"
 
-        # Try to upload first, if it fails due to duplicate, delete and re-upload
         sb = get_client(env)
         try:
-            upload_response = sb.storage.from_("headshots").upload(
-                f"eboard/{supabase_filename}",
-                file_bytes,
-                {"content-type": mime_type}
-            )
+            upload_immutable(sb, "headshots", f"eboard/{supabase_filename}", file_bytes, mime_type)
         except Exception as e:
-            # If upload fails due to duplicate, delete existing file and re-upload
-            if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
-                try:
-                    # Delete the existing file
-                    delete_response = sb.storage.from_("headshots").remove([f"eboard/{supabase_filename}"])
-                    # Re-upload the new file
-                    upload_response = sb.storage.from_("headshots").upload(
-                        f"eboard/{supabase_filename}",
-                        file_bytes,
-                        {"content-type": mime_type}
-                    )
-                except Exception as replace_e:
-                    print(f"Failed to replace headshot for {name_for_logging}: {str(replace_e)}")
-                    return None
-            else:
-                print(f"Failed to upload headshot for {name_for_logging}: {str(e)}")
-                return None
-        
-        # Construct the public URL
-        public_url = f"{get_supabase_url(env)}/storage/v1/object/public/headshots/eboard/{supabase_filename}"
-        
+            print(f"Failed to upload headshot for {name_for_logging}: {str(e)}")
+            return None
+
+        # Store the environment-agnostic key; URLs are resolved at read time
+        object_key = f"eboard/{supabase_filename}"
+
         print(f"Successfully uploaded {image_type} headshot for {name_for_logging}")
-        return public_url
+        return object_key
         
     except Exception as e:
         print(f"Error processing headshot for {name_for_logging}: {str(e)}")
@@ -218,7 +229,7 @@ def process_headshot_upload(question_id, submission_info, netid, headshot_type,
         env: 'staging' or 'production'
 
     Returns:
-        URL of uploaded headshot or None if no file or upload failed
+        Object key of uploaded headshot or None if no file or upload failed
     """
     if not question_id or question_id not in submission_info:
         return None
@@ -237,35 +248,87 @@ def process_headshot_upload(question_id, submission_info, netid, headshot_type,
     
     return None
 
+FLYER_WIDTHS = (1200, 600, 300)
+
+def make_flyer_derivatives(image_bytes):
+    """
+    Produce web-sized WebP versions of a flyer from a single decode.
+
+    The source is decoded and oriented once; each width is resized from that
+    in-memory image. Widths larger than the original are skipped (the original
+    width is used instead so there is always at least one derivative).
+
+    Returns:
+        {width: webp bytes}
+    """
+    img = Image.open(io.BytesIO(image_bytes))
+    img = ImageOps.exif_transpose(img)
+    if img.mode not in ('RGB', 'RGBA'):
+        img = img.convert('RGBA' if 'A' in img.getbands() else 'RGB')
+
+    derivatives = {}
+    for width in FLYER_WIDTHS:
+        target = min(width, img.width)
+        if target in derivatives:
+            continue
+        resized = img if target == img.width else img.resize(
+            (target, max(1, round(img.height * target / img.width))), Image.LANCZOS)
+        output = io.BytesIO()
+        resized.save(output, format='WEBP', quality=80, method=4)
+        derivatives[target] = output.getvalue()
+    return derivatives
+
+@traced(attrs=("env",))
+def ingest_flyer(flyer_link, credentials, name_for_logging="", env="production"):
+    """
+    Fetch a flyer from a Google Drive link and upload optimized derivatives.
+
+    Objects go to the 'flyers' bucket under events/, named by content hash so
+    they can be cached indefinitely.
+
+    Returns:
+        {width (str): object key} for the derivatives, or None if the link is
+        not a Drive file or the download/upload failed.
+    """
+    file_id = _extract_drive_file_id(flyer_link)
+    if not file_id or not credentials:
+        return None
+    try:
+        downloaded = download_drive_file(file_id, credentials, name_for_logging)
+        if downloaded is None:
+            return None
+        content_hash = hashlib.sha256(downloaded[0]).hexdigest()[:16]
+        derivatives = make_flyer_derivatives(downloaded[0])
+
+        sb = get_client(env)
+        keys = {}
+        for width, data in derivatives.items():
+            key = f"events/{content_hash}-{width}.webp"
+            upload_immutable(sb, "flyers", key, data, "image/webp")
+            keys[str(width)] = key
+        print(f"Uploaded {len(keys)} flyer sizes for {name_for_logging}")
+        return keys
+    except Exception as e:
+        print(f"Error processing flyer for {name_for_logging}: {str(e)}")
+        return None
+
+@traced(attrs=("netid", "points_to_add", "env"))
+# Member lookup, create and raced re-read, plus the insert; doubled for the staging mirror
+@call_budget(supabase=lambda args: 8 if args['env'] == "production" else 4)
 def add_or_update_points(netid: str, points_to_add: int, reason: str, name: str = None, env: str = "production"):
     try:
         sb = get_client(env)
 
         semester = current_semester()
-        # First check if member exists
+        # Look the member up (usually answered by the member cache) or create
+        # them; concurrent awards for the same new netid share one insert
         try:
-            response = sb.table('members').select('id, email').eq('netid', netid.lower()).execute()
+            member, _ = resolve_or_create_member(netid, env, sb, name)
         except Exception as db_err:
-            raise Exception(f"Supabase connection error: {str(db_err)}")
-
-        if not response.data:
-            # Member doesn't exist, create new member
-            member_data = {
-                'netid': netid.lower(),
-                'first_name': name.split()[0] if name else '',
-                'last_name': " ".join(name[1:]) if name and len(name.split()) > 1 else '',
-                'email': f"{netid.lower()}@cornell.edu"
-            }
-            try:
-                member_response = sb.table('members').insert(member_data).execute()
-                member_id = member_response.data[0]['id']
-                member_email = member_response.data[0]['email']
-            except Exception as insert_err:
-                raise Exception(f"Error creating new member: {str(insert_err)}")
-        else:
-            member_id = response.data[0]['id']
-            # Default to Cornell email if email field is None or empty
-            member_email = response.data[0].get('email') or f"{netid.lower()}@cornell.edu"
+            raise Exception(f"Error looking up or creating member: {str(db_err)}")
+        member_id = member['id']
+        # Default to Cornell email if email field is None or empty
+        member_email = member.get('email') or f"{netid.lower()}@cornell.edu"
 
         # Add points
         points_data = {
@@ -280,6 +343,9 @@ def add_or_update_points(netid: str, points_to_add: int, reason: str, name: str
         except Exception as points_err:
             raise Exception(f"Error inserting points data: {str(points_err)}")
 
+        # The points_totals trigger updates the database; keep the cache in step
+        record_points(env, netid, semester, points_to_add, name)
+
         # Send Slack notification (skip in staging to avoid DMing real users)
         if member_email and env == "production":
             try:
@@ -301,8 +367,189 @@ def add_or_update_points(netid: str, points_to_add: int, reason: str, name: str
         print(f"Detailed error in add_or_update_points: {str(e)}")
         raise Exception(f"Error adding/updating points: {str(e)}")
 
+POINTS_INSERT_CHUNK = 500
+_NETID_RE = re.compile(r'^[a-z]{2,3}[0-9]{1,5}$')
+
+
+def parse_points_csv(text: str, default_reason: str = None):
+    """
+    Parse CSV text of `netid, points, reason` into rows for add_points_batch.
+
+    A header row is optional. Reason may be omitted when default_reason is given.
+    Returns a list of {line, netid, points, reason, error}; rows that fail
+    validation carry an error message instead of being dropped.
+    """
+    rows = []
+    for line_no, fields in enumerate(csv.reader(io.StringIO(text.strip())), start=1):
+        fields = [f.strip() for f in fields]
+        if not any(fields):
+            continue
+        if line_no == 1 and fields[0].lower() in ('netid', 'net id'):
+            continue
+        netid = fields[0].lower() if fields else ''
+        points_raw = fields[1] if len(fields) > 1 else ''
+        reason = ",".join(fields[2:]).strip() if len(fields) > 2 else ''
+        reason = reason or default_reason or ''
+        row = {'line': line_no, 'netid': netid, 'points': None, 'reason': reason, 'error': None}
+        if not _NETID_RE.match(netid):
+            row['error'] = f"invalid netid '{fields[0] if fields else ''}'"
+        elif not is_integer_string(points_raw):
+            row['error'] = f"invalid points '{points_raw}'"
+        elif not reason:
+            row['error'] = "missing reason"
+        else:
+            row['points'] = int(points_raw)
+        rows.append(row)
+    return rows
+
+
+def _points_batch_budget(args):
+    """Supabase calls add_points_batch may make: chunked lookups, one create, raced re-reads and chunked inserts."""
+    n = len(args['rows'])
+    per_env = 2 * math.ceil(n / 200) + 1 + math.ceil(n / POINTS_INSERT_CHUNK)
+    return per_env * (2 if args['env'] == "production" else 1)
+
+
+@traced(attrs=("rows", "env"))
+@call_budget(supabase=_points_batch_budget)
+def add_points_batch(rows, env: str = "production"):
+    """
+    Award points for many netids at once (e.g. a hackathon roster).
+
+    Rows come from parse_points_csv (an optional 'name' is used for members
+    created on the fly). Exact duplicate (netid, points, reason, source)
+    rows are skipped; the optional 'source' (e.g. a form id) keeps apart
+    awards that only look alike, such as two events whose forms were copied
+    from one template and share a title. Members are resolved in bulk and
+    created in one insert if new, points rows are inserted in chunks, and
+    Slack notifications are queued in the background. Production batches
+    are mirrored to staging like add_or_update_points does.
+
+    Returns the rows annotated with a status: added, duplicate, invalid or failed.
+    """
+    sb = get_client(env)
+    semester = current_semester()
+
+    seen = set()
+    valid = []
+    for row in rows:
+        if row.get('error'):
+            row['status'] = 'invalid'
+            continue
+        key = (row['netid'], row['points'], row['reason'], row.get('source'))
+        if key in seen:
+            row['status'] = 'duplicate'
+            continue
+        seen.add(key)
+        valid.append(row)
+
+    try:
+        members = get_members_bulk([r['netid'] for r in valid], env, sb)
+        new_netids = sorted({r['netid'] for r in valid} - set(members))
+        if new_netids:
+            names = {r['netid']: r['name'].split() for r in valid if r.get('name') and r['name'].split()}
+            # Ignore netids someone else created since the lookup, then read those back
+            created = sb.table('members').upsert([
+                {'netid': n, 'first_name': names[n][0] if n in names else '',
+                 'last_name': " ".join(names[n][1:]) if n in names else '', 'email': f"{n}@cornell.edu"}
+                for n in new_netids
+            ], on_conflict='netid', ignore_duplicates=True).execute().data or []
+            for member in created:
+                remember_member(env, member)
+                members[member['netid'].lower()] = member
+            raced = [n for n in new_netids if n not in members]
+            if raced:
+                members.update(get_members_bulk(raced, env, sb))
+    except Exception as e:
+        for row in valid:
+            row['status'] = 'failed'
+            row['error'] = f"member lookup failed: {str(e)}"
+        return rows
+
+    for i in range(0, len(valid), POINTS_INSERT_CHUNK):
+        chunk = valid[i:i + POINTS_INSERT_CHUNK]
+        try:
+            sb.table('points_tracking').insert([{
+                'member_id': members[r['netid']]['id'],
+                'points': r['points'],
+                'semester': semester,
+                'reason': r['reason'],
+            } for r in chunk]).execute()
+        except Exception as e:
+            for row in chunk:
+                row['status'] = 'failed'
+                row['error'] = f"insert failed: {str(e)}"
+            continue
+        for row in chunk:
+            row['status'] = 'added'
+            record_points(env, row['netid'], semester, row['points'])
+            if env == "production":
+                email = members[row['netid']].get('email') or f"{row['netid']}@cornell.edu"
+                queue_points_notification(email, row['points'], row['reason'])
+
+    if env == "production":
+        added = [{k: r.get(k) for k in ('line', 'netid', 'points', 'reason', 'error', 'name', 'source')}
+                 for r in valid if r.get('status') == 'added']
+        if added:
+            try:
+                add_points_batch(added, env="staging")
+            except Exception as sync_err:
+                print(f"Warning: Staging sync failed: {str(sync_err)}")
+
+    added_count = sum(1 for r in rows if r.get('status') == 'added')
+    print(f"Batch added points for {added_count} of {len(rows)} rows")
+    return rows
+
+
+def _answers_key(answers):
+    """Fallback item key for a submission without a responseId."""
+    return hashlib.sha1(json.dumps(answers, sort_keys=True).encode()).hexdigest()[:16]
+
+def _answers_hash(answers):
+    """Hash of a raw form submission (text answers and uploaded file ids)."""
+    blob = json.dumps(answers, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def _text_answer(submission_info, question_id):
+    return submission_info.get(question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
+
+def event_form_questions(form_data):
+    """Return (points reason, {'name': question id, 'netid': question id}) for an event sign-in form."""
+    name_question_id = None
+    netid_question_id = None
+
+    # Get the form title
+    form_title = form_data.get('info', {}).get('title', 'Unknown Form')
+    reason = f"Event Attendance - {form_title}"
+
+    for item in form_data.get('items', []):
+        title = item.get('title', '').lower()
+        if 'name' in title:
+            name_question_id = item.get('questionItem', {}).get('question', {}).get('questionId')
+        elif 'netid' in title:
+            netid_question_id = item.get('questionItem', {}).get('question', {}).get('questionId')
+
+    if not name_question_id or not netid_question_id:
+        raise Exception("Could not find name or netID questions in form. Form structure may be incorrect.")
+    return reason, {'name': name_question_id, 'netid': netid_question_id}
+
+@traced(attrs=("env",))
+def _award_event_submission(submission_info, question_ids, points_to_add, reason, env):
+    """Award event points for one form submission."""
+    name = submission_info[question_ids['name']]['textAnswers']['answers'][0]['value']
+    netid = submission_info[question_ids['netid']]['textAnswers']['answers'][0]['value']
+    add_or_update_points(netid=netid, points_to_add=points_to_add, name=name, reason=reason, env=env)
+
+def _event_import_budget(args):
+    """Supabase calls retrieve_event_responses may make: per environment, the paged member read,
+    a points insert per response, and a lookup, create and raced re-read per member not yet known."""
+    return sum(loaded // PAGE_SIZE + 1 + args.get('responses', 0) + 3 * new
+               for loaded, new in args.get('warmed', {}).values())
+
 # Get points via the responses object from Google Forms
 # This is good to use when collecting responses from an event that copied the base template
+@traced(attrs=("form_id", "env"))
+@call_budget(google_forms=2, supabase=_event_import_budget)
 def retrieve_event_responses(form_id: str, points_to_add: int, credentials=None, env: str = "production"):
     try:
         # If credentials provided, use them. Otherwise use existing token logic
@@ -330,23 +577,7 @@ def retrieve_event_responses(form_id: str, points_to_add: int, credentials=None,
         except json.JSONDecodeError as json_err:
             raise Exception(f"Error parsing form data JSON: {str(json_err)}")
         
-        # Find the question IDs for name and netID
-        name_question_id = None
-        netid_question_id = None
-        
-        # Get the form title
-        form_title = form_data.get('info', {}).get('title', 'Unknown Form')
-        reason = f"Event Attendance - {form_title}"
-
-        for item in form_data.get('items', []):
-            title = item.get('title', '').lower()
-            if 'name' in title:
-                name_question_id = item.get('questionItem', {}).get('question', {}).get('questionId')
-            elif 'netid' in title:
-                netid_question_id = item.get('questionItem', {}).get('question', {}).get('questionId')
-        
-        if not name_question_id or not netid_question_id:
-            raise Exception("Could not find name or netID questions in form. Form structure may be incorrect.")
+        reason, question_ids = event_form_questions(form_data)
 
         # Get form responses
         try:
@@ -363,17 +594,33 @@ def retrieve_event_responses(form_id: str, points_to_add: int, credentials=None,
         
         if not form_responses:
             print("Warning: No form responses found")
+        else:
+            # One paged read of the member directory instead of a lookup per attendee;
+            # production awards are mirrored to staging, so warm that too
+            netids = {_text_answer(s.get('answers', {}), question_ids['netid']) for s in form_responses} - {None}
+            warmed = {}
+            for warm_env in ([env, "staging"] if env == "production" else [env]):
+                try:
+                    loaded = warm_members(warm_env)
+                    warmed[warm_env] = (loaded, len(uncached_netids(netids, warm_env)))
+                except Exception as warm_err:
+                    print(f"Warning: could not warm member cache for {warm_env}: {str(warm_err)}")
+            budget_counts(responses=len(form_responses), warmed=warmed)
         
-        # Process each response
+        # Process each response; failures are kept for retry_failed_responses
         processed_count = 0
         error_count = 0
-        for submission in form_responses:
+        succeeded = []
+        failed = []
+        report_progress("Awarding points", 0, len(form_responses))
+        for i, submission in enumerate(form_responses, start=1):
+            report_progress(done=i)
             submission_info = submission.get('answers', {})
+            item_key = submission.get('responseId') or _answers_key(submission_info)
             try:
-                name = submission_info[name_question_id]['textAnswers']['answers'][0]['value']
-                netid = submission_info[netid_question_id]['textAnswers']['answers'][0]['value']
-                add_or_update_points(netid=netid, points_to_add=points_to_add, name=name, reason=reason, env=env)
+                _award_event_submission(submission_info, question_ids, points_to_add, reason, env)
                 processed_count += 1
+                succeeded.append(failure_id("event_points", form_id, item_key))
             except KeyError as e:
                 print(f"Error processing submission: Missing field {e}")
                 error_count += 1
@@ -381,7 +628,12 @@ def retrieve_event_responses(form_id: str, points_to_add: int, credentials=None,
             except Exception as e:
                 print(f"Error processing submission for {submission_info.get('name', 'unknown')}: {str(e)}")
                 error_count += 1
+                failed.append(("event_points", form_id, item_key, {
+                    'answers': submission_info, 'question_ids': question_ids,
+                    'points': points_to_add, 'reason': reason}, e))
                 continue
+        record_failures(env, failed)
+        resolve_failures(env, succeeded)
 
         print(f"Processed {processed_count} responses successfully, {error_count} errors")
 
@@ -392,6 +644,170 @@ def retrieve_event_responses(form_id: str, points_to_add: int, credentials=None,
         print(f"Retrieved and processed {len(form_responses)} event responses")
 
 
+FORMS_WORKERS = 4  # forms fetched at once in a batch import
+FORMS_READS_PER_MINUTE = 300  # stays well under the Forms API per-user read quota
+FORMS_MAX_ATTEMPTS = 5
+
+
+class _RateLimiter:
+    """Spaces calls evenly across threads so a batch never bursts past the quota."""
+
+    def __init__(self, per_minute):
+        self.interval = 60.0 / per_minute
+        self.next_at = 0.0
+        self.lock = threading.Lock()
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_at)
+            self.next_at = start + self.interval
+        if start > now:
+            time.sleep(start - now)
+
+    def back_off(self, seconds):
+        """Push every caller back after the API says we're over quota."""
+        with self.lock:
+            self.next_at = max(self.next_at, time.monotonic() + seconds)
+
+
+_forms_limiter = _RateLimiter(FORMS_READS_PER_MINUTE)
+
+
+@traced(attrs=("context",))
+def _forms_get(url, token, context, params=None):
+    """GET a Forms API URL under the shared limiter, retrying 429/5xx with backoff."""
+    for attempt in range(FORMS_MAX_ATTEMPTS):
+        _forms_limiter.wait()
+        resp = requests.get(url, headers={'Authorization': f'Bearer {token}'}, params=params, timeout=30)
+        if resp.status_code == 429 or resp.status_code >= 500:
+            set_attributes(retries=attempt + 1)
+            retry_after = resp.headers.get('Retry-After')
+            delay = float(retry_after) if retry_after and retry_after.isdigit() else 2 ** attempt
+            _forms_limiter.back_off(delay)
+            continue
+        _check_google_api_response(resp, context)
+        return resp.json()
+    _check_google_api_response(resp, context)
+    return resp.json()
+
+
+@traced(attrs=("form_id",))
+def _fetch_event_form(form_id, token):
+    """Structure and every response (all pages) for one event form."""
+    form_data = _forms_get(f"https://forms.googleapis.com/v1/forms/{form_id}", token, "Form structure request")
+    reason, question_ids = event_form_questions(form_data)
+    url = f"https://forms.googleapis.com/v1/forms/{form_id}/responses"
+    responses, params = [], {}
+    while True:
+        data = _forms_get(url, token, "Form responses request", params)
+        responses.extend(data.get('responses', []))
+        if not data.get('nextPageToken'):
+            break
+        params = {'pageToken': data['nextPageToken']}
+    return form_data.get('info', {}).get('title', form_id), reason, question_ids, responses
+
+
+@traced(attrs=("forms", "env"))
+@call_budget(google_forms=lambda args: 2 * len({form_id for form_id, _ in args['forms']}))
+def retrieve_event_responses_batch(forms, credentials=None, env: str = "production"):
+    """
+    Award event points for several forms in one pass (e.g. catching up on a week of events).
+
+    forms is a list of (form_id, points). Structures and responses are fetched
+    concurrently under a shared Forms API rate limiter, submissions from every
+    form are merged (one award per person per form) and written with a single
+    add_points_batch call. Failed awards go to the dead-letter store like
+    retrieve_event_responses.
+
+    Returns {'forms': [{form_id, title, responses, added, duplicate, invalid,
+    failed, error}], 'added', 'failed', 'errors'}.
+    """
+    if not credentials:
+        raise ValueError("Credentials are required")
+    token = credentials.token
+
+    # The same form listed twice would only produce duplicates; keep the first
+    points_by_form = {}
+    for form_id, points in forms:
+        points_by_form.setdefault(form_id, int(points))
+    report = {'forms': [], 'added': 0, 'failed': 0, 'errors': []}
+    form_reports = {form_id: {'form_id': form_id, 'title': form_id, 'responses': 0, 'added': 0,
+                              'duplicate': 0, 'invalid': 0, 'failed': 0, 'error': None}
+                    for form_id in points_by_form}
+    report['forms'] = list(form_reports.values())
+
+    report_progress("Fetching forms", 0, len(points_by_form))
+    fetched = {}
+    with ThreadPoolExecutor(max_workers=FORMS_WORKERS) as pool:
+        futures = {form_id: pool.submit(in_current_trace(_fetch_event_form), form_id, token) for form_id in points_by_form}
+        for i, (form_id, future) in enumerate(futures.items(), start=1):
+            try:
+                fetched[form_id] = future.result()
+            except Exception as e:
+                form_reports[form_id]['error'] = str(e)
+                report['errors'].append(f"{form_id}: {str(e)}")
+            report_progress(done=i)
+
+    rows = []
+    for form_id, (title, reason, question_ids, responses) in fetched.items():
+        form_reports[form_id].update({'title': title, 'responses': len(responses)})
+        seen_netids = set()
+        for submission in responses:
+            answers = submission.get('answers', {})
+            netid = (_text_answer(answers, question_ids['netid']) or '').strip().lower()
+            name = (_text_answer(answers, question_ids['name']) or '').strip()
+            error = None if _NETID_RE.match(netid) else f"invalid netid '{netid}'"
+            if not error and netid in seen_netids:
+                # Signed in twice on the same form; count it once
+                form_reports[form_id]['duplicate'] += 1
+                continue
+            seen_netids.add(netid)
+            rows.append({'line': submission.get('responseId') or _answers_key(answers), 'netid': netid,
+                         'name': name, 'points': points_by_form[form_id], 'reason': reason, 'error': error,
+                         'source': form_id, '_form_id': form_id, '_answers': answers, '_question_ids': question_ids})
+
+    if rows:
+        report_progress("Awarding points", 0, len(rows))
+        add_points_batch(rows, env=env)
+        report_progress(done=len(rows))
+
+    succeeded = []
+    failed = []
+    for row in rows:
+        form_report = form_reports[row['_form_id']]
+        form_report[row['status']] += 1
+        if row['status'] == 'added':
+            report['added'] += 1
+            succeeded.append(failure_id("event_points", row['_form_id'], row['line']))
+        elif row['status'] == 'failed':
+            report['failed'] += 1
+            failed.append(("event_points", row['_form_id'], row['line'], {
+                'answers': row['_answers'], 'question_ids': row['_question_ids'],
+                'points': row['points'], 'reason': row['reason']}, row['error']))
+    record_failures(env, failed)
+    resolve_failures(env, succeeded)
+
+    print(f"Batch form import: {len(fetched)}/{len(points_by_form)} forms fetched, "
+          f"{report['added']} awarded, {report['failed']} failed")
+    return report
+
+
+def _eboard_import_budget(args):
+    """Supabase calls retrieve_eboard_responses may make: stored hashes, two headshot uploads
+    per rebuilt row, the roster upsert, and the headshot cleanup's paged reads and removes."""
+    rebuilt = args.get('rebuilt', 0)
+    calls = math.ceil(args.get('responses', 0) / 200) + 2 * rebuilt
+    calls += 2 * math.ceil(rebuilt / min(200, ROSTER_CHUNK))
+    if 'gc_members' in args:
+        calls += args['gc_members'] // PAGE_SIZE + 1 + args['gc_objects'] // PAGE_SIZE + 1
+        calls += math.ceil(args['gc_stale'] / PAGE_SIZE)
+    return calls
+
+@traced(attrs=("form_id", "env"))
+# Drive metadata and download for each of a rebuilt row's two headshots
+@call_budget(google_forms=2, google_drive=lambda args: 4 * args.get('rebuilt', 0),
+             supabase=_eboard_import_budget)
 def retrieve_eboard_responses(form_id: str, credentials=None, env: str = "production"):
     try:
         # ========== TEST MODE ==========
@@ -469,64 +885,132 @@ def retrieve_eboard_responses(form_id: str, credentials=None, env: str = "produc
         if TEST_NETIDS:
             print(f"🧪 TEST MODE: Only processing netids: {TEST_NETIDS}")
         
-        # Process each response
-        for submission in form_responses:
+        question_ids = {
+            'name': name_question_id, 'netid': netid_question_id, 'grad': grad_question_id,
+            'major': major_question_id, 'position': position_question_id, 'interests': interests_question_id,
+            'bio': bio_question_id, 'insta': insta_question_id, 'linkedin': linkedin_question_id,
+            'headshot1': headshot_1_question_id, 'headshot2': headshot_2_question_id,
+        }
+
+        # Only someone's latest response counts, as with sequential upserts
+        latest = {}
+        for i, submission in enumerate(form_responses):
+            netid = _text_answer(submission.get('answers', {}), netid_question_id)
+            latest[netid.strip().lower() if netid else i] = i
+
+        # Responses whose raw answers match the last import skip the headshot
+        # download and upload as well as the upsert
+        answers_hash_key = "eboard_form_answers"
+        stored = _stored_profile_hashes({k for k in latest if isinstance(k, str)}, env)
+        answer_hashes = {}
+        rebuilt = 0
+
+        # Process each response; rows are upserted together after the loop
+        roster = []
+        pending = []  # (item key, dead-letter payload) for each roster row
+        failed = []  # dead-letter entries, written once after the upsert
+        unchanged_rows = 0
+        report_progress("Processing responses", 0, len(form_responses))
+        for i, submission in enumerate(form_responses):
+            report_progress(done=i + 1)
             submission_info = submission.get('answers', {})
-            try:
-                name = submission_info.get(name_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                netid = submission_info.get(netid_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                grad_date = submission_info.get(grad_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                major = submission_info.get(major_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                position = submission_info.get(position_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                interests = submission_info.get(interests_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                bio = submission_info.get(bio_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                insta = submission_info.get(insta_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                linkedin = submission_info.get(linkedin_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                
-                # Clean up all text fields: remove trailing/leading whitespace
-                name = name.strip() if name else None
-                netid = netid.strip() if netid else None
-                grad_date = grad_date.strip() if grad_date else None
-                major = major.strip() if major else None
-                position = position.strip() if position else None
-                bio = bio.strip() if bio else None
-                insta = insta.strip() if insta else None
-                linkedin = linkedin.strip() if linkedin else None
-                
-                # Skip if TEST_NETIDS is set and this netid is not in the list
-                if TEST_NETIDS and netid and netid.lower() not in [n.lower() for n in TEST_NETIDS]:
-                    print(f"⏭️  Skipping {netid} (not in test list)")
-                    continue
-                
-                # Clean up interests field: remove trailing commas, extra spaces, empty items
-                if interests:
-                    # Strip leading/trailing whitespace and commas
-                    interests = interests.strip().strip(',').strip()
-                    # Split by comma, strip each item, and filter out empty items
-                    interests_list = [item.strip() for item in interests.split(',') if item.strip()]
-                    # Rejoin with comma-space for consistency
-                    interests = ', '.join(interests_list) if interests_list else None
-
-                # Process headshot file uploads
-                headshot_url = process_headshot_upload(
-                    headshot_1_question_id, submission_info, netid, 'Primary', credentials, name, env=env
-                )
-                secondary_headshot_url = process_headshot_upload(
-                    headshot_2_question_id, submission_info, netid, 'Secondary', credentials, name, env=env
-                )
+            item_key = submission.get('responseId') or _answers_key(submission_info)
+            netid = _text_answer(submission_info, netid_question_id)
+            netid_key = netid.strip().lower() if netid else None
 
-                add_eboard(netid, name, grad_date, major, position, interests, bio, insta, linkedin, headshot_url, secondary_headshot_url, env=env)
+            # Skip if TEST_NETIDS is set and this netid is not in the list
+            if TEST_NETIDS and netid and netid_key not in [n.lower() for n in TEST_NETIDS]:
+                print(f"⏭️  Skipping {netid} (not in test list)")
+                continue
+            if netid_key and latest[netid_key] != i:
+                continue  # superseded by a later response
+            answers_hash = _answers_hash(submission_info)
+            if netid_key and stored.get(netid_key, {}).get(answers_hash_key) == answers_hash:
+                unchanged_rows += 1
+                continue
+
+            payload = {'answers': submission_info, 'question_ids': question_ids}
+            rebuilt += 1
+            try:
+                member = _eboard_member_from_submission(submission_info, question_ids, credentials, env)
+                roster.append(member)
+                pending.append((item_key, payload))
+                answer_hashes[member['netid']] = answers_hash
             except KeyError as e:
                 print(f"Error processing submission: {e}")
                 continue
             except Exception as e:
-                print(f"Error processing submission for {name or 'unknown'}: {str(e)}")
+                print(f"Error processing submission for {netid or 'unknown'}: {str(e)}")
+                failed.append(("eboard_form", form_id, item_key, payload, e))
                 continue
 
+        budget_counts(responses=len(form_responses), rebuilt=rebuilt)
+
+        summary = None
+        try:
+            summary = upsert_roster_changes(roster, "eboard", env,
+                                            extra_hashes={n: {answers_hash_key: h} for n, h in answer_hashes.items()})
+            summary["unchanged"] += unchanged_rows
+            resolve_failures(env, [failure_id("eboard_form", form_id, key) for key, _ in pending])
+        except Exception as e:
+            print(f"Error upserting eboard roster: {str(e)}")
+            failed.extend(("eboard_form", form_id, key, payload, e) for key, payload in pending)
+        record_failures(env, failed)
+
+        # Drop headshot versions no member points at any more
+        if roster:
+            try:
+                delete_unreferenced_headshots(get_client(env))
+            except Exception as e:
+                print(f"Warning: headshot cleanup failed: {str(e)}")
+
     except Exception as e:
         raise Exception(f"Error retrieving form responses: {str(e)}")
     else:
         print(f"Retrieved and processed {len(form_responses)} eboard responses")
+        return summary
+
+@traced(attrs=("env",))
+def _eboard_member_from_submission(submission_info, question_ids, credentials, env="production"):
+    """Build the eboard members row for one form submission, uploading its headshots."""
+    name = _text_answer(submission_info, question_ids['name'])
+    netid = _text_answer(submission_info, question_ids['netid'])
+    grad_date = _text_answer(submission_info, question_ids['grad'])
+    major = _text_answer(submission_info, question_ids['major'])
+    position = _text_answer(submission_info, question_ids['position'])
+    interests = _text_answer(submission_info, question_ids['interests'])
+    bio = _text_answer(submission_info, question_ids['bio'])
+    insta = _text_answer(submission_info, question_ids['insta'])
+    linkedin = _text_answer(submission_info, question_ids['linkedin'])
+
+    # Clean up all text fields: remove trailing/leading whitespace
+    name = name.strip() if name else None
+    netid = netid.strip() if netid else None
+    grad_date = grad_date.strip() if grad_date else None
+    major = major.strip() if major else None
+    position = position.strip() if position else None
+    bio = bio.strip() if bio else None
+    insta = insta.strip() if insta else None
+    linkedin = linkedin.strip() if linkedin else None
+
+    # Clean up interests field: remove trailing commas, extra spaces, empty items
+    if interests:
+        # Strip leading/trailing whitespace and commas
+        interests = interests.strip().strip(',').strip()
+        # Split by comma, strip each item, and filter out empty items
+        interests_list = [item.strip() for item in interests.split(',') if item.strip()]
+        # Rejoin with comma-space for consistency
+        interests = ', '.join(interests_list) if interests_list else None
+
+    # Process headshot file uploads
+    headshot_url = process_headshot_upload(
+        question_ids['headshot1'], submission_info, netid, 'Primary', credentials, name, env=env
+    )
+    secondary_headshot_url = process_headshot_upload(
+        question_ids['headshot2'], submission_info, netid, 'Secondary', credentials, name, env=env
+    )
+
+    return build_eboard_member(netid, name, grad_date, major, position, interests, bio, insta, linkedin, headshot_url, secondary_headshot_url)
 
 def _extract_drive_file_id(url_str):
     """Extract Google Drive file ID from a Drive URL."""
@@ -545,124 +1029,297 @@ def _extract_drive_file_id(url_str):
             return match.group(1)
     return None
 
-def retrieve_eboard_from_sheet(sheet_id: str, credentials=None, env: str = "production"):
-    """Process eboard members from a Google Sheet (same columns as the form responses)."""
+SHEET_CHUNK_ROWS = 1000  # rows per range in a batchGet
+SHEET_RANGES_PER_CALL = 10  # ranges per batchGet request
+SHEET_STATE_DIR = Path(__file__).parent.parent / 'sheet_state'
+
+def _column_letter(n):
+    """1 -> A, 26 -> Z, 27 -> AA."""
+    letters = ""
+    while n > 0:
+        n, rem = divmod(n - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+@traced(attrs=("sheet_id", "tabs"))
+def _read_sheet_tabs(sheet_id: str, credentials, tabs=None):
+    """
+    Return [(tab title, rows)] for the given tabs of a Google Sheet (default: the first tab).
+
+    Each tab is read across all of its columns in chunks of SHEET_CHUNK_ROWS
+    rows, several chunks per values:batchGet request, so large sheets don't
+    come back as one huge response.
+    """
+    headers = {'Authorization': f'Bearer {credentials.token}'}
+
+    meta_url = f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}"
+    meta_resp = requests.get(meta_url, headers=headers,
+                             params={'fields': 'sheets.properties(title,gridProperties(rowCount,columnCount))'})
+    _check_google_api_response(meta_resp, "Google Sheets metadata request")
+    properties = {s['properties']['title']: s['properties'] for s in meta_resp.json().get('sheets', [])}
+    if not properties:
+        raise Exception("Spreadsheet has no tabs.")
+
+    if not tabs:
+        tabs = [next(iter(properties))]
+    missing = [t for t in tabs if t not in properties]
+    if missing:
+        raise Exception(f"Sheet has no tab named {', '.join(missing)}. Tabs: {', '.join(properties)}")
+
+    result = []
+    for tab in tabs:
+        grid = properties[tab].get('gridProperties', {})
+        row_count = grid.get('rowCount', SHEET_CHUNK_ROWS)
+        last_col = _column_letter(max(grid.get('columnCount', 26), 1))
+        ranges = [f"'{tab}'!A{start}:{last_col}{min(start + SHEET_CHUNK_ROWS - 1, row_count)}"
+                  for start in range(1, row_count + 1, SHEET_CHUNK_ROWS)]
+        print(f"Reading sheet tab '{tab}': {row_count} rows x {last_col} in {len(ranges)} chunk(s)")
+
+        rows = []
+        for i in range(0, len(ranges), SHEET_RANGES_PER_CALL):
+            resp = requests.get(f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}/values:batchGet",
+                                headers=headers,
+                                params={'ranges': ranges[i:i + SHEET_RANGES_PER_CALL], 'majorDimension': 'ROWS'})
+            _check_google_api_response(resp, "Google Sheets request")
+            for value_range in resp.json().get('valueRanges', []):
+                rows.extend(value_range.get('values', []))
+        result.append((tab, rows))
+    return result
+
+def _read_first_sheet(sheet_id: str, credentials):
+    """Return all rows (header first) of the first tab of a Google Sheet."""
+    return _read_sheet_tabs(sheet_id, credentials)[0][1]
+
+@traced(attrs=("file_id",))
+def _drive_modified_time(file_id: str, credentials):
+    """The file's Drive modifiedTime, or None if Drive won't say."""
     try:
-        if not credentials:
-            raise ValueError("Credentials are required")
+        resp = requests.get(f"https://www.googleapis.com/drive/v3/files/{file_id}",
+                            headers={'Authorization': f'Bearer {credentials.token}'},
+                            params={'fields': 'modifiedTime', 'supportsAllDrives': 'true'})
+        _check_google_api_response(resp, "Drive metadata request")
+        return resp.json().get('modifiedTime')
+    except Exception as e:
+        print(f"Warning: could not read modified time for {file_id}: {str(e)}")
+        return None
 
-        token = credentials.token
-        headers = {'Authorization': f'Bearer {token}'}
-
-        # Get spreadsheet metadata to find all sheet names
-        meta_url = f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}?fields=sheets.properties"
-        meta_resp = requests.get(meta_url, headers=headers)
-        _check_google_api_response(meta_resp, "Google Sheets metadata request")
-        sheets_info = meta_resp.json().get('sheets', [])
-
-        # Use the first sheet by default
-        sheet_name = sheets_info[0]['properties']['title'] if sheets_info else 'Sheet1'
-        print(f"Reading from sheet tab: '{sheet_name}'")
-
-        # Read all data from that sheet
-        url = f"https://sheets.googleapis.com/v4/spreadsheets/{sheet_id}/values/'{sheet_name}'!A:Z"
-        resp = requests.get(url, headers=headers)
-        _check_google_api_response(resp, "Google Sheets request")
-        data = resp.json()
-        rows = data.get('values', [])
-
-        if len(rows) < 2:
-            raise Exception("Sheet has no data rows (only header or empty).")
+def _load_sheet_state(env):
+    try:
+        return json.loads((SHEET_STATE_DIR / f"{env}.json").read_text())
+    except (FileNotFoundError, ValueError):
+        return {}
+
+def _save_sheet_state(env, state):
+    SHEET_STATE_DIR.mkdir(exist_ok=True)
+    path = SHEET_STATE_DIR / f"{env}.json"
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(state, indent=2))
+    os.replace(tmp, path)
+
+def _sheet_row_hash(header, row):
+    """Hash of a raw sheet row and the header it was read under."""
+    cells = list(row)
+    while cells and not (cells[-1] or '').strip():
+        cells.pop()
+    blob = json.dumps([header, cells], separators=(",", ":"))
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+def _eboard_sheet_columns(header_row):
+    """Map eboard fields to column indices using the same fuzzy matching as the form version."""
+    header = [h.lower().strip() for h in header_row]
+    col = {}
+    for i, title in enumerate(header):
+        if 'full name' in title or ('name' in title and 'net' not in title and 'instagram' not in title and 'linkedin' not in title and 'position' not in title):
+            col.setdefault('name', i)
+        elif 'netid' in title or 'net id' in title:
+            col.setdefault('netid', i)
+        elif 'graduation' in title or ('grad' in title and 'instagram' not in title):
+            col.setdefault('grad', i)
+        elif 'position' in title or 'role' in title or 'title' in title:
+            col.setdefault('position', i)
+        elif 'headshot' in title and 'second' not in title:
+            col.setdefault('headshot1', i)
+        elif 'second' in title and ('photo' in title or 'picture' in title or 'headshot' in title):
+            col.setdefault('headshot2', i)
+        elif 'interested in' in title or 'ask about' in title:
+            col.setdefault('interests', i)
+        elif 'majors and year' in title or ('major' in title and 'year' in title):
+            col.setdefault('major', i)
+        elif 'instagram' in title:
+            col.setdefault('insta', i)
+        elif 'linkedin' in title:
+            col.setdefault('linkedin', i)
+        elif 'short bio' in title or 'bio' in title:
+            col.setdefault('bio', i)
+    print(f"Sheet headers: {header}")
+    print(f"Sheet columns mapped: {col}")
+    return col
+
+def _sheet_cell(row, col, key):
+    idx = col.get(key)
+    if idx is None or idx >= len(row):
+        return None
+    val = row[idx].strip() if row[idx] else None
+    return val
+
+@traced(attrs=("env",))
+def _eboard_member_from_row(row, col, credentials, env="production"):
+    """Build the eboard members row for one sheet row, uploading its Drive headshots."""
+    name = _sheet_cell(row, col, 'name')
+    netid = _sheet_cell(row, col, 'netid')
+    grad_date = _sheet_cell(row, col, 'grad')
+    major = _sheet_cell(row, col, 'major')
+    position = _sheet_cell(row, col, 'position')
+    interests = _sheet_cell(row, col, 'interests')
+    bio = _sheet_cell(row, col, 'bio')
+    insta = _sheet_cell(row, col, 'insta')
+    linkedin = _sheet_cell(row, col, 'linkedin')
+
+    # Process headshots from Drive links
+    headshot_url = None
+    headshot1_link = _sheet_cell(row, col, 'headshot1')
+    if headshot1_link:
+        file_id = _extract_drive_file_id(headshot1_link)
+        if file_id:
+            headshot_url = download_and_upload_headshot(
+                file_id, netid, 'Primary', credentials, name or netid, env=env
+            )
 
-        # Map column headers to indices using same fuzzy matching as form version
-        header = [h.lower().strip() for h in rows[0]]
-        col = {}
-        for i, title in enumerate(header):
-            if 'full name' in title or ('name' in title and 'net' not in title and 'instagram' not in title and 'linkedin' not in title and 'position' not in title):
-                col.setdefault('name', i)
-            elif 'netid' in title or 'net id' in title:
-                col.setdefault('netid', i)
-            elif 'graduation' in title or ('grad' in title and 'instagram' not in title):
-                col.setdefault('grad', i)
-            elif 'position' in title or 'role' in title or 'title' in title:
-                col.setdefault('position', i)
-            elif 'headshot' in title and 'second' not in title:
-                col.setdefault('headshot1', i)
-            elif 'second' in title and ('photo' in title or 'picture' in title or 'headshot' in title):
-                col.setdefault('headshot2', i)
-            elif 'interested in' in title or 'ask about' in title:
-                col.setdefault('interests', i)
-            elif 'majors and year' in title or ('major' in title and 'year' in title):
-                col.setdefault('major', i)
-            elif 'instagram' in title:
-                col.setdefault('insta', i)
-            elif 'linkedin' in title:
-                col.setdefault('linkedin', i)
-            elif 'short bio' in title or 'bio' in title:
-                col.setdefault('bio', i)
+    secondary_headshot_url = None
+    headshot2_link = _sheet_cell(row, col, 'headshot2')
+    if headshot2_link:
+        file_id = _extract_drive_file_id(headshot2_link)
+        if file_id:
+            secondary_headshot_url = download_and_upload_headshot(
+                file_id, netid, 'Secondary', credentials, name or netid, env=env
+            )
 
-        print(f"Sheet headers: {header}")
-        print(f"Sheet columns mapped: {col}")
-        print(f"Sheet data rows: {len(rows) - 1}")
+    return build_eboard_member(netid, name, grad_date, major, position, interests, bio, insta, linkedin, headshot_url, secondary_headshot_url)
 
-        if 'name' not in col or 'netid' not in col:
-            raise Exception(f"Could not find name or netid columns in sheet headers: {rows[0]}")
+@traced(attrs=("sheet_id", "tabs", "force", "env"))
+def retrieve_eboard_from_sheet(sheet_id: str, credentials=None, env: str = "production", tabs=None, force: bool = False):
+    """
+    Process eboard members from a Google Sheet (same columns as the form responses).
 
-        def get_cell(row, key):
-            idx = col.get(key)
-            if idx is None or idx >= len(row):
-                return None
-            val = row[idx].strip() if row[idx] else None
-            return val
+    tabs names the tabs to read (default: the first one). The run is skipped
+    when the sheet's Drive modifiedTime matches the last import and every row
+    imported then is still stored; otherwise only rows whose raw contents
+    changed since they were last imported go on to the headshot and upsert
+    stages. force reprocesses every row.
 
+    Returns the upsert_roster_changes summary plus 'skipped' (True when the
+    sheet was unchanged and nothing was read).
+    """
+    try:
+        if not credentials:
+            raise ValueError("Credentials are required")
+        tabs = [t for t in (tabs or []) if t] or None
+        row_hash_key = "eboard_sheet_row"
+
+        # Nothing changed since the last import: skip it, unless the
+        # environment has since lost those rows (e.g. a restore or pull)
+        state = _load_sheet_state(env)
+        previous = state.get(sheet_id, {})
+        modified_time = _drive_modified_time(sheet_id, credentials)
+        if (not force and modified_time and previous.get('modified_time') == modified_time
+                and previous.get('tabs') == tabs):
+            stored = _stored_profile_hashes(previous.get('row_hashes', {}), env)
+            if all(stored.get(n, {}).get(row_hash_key) == h for n, h in previous.get('row_hashes', {}).items()):
+                print(f"Sheet {sheet_id} unchanged since {modified_time}; skipping")
+                return {"new": 0, "changed": 0, "unchanged": len(previous.get('row_hashes', {})), "skipped": True}
+
+        report_progress("Reading sheet")
+        candidates = []  # (netid, row hash, row, columns) across every tab
+        for tab, rows in _read_sheet_tabs(sheet_id, credentials, tabs):
+            if len(rows) < 2:
+                print(f"Sheet tab '{tab}' has no data rows; skipping it")
+                continue
+            col = _eboard_sheet_columns(rows[0])
+            print(f"Sheet tab '{tab}' data rows: {len(rows) - 1}")
+            if 'name' not in col or 'netid' not in col:
+                raise Exception(f"Could not find name or netid columns in sheet headers of '{tab}': {rows[0]}")
+            for row in rows[1:]:
+                netid = _sheet_cell(row, col, 'netid')
+                if netid:
+                    candidates.append((netid.lower(), _sheet_row_hash(rows[0], row), row, col))
+
+        if not candidates:
+            raise Exception("Sheet has no data rows (only header or empty).")
+
+        stored = {} if force else _stored_profile_hashes({netid for netid, _, _, _ in candidates}, env)
+        row_hashes = {}
         processed = 0
         errors = 0
-        for row in rows[1:]:
+        unchanged_rows = 0
+        roster = []
+        pending = []  # (item key, dead-letter payload) for each roster row
+        failed = []  # dead-letter entries, written once after the upsert
+        report_progress("Processing rows", 0, len(candidates))
+        for i, (netid, row_hash, row, col) in enumerate(candidates, start=1):
+            report_progress(done=i)
+            if stored.get(netid, {}).get(row_hash_key) == row_hash:
+                # Same row as last import: no headshot download, no upsert
+                unchanged_rows += 1
+                row_hashes[netid] = row_hash
+                continue
+            payload = {'row': row, 'columns': col}
             try:
-                name = get_cell(row, 'name')
-                netid = get_cell(row, 'netid')
-                if not netid:
-                    continue
-
-                grad_date = get_cell(row, 'grad')
-                major = get_cell(row, 'major')
-                position = get_cell(row, 'position')
-                interests = get_cell(row, 'interests')
-                bio = get_cell(row, 'bio')
-                insta = get_cell(row, 'insta')
-                linkedin = get_cell(row, 'linkedin')
-
-                # Process headshots from Drive links
-                headshot_url = None
-                headshot1_link = get_cell(row, 'headshot1')
-                if headshot1_link:
-                    file_id = _extract_drive_file_id(headshot1_link)
-                    if file_id:
-                        headshot_url = download_and_upload_headshot(
-                            file_id, netid, 'Primary', credentials, name or netid, env=env
-                        )
-
-                secondary_headshot_url = None
-                headshot2_link = get_cell(row, 'headshot2')
-                if headshot2_link:
-                    file_id = _extract_drive_file_id(headshot2_link)
-                    if file_id:
-                        secondary_headshot_url = download_and_upload_headshot(
-                            file_id, netid, 'Secondary', credentials, name or netid, env=env
-                        )
-
-                add_eboard(netid, name, grad_date, major, position, interests, bio, insta, linkedin, headshot_url, secondary_headshot_url, env=env)
-                processed += 1
+                roster.append(_eboard_member_from_row(row, col, credentials, env))
+                pending.append((netid, payload))
+                row_hashes[netid] = row_hash
             except Exception as e:
-                print(f"Error processing row for {get_cell(row, 'name') or 'unknown'}: {str(e)}")
+                print(f"Error processing row for {_sheet_cell(row, col, 'name') or 'unknown'}: {str(e)}")
                 errors += 1
+                row_hashes.pop(netid, None)
+                failed.append(("eboard_sheet", sheet_id, netid, payload, e))
                 continue
 
-        print(f"Sheet processing complete: {processed} succeeded, {errors} errors")
+        summary = None
+        try:
+            summary = upsert_roster_changes(roster, "eboard", env,
+                                            extra_hashes={m['netid']: {row_hash_key: row_hashes[m['netid']]}
+                                                          for m in roster if m['netid'] in row_hashes})
+            summary["unchanged"] += unchanged_rows
+            processed = len(roster)
+            resolve_failures(env, [failure_id("eboard_sheet", sheet_id, key) for key, _ in pending])
+            if not errors and modified_time:
+                state[sheet_id] = {'modified_time': modified_time, 'tabs': tabs, 'row_hashes': row_hashes}
+                _save_sheet_state(env, state)
+        except Exception as e:
+            print(f"Error upserting eboard roster: {str(e)}")
+            errors += len(roster)
+            failed.extend(("eboard_sheet", sheet_id, key, payload, e) for key, payload in pending)
+        record_failures(env, failed)
+
+        print(f"Sheet processing complete: {processed} processed, {unchanged_rows} unchanged rows skipped, {errors} errors")
+
+        # Drop headshot versions no member points at any more
+        if roster:
+            try:
+                delete_unreferenced_headshots(get_client(env))
+            except Exception as e:
+                print(f"Warning: headshot cleanup failed: {str(e)}")
 
     except Exception as e:
         raise Exception(f"Error processing sheet: {str(e)}")
-
+    if summary is not None:
+        summary["skipped"] = False
+    return summary
+
+def _ta_member_from_submission(submission_info, question_ids):
+    """Build the TA members row for one form submission."""
+    name = _text_answer(submission_info, question_ids['name'])
+    netid = _text_answer(submission_info, question_ids['netid'])
+    grad_date = _text_answer(submission_info, question_ids['grad'])
+    course = _text_answer(submission_info, question_ids['course'])
+    office_hours = _text_answer(submission_info, question_ids['office_hours'])
+    review_session = _text_answer(submission_info, question_ids['review_session'])
+    return build_ta_member(netid, name, grad_date, course, office_hours, review_session)
+
+@traced(attrs=("form_id", "env"))
+# Stored hashes and upsert, one round trip each per chunk of responses
+@call_budget(google_forms=2,
+             supabase=lambda args: 2 * math.ceil(args.get('responses', 0) / min(200, ROSTER_CHUNK)))
 def retrieve_ta_responses(form_id: str, credentials=None, env: str = "production"):
     try:
         # If credentials provided, use them. Otherwise use existing token logic
@@ -710,27 +1367,49 @@ def retrieve_ta_responses(form_id: str, credentials=None, env: str = "production
         _check_google_api_response(request, "Form responses request")
         response = json.loads(request.text)
         form_responses = response.get('responses', [])
+        budget_counts(responses=len(form_responses))
 
-        # Process each response
-        for submission in form_responses:
+        question_ids = {
+            'name': name_question_id, 'netid': netid_question_id, 'grad': grad_question_id,
+            'course': class_question_id, 'office_hours': office_hours_question_id,
+            'review_session': review_session_question_id,
+        }
+
+        # Process each response; rows are upserted together after the loop
+        roster = []
+        pending = []  # (item key, dead-letter payload) for each roster row
+        failed = []  # dead-letter entries, written once after the upsert
+        report_progress("Processing responses", 0, len(form_responses))
+        for i, submission in enumerate(form_responses, start=1):
+            report_progress(done=i)
             submission_info = submission.get('answers', {})
+            item_key = submission.get('responseId') or _answers_key(submission_info)
+            payload = {'answers': submission_info, 'question_ids': question_ids}
             try:
-                name = submission_info.get(name_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                netid = submission_info.get(netid_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                grad_date = submission_info.get(grad_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                course = submission_info.get(class_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                office_hours = submission_info.get(office_hours_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-                review_session = submission_info.get(review_session_question_id, {}).get('textAnswers', {}).get('answers', [{}])[0].get('value', None)
-
-                add_ta(netid, name, grad_date, course, office_hours, review_session, env=env)
+                roster.append(_ta_member_from_submission(submission_info, question_ids))
+                pending.append((item_key, payload))
             except KeyError as e:
                 print(f"Error processing submission: {e}")
                 continue
+            except Exception as e:
+                print(f"Error processing TA submission {item_key}: {str(e)}")
+                failed.append(("ta_form", form_id, item_key, payload, e))
+                continue
+
+        try:
+            summary = upsert_roster_changes(roster, "ta", env)
+            resolve_failures(env, [failure_id("ta_form", form_id, key) for key, _ in pending])
+        except Exception as e:
+            failed.extend(("ta_form", form_id, key, payload, e) for key, payload in pending)
+            raise Exception(f"Error adding TAs: {str(e)}")
+        finally:
+            record_failures(env, failed)
 
     except Exception as e:
         raise Exception(f"Error retrieving form responses: {str(e)}")
     else:
         print(f"Retrieved and processed {len(form_responses)} ta responses")
+        return summary
 
 def is_integer_string(s):
         try:
@@ -739,41 +1418,111 @@ def is_integer_string(s):
         except ValueError:
             return False
 
-def add_ta(netid: str = None, name: str = None, grad_date: str = None, course: str = None,
-           office_hours : str = None, review_session : str = None, env: str = "production"):
-    try:
-        sb = get_client(env)
-        semester = current_semester()
-        member_data = {
-                'netid': netid.lower(),
-                'first_name': name.split()[0],
-                'last_name': " ".join(name[1:]) if len(name.split()) > 1 else '',
-                'graduation_year': grad_date if is_integer_string(grad_date) else None,
-                # 'course': course,
-                'office_hours': office_hours,
-                'review_sessions': review_session,
-                'ta_semester': semester
-            }
+ROSTER_CHUNK = 100
 
-        response = (
-            sb.table("members")
-            .upsert(member_data, on_conflict=["netid"])
-            .execute()
-            )
 
-        row = sb.table("members").select("role").eq("netid", netid.lower()).single().execute()
-        if row.data:
-            existing_list = row.data["role"] or []  # Handle NULL case
-        else:
-            existing_list = []
-        if "ta" in existing_list:
-            data = {'role': existing_list}
+@traced(attrs=("members", "role", "env"))
+@call_budget(supabase=lambda args: math.ceil(len(args['members']) / ROSTER_CHUNK))
+def upsert_roster(members, role: str, env: str = "production"):
+    """
+    Upsert many member rows and add `role` to each in one round trip per chunk.
+
+    Uses the upsert_members_with_role database function, which only writes the
+    columns each row carries and merges the role under the row lock, so
+    concurrent imports can't drop each other's roles. Returns the stored rows.
+    """
+    sb = get_client(env)
+    stored = []
+    report_progress("Saving roster", 0, len(members))
+    for i in range(0, len(members), ROSTER_CHUNK):
+        chunk = members[i:i + ROSTER_CHUNK]
+        rows = sb.rpc("upsert_members_with_role", {"p_members": chunk, "p_role": role}).execute().data or []
+        report_progress(done=i + len(chunk))
+        for row in rows:
+            remember_member(env, row)
+        stored.extend(rows)
+    return stored
+
+def _profile_hash(member, role):
+    """Stable hash of a normalized roster row, used to detect unchanged answers."""
+    blob = json.dumps({"role": role, **member}, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(blob.encode()).hexdigest()
+
+@traced(attrs=("netids", "env"))
+def _stored_profile_hashes(netids, env):
+    """Return {netid: profile_hashes} for the netids that exist, one query per 200."""
+    sb = get_client(env)
+    stored = {}
+    netids = sorted(netids)
+    for i in range(0, len(netids), 200):
+        rows = sb.table("members").select("netid, profile_hashes").in_("netid", netids[i:i + 200]).execute().data or []
+        for row in rows:
+            stored[row['netid']] = row.get('profile_hashes') or {}
+    return stored
+
+@traced(attrs=("members", "role", "env"))
+@call_budget(supabase=lambda args: 2 * math.ceil(len(args['members']) / min(200, ROSTER_CHUNK)))
+def upsert_roster_changes(members, role: str, env: str = "production", extra_hashes=None):
+    """
+    Upsert only the roster rows whose normalized profile actually changed.
+
+    Each row is hashed and compared against the hash stored for this role in
+    members.profile_hashes (fetched in bulk, one query per 200 netids).
+    Unchanged members are skipped entirely, so re-running an import does
+    almost no writes. Later rows for the same netid win, as with sequential
+    upserts. extra_hashes ({netid: {key: hash}}) are stored alongside the
+    role hash and a row is also rewritten when one of them changed.
+
+    Returns {"new": n, "changed": n, "unchanged": n}.
+    """
+    latest = {}
+    for member in members:
+        latest[member['netid']] = member
+    extra_hashes = extra_hashes or {}
+
+    stored = _stored_profile_hashes(latest, env)
+
+    summary = {"new": 0, "changed": 0, "unchanged": 0}
+    to_write = []
+    for netid, member in latest.items():
+        hashes = {role: _profile_hash(member, role), **extra_hashes.get(netid, {})}
+        if netid not in stored:
+            summary["new"] += 1
+        elif all(stored[netid].get(k) == v for k, v in hashes.items()):
+            summary["unchanged"] += 1
+            continue
         else:
-            data = {'role': existing_list + ["ta"]}
-        sb.table("members").update(data).eq("netid", netid.lower()).execute()
+            summary["changed"] += 1
+        to_write.append({**member, 'profile_hashes': hashes})
+
+    upsert_roster(to_write, role, env)
+    print(f"{role} roster: {summary['new']} new, {summary['changed']} changed, {summary['unchanged']} unchanged")
+    return summary
+
+def build_ta_member(netid: str = None, name: str = None, grad_date: str = None, course: str = None,
+                    office_hours: str = None, review_session: str = None):
+    """Build the members row for a TA form response."""
+    return {
+            'netid': netid.lower(),
+            'first_name': name.split()[0],
+            'last_name': " ".join(name[1:]) if len(name.split()) > 1 else '',
+            'graduation_year': grad_date if is_integer_string(grad_date) else None,
+            'course': course,
+            'office_hours': office_hours,
+            'review_sessions': review_session,
+            'ta_semester': current_semester()
+        }
+
+@traced(attrs=("netid", "env"))
+@call_budget(supabase=1)
+def add_ta(netid: str = None, name: str = None, grad_date: str = None, course: str = None,
+           office_hours : str = None, review_session : str = None, env: str = "production"):
+    try:
+        member_data = build_ta_member(netid, name, grad_date, course, office_hours, review_session)
+        rows = upsert_roster([member_data], "ta", env)
 
         print(f"Added {name} to ta directory")
-        return response.data
+        return rows
     
     except Exception as e:
         raise Exception(f"Error adding {name} as a TA: {str(e)}")
@@ -915,65 +1664,60 @@ def normalize_position(position: str) -> str:
     # Return original if no match found
     return position
 
+def build_eboard_member(netid: str = None, name: str = None, grad_date: str = None, major: str = None,
+                        position: str = None, interests: str = None, bio: str = None, insta=None, linkedin=None,
+                        headshot_url=None, secondary_headshot_url=None):
+    """Build the members row for an eboard form or sheet response."""
+    # Handle name parsing safely
+    first_name = ''
+    last_name = ''
+    if name:
+        name_parts = name.split()
+        first_name = name_parts[0] if name_parts else ''
+        last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else ''
+
+    member_data = {
+            'netid': netid.lower() if netid else '',
+            'first_name': first_name,
+            'last_name': last_name,
+            'graduation_year': grad_date,
+            'major': major,
+            'position': normalize_position(position),
+            'ask_about': interests.split(',') if interests else [],
+            'bio': bio,
+            'linkedin_url': linkedin,
+            'instagram_url': insta
+        }
+
+    # Add headshot keys if provided (otherwise the stored ones are kept)
+    if headshot_url:
+        member_data['headshot_url'] = headshot_url
+    if secondary_headshot_url:
+        member_data['secondary_headshot_url'] = secondary_headshot_url
+    return member_data
+
+@traced(attrs=("netid", "env"))
+@call_budget(supabase=1)
 def add_eboard(netid: str = None, name: str = None, grad_date: str = None, major: str = None,
                position: str = None, interests: str = None, bio: str = None, insta=None, linkedin=None,
                headshot_url=None, secondary_headshot_url=None, env: str = "production"):
+    member_data = build_eboard_member(netid, name, grad_date, major, position, interests, bio,
+                                      insta, linkedin, headshot_url, secondary_headshot_url)
     try:
-        sb = get_client(env)
-        semester = current_semester()
-
-        # Handle name parsing safely
-        first_name = ''
-        last_name = ''
-        if name:
-            name_parts = name.split()
-            first_name = name_parts[0] if name_parts else ''
-            last_name = " ".join(name_parts[1:]) if len(name_parts) > 1 else ''
-
-        # Normalize the position
-        normalized_position = normalize_position(position)
-
-        member_data = {
-                'netid': netid.lower() if netid else '',
-                'first_name': first_name,
-                'last_name': last_name,
-                'graduation_year': grad_date,
-                'major': major,
-                'position': normalized_position,
-                'ask_about': interests.split(',') if interests else [],
-                'bio': bio,
-                'linkedin_url': linkedin,
-                'instagram_url': insta
-            }
-
-        # Add headshot URLs if provided
-        if headshot_url:
-            member_data['headshot_url'] = headshot_url
-        if secondary_headshot_url:
-            member_data['secondary_headshot_url'] = secondary_headshot_url
-
-        response = (
-            sb.table("members")
-            .upsert(member_data, on_conflict=["netid"])
-            .execute()
-            )
-
-        # Add "eboard" to role list without overwriting existing roles
-        row = sb.table("members").select("role").eq("netid", (netid.lower() if netid else '')).single().execute()
-        existing_list = row.data["role"] or [] if row.data else []
-        if "eboard" not in existing_list:
-            sb.table("members").update({"role": existing_list + ["eboard"]}).eq("netid", (netid.lower() if netid else '')).execute()
+        rows = upsert_roster([member_data], "eboard", env)
 
         print(f"Added {name} to eboard")
-        return response.data
+        return rows
     
     except Exception as e:
-        pass
-        # raise Exception(f"Error adding/updating points for {name}: {str(e)}")
+        print(f"Error adding {name} to eboard: {str(e)}")
+        if netid:
+            record_failure(env, "eboard_member", "add_eboard", netid.lower(), {'member': member_data}, e)
     
     
 # Get points via the responses object from Google Forms
 # This is good to use when collecting responses from an event that copied the base template
+@traced(attrs=("form_id", "env"))
 def add_members(form_id: str, points_to_add: int, credentials=None, env: str = "production"):
     try:
         # If credentials provided, use them. Otherwise use existing token logic
@@ -1032,8 +1776,10 @@ def add_members(form_id: str, points_to_add: int, credentials=None, env: str = "
         print(f"Retrieved and processed {len(form_responses)} member responses")
 
 
+@traced(attrs=("env",))
 def add_event(name: str = None, description: str = None, flyer_url: str = None, insta=None,
-              month: str = None, day: str = None, year: str = None, env: str = "production"):
+              month: str = None, day: str = None, year: str = None, env: str = "production",
+              credentials=None):
     try:
         sb = get_client(env)
         # Convert date strings to datetime object
@@ -1054,6 +1800,11 @@ def add_event(name: str = None, description: str = None, flyer_url: str = None,
             'semester':semester
         }
 
+        # Drive-hosted flyers get resized copies in our own bucket
+        flyer_images = ingest_flyer(flyer_url, credentials, name, env=env)
+        if flyer_images:
+            event_data['flyer_images'] = flyer_images
+
         response = (
             sb.table("events")
             .insert(event_data)
@@ -1063,4 +1814,65 @@ def add_event(name: str = None, description: str = None, flyer_url: str = None,
         print(f"Added event: {name}")
         return response.data
     except Exception as e:
-        raise Exception(f"Error adding event {name}: {str(e)}")
\ No newline at end of file
+        raise Exception(f"Error adding event {name}: {str(e)}")
+
+@traced(attrs=("env",))
+def retry_failed_responses(credentials=None, env: str = "production"):
+    """
+    Replay only the items in the dead-letter store for env.
+
+    Event awards are retried one at a time; roster rows are rebuilt from their
+    raw submissions and upserted together per role.  Items that go through are
+    removed from the store; the rest stay with their attempt count bumped.
+
+    Returns {"retried": n, "succeeded": n, "failed": n}.
+    """
+    entries = list_failures(env)
+    report = {"retried": len(entries), "succeeded": 0, "failed": 0}
+    resolved = []
+    failed = []
+    rosters = {"eboard": [], "ta": []}  # role -> [(entry, member row)]
+
+    for entry in entries:
+        payload = entry['payload']
+        try:
+            if entry['kind'] == 'event_points':
+                _award_event_submission(payload['answers'], payload['question_ids'],
+                                        payload['points'], payload['reason'], env)
+                resolved.append(entry['id'])
+            elif entry['kind'] == 'points_row':
+                add_or_update_points(netid=payload['netid'], points_to_add=payload['points'],
+                                     reason=payload['reason'], name=payload.get('name'), env=env)
+                resolved.append(entry['id'])
+            elif entry['kind'] == 'eboard_form':
+                rosters['eboard'].append((entry, _eboard_member_from_submission(
+                    payload['answers'], payload['question_ids'], credentials, env)))
+            elif entry['kind'] == 'eboard_sheet':
+                rosters['eboard'].append((entry, _eboard_member_from_row(
+                    payload['row'], payload['columns'], credentials, env)))
+            elif entry['kind'] == 'eboard_member':
+                rosters['eboard'].append((entry, payload['member']))
+            elif entry['kind'] == 'ta_form':
+                rosters['ta'].append((entry, _ta_member_from_submission(payload['answers'], payload['question_ids'])))
+            else:
+                raise Exception(f"Unknown failure kind '{entry['kind']}'")
+        except Exception as e:
+            print(f"Retry failed for {entry['kind']} {entry['key']}: {str(e)}")
+            failed.append((entry['kind'], entry['source'], entry['key'], payload, e))
+            report['failed'] += 1
+
+    for role, items in rosters.items():
+        if not items:
+            continue
+        try:
+            upsert_roster_changes([member for _, member in items], role, env)
+            resolved.extend(entry['id'] for entry, _ in items)
+        except Exception as e:
+            print(f"Retry failed for {role} roster: {str(e)}")
+            failed.extend((entry['kind'], entry['source'], entry['key'], entry['payload'], e) for entry, _ in items)
+            report['failed'] += len(items)
+
+    record_failures(env, failed)
+    report['succeeded'] = resolve_failures(env, resolved)
+    print(f"Retried {report['retried']} failed items: {report['succeeded']} succeeded, {report['failed']} still failing")
+    return report
@@ -0,0 +1,163 @@
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone
+from supabase_clients import get_client, iter_pages, resolve_storage_url
+from point_service import current_semester
+
+# Public site data lives at fixed paths in this bucket, so browsers and the CDN
+# revalidate it (by ETag) after a short max-age instead of caching forever.
+SITE_BUCKET = "site"
+SITE_PREFIX = "data"
+SITE_CACHE_CONTROL = "300"
+
+# Display order for eboard positions (values produced by normalize_position);
+# anything not listed sorts after these, alphabetically.
+POSITION_ORDER = [
+    "President", "Co-President", "Vice-President", "Treasurer", "Secretary",
+    "Academic", "Alumni", "Corporate", "Design", "Events", "Mentorship", "Outreach",
+    "Professional Development", "Public Relations", "Social", "Web Development",
+    "Freshman Representative",
+]
+
+MEMBER_COLUMNS = ("netid, first_name, last_name, role, position, major, graduation_year, bio, ask_about, "
+                  "linkedin_url, instagram_url, headshot_url, secondary_headshot_url, "
+                  "course, office_hours, review_sessions, ta_semester")
+EVENT_COLUMNS = "id, name, description, date, semester, flyer_url, flyer_images, instagram_url"
+
+_lock = threading.Lock()
+_published = {}  # env -> {object name -> sha256 of the last upload}
+
+
+def _full_name(member):
+    return " ".join(p for p in (member.get("first_name"), member.get("last_name")) if p)
+
+
+def _position_rank(position):
+    try:
+        return (POSITION_ORDER.index(position), "")
+    except ValueError:
+        return (len(POSITION_ORDER), (position or "").lower())
+
+
+def build_eboard_document(members, env="production"):
+    """The eboard roster, ordered by position then name, with headshot URLs resolved."""
+    eboard = [m for m in members if "eboard" in (m.get("role") or [])]
+    eboard.sort(key=lambda m: (_position_rank(m.get("position")), _full_name(m).lower()))
+    return {"members": [{
+        "name": _full_name(m),
+        "position": m.get("position"),
+        "major": m.get("major"),
+        "graduation_year": m.get("graduation_year"),
+        "bio": m.get("bio"),
+        "ask_about": m.get("ask_about") or [],
+        "linkedin_url": m.get("linkedin_url"),
+        "instagram_url": m.get("instagram_url"),
+        "headshot_url": resolve_storage_url(m.get("headshot_url"), env),
+        "secondary_headshot_url": resolve_storage_url(m.get("secondary_headshot_url"), env),
+    } for m in eboard]}
+
+
+def build_ta_document(members, semester=None):
+    """This semester's TAs grouped by course (sorted), each with office hours and review sessions."""
+    semester = semester or current_semester()
+    courses = {}
+    for m in members:
+        if "ta" not in (m.get("role") or []) or m.get("ta_semester") != semester:
+            continue
+        courses.setdefault((m.get("course") or "Other").strip(), []).append({
+            "name": _full_name(m),
+            "office_hours": m.get("office_hours"),
+            "review_sessions": m.get("review_sessions"),
+        })
+    return {"semester": semester, "courses": [
+        {"course": course, "tas": sorted(tas, key=lambda t: t["name"].lower())}
+        for course, tas in sorted(courses.items(), key=lambda kv: kv[0].lower())
+    ]}
+
+
+def build_events_document(events, env="production", now=None):
+    """Events grouped by semester, each split into upcoming (soonest first) and past (latest first)."""
+    today = (now or datetime.now(timezone.utc)).date().isoformat()
+    semesters = {}
+    for ev in events:
+        date = (ev.get("date") or "")[:10]
+        flyers = {width: resolve_storage_url(key, env, bucket="flyers")
+                  for width, key in (ev.get("flyer_images") or {}).items()}
+        entry = {
+            "id": ev.get("id"),
+            "name": ev.get("name"),
+            "description": ev.get("description"),
+            "date": date,
+            "flyer_url": ev.get("flyer_url"),
+            "flyer_images": flyers,
+            "instagram_url": ev.get("instagram_url"),
+        }
+        group = semesters.setdefault(ev.get("semester") or "", {"upcoming": [], "past": []})
+        group["upcoming" if date >= today else "past"].append(entry)
+
+    for group in semesters.values():
+        group["upcoming"].sort(key=lambda e: e["date"])
+        group["past"].sort(key=lambda e: e["date"], reverse=True)
+    return {"as_of": today, "semesters": semesters}
+
+
+def _encode(document):
+    return json.dumps(document, separators=(",", ":"), sort_keys=True, default=str).encode()
+
+
+def publish_site(env: str = "production"):
+    """
+    Rebuild the public site's JSON and upload whatever changed.
+
+    Reads members and events with one paged scan each and writes
+    eboard.json, tas.json and events.json under site/data/, plus a
+    manifest.json listing each file's sha256 (usable as a version for cache
+    busting).  Files whose bytes match the last upload from this process are
+    skipped.  Run after ingestion or sync; the public site then needs no
+    database reads.
+    """
+    results = {"uploaded": [], "unchanged": [], "errors": []}
+
+    try:
+        sb = get_client(env)
+        members = [m for page in iter_pages(sb, "members", MEMBER_COLUMNS) for m in page]
+        events = [e for page in iter_pages(sb, "events", EVENT_COLUMNS) for e in page]
+
+        files = {
+            "eboard.json": _encode(build_eboard_document(members, env)),
+            "tas.json": _encode(build_ta_document(members)),
+            "events.json": _encode(build_events_document(events, env)),
+        }
+        digests = {name: hashlib.sha256(data).hexdigest() for name, data in files.items()}
+
+        with _lock:
+            previous = dict(_published.get(env, {}))
+
+        bucket = sb.storage.from_(SITE_BUCKET)
+        for name, data in files.items():
+            if previous.get(name) == digests[name]:
+                results["unchanged"].append(name)
+                continue
+            try:
+                bucket.upload(f"{SITE_PREFIX}/{name}", data, {
+                    "content-type": "application/json", "cache-control": SITE_CACHE_CONTROL, "x-upsert": "true"})
+                previous[name] = digests[name]
+                results["uploaded"].append(name)
+            except Exception as e:
+                results["errors"].append(f"Upload {name}: {str(e)}")
+
+        if results["uploaded"]:
+            manifest = _encode({"published_at": datetime.now(timezone.utc).isoformat(), "files": digests})
+            bucket.upload(f"{SITE_PREFIX}/manifest.json", manifest, {
+                "content-type": "application/json", "cache-control": "60", "x-upsert": "true"})
+
+        with _lock:
+            _published[env] = previous
+        del sb
+        print(f"Published site data to {env}: {len(results['uploaded'])} updated, {len(results['unchanged'])} unchanged")
+
+    except Exception as e:
+        results["errors"].append(f"Publish error: {str(e)}")
+
+    return results
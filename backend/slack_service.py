@@ -1,3 +1,4 @@
+from concurrent.futures import ThreadPoolExecutor
 from slack_sdk import WebClient
 from slack_sdk.errors import SlackApiError
 import os
@@ -8,6 +9,9 @@ load_dotenv()
 # Initialize Slack client
 slack_client = WebClient(token=os.getenv('SLACK_BOT_TOKEN'))
 
+# Background senders so bulk awards don't wait on Slack
+_notification_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="slack-notify")
+
 def send_points_notification(email: str, points: int, reason: str):
     """
     Send a Slack notification to a user about points they received
@@ -33,4 +37,14 @@ def send_points_notification(email: str, points: int, reason: str):
         )
         
     except SlackApiError as e:
-        print(f"Error sending Slack notification: {str(e)}") 
\ No newline at end of file
+        print(f"Error sending Slack notification: {str(e)}") 
+
+
+def queue_points_notification(email: str, points: int, reason: str):
+    """
+    Send a points notification in the background and return immediately.
+
+    Failures are printed by send_points_notification, same as the
+    synchronous path.
+    """
+    return _notification_pool.submit(send_points_notification, email, points, reason)
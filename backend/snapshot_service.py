@@ -0,0 +1,268 @@
+import json
+import hashlib
+import zipfile
+from datetime import datetime
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from supabase_clients import get_client, get_supabase_url, storage_key_from_url, iter_pages
+from storage_service import list_headshots, referenced_flyer_keys, IMMUTABLE_CACHE_CONTROL
+from leaderboard_service import invalidate_totals
+from member_cache import clear_members
+from sync_service import (_retry, _delete_all_rows, _iter_remapped_history,
+                          _remap_points, _fetch_all, _chunked, MAX_WORKERS, HISTORY_ORDER)
+
+SNAPSHOT_DIR = Path(__file__).parent.parent / 'snapshots'
+SNAPSHOT_TABLES = ["members", "events", "points_tracking", "points_history"]
+SNAPSHOT_VERSION = 1
+
+
+class _HashingWriter:
+    """Wrap a zip entry writer and track its sha256 and byte count as it streams."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.sha = hashlib.sha256()
+        self.size = 0
+
+    def write(self, data):
+        self.sha.update(data)
+        self.size += len(data)
+        self.fh.write(data)
+
+
+def list_snapshots():
+    """Return snapshot archives in SNAPSHOT_DIR, newest first."""
+    if not SNAPSHOT_DIR.exists():
+        return []
+    return sorted((p.name for p in SNAPSHOT_DIR.glob("*.zip")), reverse=True)
+
+
+def export_snapshot(env: str = "production", path=None):
+    """
+    Stream an environment into a single compressed local archive.
+
+    The archive is a deflated zip holding one newline-delimited JSON file per
+    table, every headshot object under headshots/, the flyer images the events
+    refer to under flyers/, and a manifest.json with row counts and sha256
+    checksums of each entry.  Rows are written page by page so
+    the whole table is never held in memory.
+    """
+    results = {"path": None, "members": 0, "events": 0, "points": 0, "history": 0, "headshots": 0, "flyers": 0,
+               "errors": []}
+
+    try:
+        SNAPSHOT_DIR.mkdir(exist_ok=True)
+        if path is None:
+            path = SNAPSHOT_DIR / f"{env}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.zip"
+        path = Path(path)
+
+        sb = get_client(env)
+        manifest = {
+            "version": SNAPSHOT_VERSION,
+            "env": env,
+            "supabase_url": get_supabase_url(env),
+            "created_at": datetime.now().isoformat(),
+            "tables": {},
+            "headshots": {},
+            "flyers": {},
+        }
+        count_keys = {"members": "members", "events": "events", "points_tracking": "points", "points_history": "history"}
+
+        flyer_keys = set()
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6) as zf:
+            for table_name in SNAPSHOT_TABLES:
+                with zf.open(f"{table_name}.ndjson", "w") as fh:
+                    writer = _HashingWriter(fh)
+                    count = 0
+                    order = HISTORY_ORDER if table_name == "points_history" else "id"
+                    for page in iter_pages(sb, table_name, order=order):
+                        if table_name == "events":
+                            flyer_keys |= referenced_flyer_keys(page)
+                        writer.write("".join(json.dumps(row, default=str) + "\n" for row in page).encode())
+                        count += len(page)
+                manifest["tables"][table_name] = {"rows": count, "sha256": writer.sha.hexdigest(), "bytes": writer.size}
+                results[count_keys[table_name]] = count
+
+            file_list = []
+            try:
+                file_list = list_headshots(sb)
+            except Exception as e:
+                results["errors"].append(f"Storage list error: {str(e)}")
+
+            headshots = [(f"eboard/{fi['name']}", (fi.get("metadata") or {}).get("mimetype", "image/jpeg"))
+                         for fi in file_list]
+            results["headshots"] = _export_objects(zf, sb, "headshots", headshots, manifest, results)
+            results["flyers"] = _export_objects(zf, sb, "flyers", [(k, "image/webp") for k in sorted(flyer_keys)],
+                                                manifest, results)
+
+            zf.writestr("manifest.json", json.dumps(manifest, indent=2))
+
+        del sb
+        results["path"] = str(path)
+        print(f"Exported {env} snapshot to {path}")
+
+    except Exception as e:
+        results["errors"].append(f"Snapshot export error: {str(e)}")
+
+    return results
+
+
+def _export_objects(zf, sb, bucket, objects, manifest, results):
+    """Download [(key, content type)] from bucket into zip entries <bucket>/<key>; returns how many were stored."""
+    def _download_one(item):
+        fpath, ctype = item
+        return fpath, _retry(lambda: sb.storage.from_(bucket).download(fpath)), ctype
+
+    stored = 0
+    # Downloads run in parallel; zip writes stay on this thread.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {pool.submit(_download_one, item): item[0] for item in objects}
+        for future in as_completed(futures):
+            try:
+                fpath, data, ctype = future.result()
+            except Exception as e:
+                results["errors"].append(f"{bucket.capitalize()} download {futures[future]}: {str(e)}")
+                continue
+            # Images are already compressed; store them as-is.
+            zf.writestr(zipfile.ZipInfo(f"{bucket}/{fpath}"), data, compress_type=zipfile.ZIP_STORED)
+            manifest[bucket][fpath] = {"sha256": hashlib.sha256(data).hexdigest(), "content_type": ctype}
+            stored += 1
+    return stored
+
+
+def _read_objects(zf, manifest, bucket, results):
+    """[(key, bytes, content type)] for a bucket's entries, skipping any that fail their checksum."""
+    objects = []
+    # Snapshots taken before flyers were included have no flyers section
+    for fpath, info in manifest.get(bucket, {}).items():
+        data = zf.read(f"{bucket}/{fpath}")
+        if hashlib.sha256(data).hexdigest() != info["sha256"]:
+            results["errors"].append(f"Checksum mismatch for {bucket} {fpath}; skipped")
+            continue
+        objects.append((fpath, data, info.get("content_type", "image/jpeg")))
+    return objects
+
+
+def _read_ndjson(zf, name, expected):
+    """Read an ndjson entry, verifying it against the manifest checksum."""
+    sha = hashlib.sha256()
+    rows = []
+    with zf.open(name) as fh:
+        for line in fh:
+            sha.update(line)
+            if line.strip():
+                rows.append(json.loads(line))
+    if sha.hexdigest() != expected["sha256"] or len(rows) != expected["rows"]:
+        raise Exception(f"Checksum mismatch in {name}; snapshot may be corrupt")
+    return rows
+
+
+def _insert_chunked(sb, table_name, rows):
+    """Insert rows in parallel chunks; returns (inserted, errors)."""
+    inserted = 0
+    errors = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {pool.submit(_retry, lambda c=chunk: sb.table(table_name).insert(c).execute()): len(chunk)
+                   for chunk in _chunked(rows)}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                inserted += futures[future]
+            except Exception as e:
+                errors.append(f"Bulk {table_name} insert ({futures[future]} rows): {str(e)}")
+    return inserted, errors
+
+
+def restore_snapshot(path, env: str = "staging"):
+    """
+    Replace an environment's data with the contents of a snapshot archive.
+
+    Every entry is checked against the manifest before anything is deleted.
+    Tables are then cleared in FK order and bulk-loaded with chunked parallel
+    inserts; points are remapped to the new member ids via netid.
+    """
+    results = {"members": 0, "events": 0, "points": 0, "history": 0, "headshots": 0, "flyers": 0, "errors": []}
+
+    try:
+        path = Path(path)
+        if not path.is_absolute() and not path.exists():
+            path = SNAPSHOT_DIR / path
+
+        with zipfile.ZipFile(path) as zf:
+            manifest = json.loads(zf.read("manifest.json"))
+            if manifest.get("version") != SNAPSHOT_VERSION:
+                raise Exception(f"Unsupported snapshot version {manifest.get('version')}")
+
+            members = _read_ndjson(zf, "members.ndjson", manifest["tables"]["members"])
+            events = _read_ndjson(zf, "events.ndjson", manifest["tables"]["events"])
+            points = _read_ndjson(zf, "points_tracking.ndjson", manifest["tables"]["points_tracking"])
+            # Snapshots taken before semester archival have no history entry
+            history = []
+            if "points_history" in manifest["tables"]:
+                history = _read_ndjson(zf, "points_history.ndjson", manifest["tables"]["points_history"])
+
+            headshots = _read_objects(zf, manifest, "headshots", results)
+            flyers = _read_objects(zf, manifest, "flyers", results)
+
+        sb = get_client(env)
+
+        # FK order: points first, then events, then members
+        for table_name in ("points_tracking", "events", "members"):
+            try:
+                _delete_all_rows(sb, table_name)
+            except Exception as e:
+                results["errors"].append(f"Delete {env} {table_name}: {str(e)}")
+
+        # Snapshots taken before headshots were stored as keys carry absolute URLs
+        member_copies = []
+        for m in members:
+            m = {k: v for k, v in m.items() if k != 'id'}
+            for field in ("headshot_url", "secondary_headshot_url"):
+                m[field] = storage_key_from_url(m.get(field))
+            member_copies.append(m)
+        results["members"], errs = _insert_chunked(sb, "members", member_copies)
+        results["errors"].extend(errs)
+
+        event_copies = [{k: v for k, v in ev.items() if k != 'id'} for ev in events]
+        results["events"], errs = _insert_chunked(sb, "events", event_copies)
+        results["errors"].extend(errs)
+
+        dst_members = _fetch_all(sb, "members", "id, netid")
+        remapped, pt_errors = _remap_points(points, members, dst_members)
+        results["errors"].extend(pt_errors)
+        results["points"], errs = _insert_chunked(sb, "points_tracking", remapped)
+        results["errors"].extend(errs)
+
+        hist_errors = []
+        remapped_history = list(_iter_remapped_history(
+            history, {m["id"]: m["netid"] for m in members}, {m["netid"]: m["id"] for m in dst_members}, hist_errors))
+        results["errors"].extend(hist_errors)
+        results["history"], errs = _insert_chunked(sb, "points_history", remapped_history)
+        results["errors"].extend(errs)
+        invalidate_totals(env)
+        clear_members(env)  # member ids were all reassigned
+
+        def _upload_one(client, bucket, item):
+            fpath, fbytes, content_type = item
+            _retry(lambda: client.storage.from_(bucket).upload(
+                fpath, fbytes, {"content-type": content_type, "cache-control": IMMUTABLE_CACHE_CONTROL,
+                                "x-upsert": "true"}))
+            return fpath
+
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+            futures = {pool.submit(_upload_one, sb, bucket, item): (bucket, item[0])
+                       for bucket, objects in (("headshots", headshots), ("flyers", flyers)) for item in objects}
+            for future in as_completed(futures):
+                bucket, fpath = futures[future]
+                try:
+                    future.result()
+                    results[bucket] += 1
+                except Exception as e:
+                    results["errors"].append(f"{bucket.capitalize()} upload {fpath}: {str(e)}")
+
+        print(f"Restored snapshot {path.name} into {env}")
+
+    except Exception as e:
+        results["errors"].append(f"Snapshot restore error: {str(e)}")
+
+    return results
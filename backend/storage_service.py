@@ -0,0 +1,100 @@
+from datetime import datetime, timezone, timedelta
+from supabase_clients import storage_key_from_url, iter_pages, PAGE_SIZE
+from budget_service import budget_counts
+
+# Content-hashed objects never change, so they can be cached for a year.
+# Supabase Storage only accepts a max-age value here.
+IMMUTABLE_CACHE_CONTROL = "31536000"
+# Objects younger than this are never garbage-collected, so an ingestion run
+# that has uploaded a photo but not yet upserted the member row is safe.
+GC_GRACE_PERIOD = timedelta(hours=1)
+
+
+def list_folder(client, bucket, folder):
+    """List every object in one bucket folder, paging past the 1000-item limit."""
+    files = []
+    offset = 0
+    while True:
+        page = client.storage.from_(bucket).list(folder, {"limit": PAGE_SIZE, "offset": offset}) or []
+        files.extend(page)
+        if len(page) < PAGE_SIZE:
+            return files
+        offset += PAGE_SIZE
+
+
+def list_headshots(client):
+    """List every object in headshots/eboard."""
+    return list_folder(client, "headshots", "eboard")
+
+
+def upload_immutable(client, bucket, path, data, content_type):
+    """Upload a content-addressed object with long-lived cache headers.
+
+    The object name is derived from its content, so an existing object at the
+    same path already holds these bytes and the upload is skipped.
+    """
+    try:
+        client.storage.from_(bucket).upload(
+            path, data, {"content-type": content_type, "cache-control": IMMUTABLE_CACHE_CONTROL})
+    except Exception as e:
+        if "already exists" in str(e).lower() or "duplicate" in str(e).lower():
+            return path
+        raise
+    return path
+
+
+def referenced_headshot_keys(members):
+    """Collect the headshot object keys referenced by an iterable of member rows."""
+    keys = set()
+    for m in members:
+        for field in ("headshot_url", "secondary_headshot_url"):
+            key = storage_key_from_url(m.get(field))
+            if key:
+                keys.add(key)
+    return keys
+
+
+def referenced_flyer_keys(events):
+    """Collect the flyers-bucket object keys (every width) referenced by an iterable of event rows."""
+    return {key for ev in events for key in (ev.get("flyer_images") or {}).values() if key}
+
+
+def _parse_timestamp(value):
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (AttributeError, ValueError):
+        return None
+
+
+def delete_unreferenced_headshots(client, grace_period=GC_GRACE_PERIOD):
+    """
+    Remove headshot objects that no member row points at any more.
+
+    Old content-hashed versions pile up every time someone replaces their
+    photo; this deletes them once they are older than grace_period.  If the
+    member read fails nothing is deleted.  Returns the number of objects removed.
+    """
+    referenced = set()
+    member_rows = 0
+    for page in iter_pages(client, "members", "headshot_url, secondary_headshot_url"):
+        referenced |= referenced_headshot_keys(page)
+        member_rows += len(page)
+
+    cutoff = datetime.now(timezone.utc) - grace_period
+    stale = []
+    objects = list_headshots(client)
+    for f in objects:
+        key = f"eboard/{f['name']}"
+        if key in referenced:
+            continue
+        created = _parse_timestamp(f.get("created_at") or f.get("updated_at"))
+        if created is None or created > cutoff:
+            continue
+        stale.append(key)
+
+    for i in range(0, len(stale), PAGE_SIZE):
+        client.storage.from_("headshots").remove(stale[i:i + PAGE_SIZE])
+    budget_counts(gc_members=member_rows, gc_objects=len(objects), gc_stale=len(stale))
+    if stale:
+        print(f"Removed {len(stale)} unreferenced headshot objects")
+    return len(stale)
@@ -15,12 +15,30 @@ _staging_key = os.getenv("STAGING_SUPABASE_SERVICE_KEY")
 PROD_SUPABASE_URL = _prod_url
 STAGING_SUPABASE_URL = _staging_url
 
+STANDIN_KEY = "standin"  # the local stand-in accepts any key
+
 DEFAULT_STORAGE_TIMEOUT = 60  # seconds (up from library default of 20)
+PAGE_SIZE = 1000  # PostgREST max-rows default
+
+
+def _standin_url(env):
+    """
+    URL of env on the local stand-in (backend/supabase_standin.py), or None.
+
+    SUPABASE_STANDIN_URL points every environment at it, each under its own
+    path prefix, for benchmarks and tests.  Read per call so a test can set
+    it after import.
+    """
+    base = os.getenv("SUPABASE_STANDIN_URL")
+    return f"{base.rstrip('/')}/{env}" if base else None
 
 
 def get_client(env: str = "production", storage_timeout: int = DEFAULT_STORAGE_TIMEOUT):
     """Return a fresh Supabase client for the given environment."""
     options = SyncClientOptions(storage_client_timeout=storage_timeout)
+    standin = _standin_url(env)
+    if standin:
+        return create_client(standin, STANDIN_KEY, options)
     if env == "staging":
         if not _staging_url or not _staging_key:
             raise Exception("Staging Supabase credentials not configured. Add STAGING_SUPABASE_URL and STAGING_SUPABASE_SERVICE_KEY to your .env file.")
@@ -30,8 +48,56 @@ def get_client(env: str = "production", storage_timeout: int = DEFAULT_STORAGE_T
     return create_client(_prod_url, _prod_key, options)
 
 
+def iter_pages(client, table_name, columns="*", page_size=PAGE_SIZE, order="id"):
+    """Yield a table one PostgREST page at a time, paging past the max-rows cap.
+
+    Pages are only stable under a total order, so rows are sorted by order
+    (comma-separated columns); tables without an id pass their primary key.
+    """
+    start = 0
+    while True:
+        query = client.table(table_name).select(columns)
+        for column in order.split(","):
+            query = query.order(column.strip())
+        page = query.range(start, start + page_size - 1).execute().data or []
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        start += page_size
+
+
 def get_supabase_url(env: str = "production"):
     """Return the Supabase URL for the given environment (for constructing public URLs)."""
+    standin = _standin_url(env)
+    if standin:
+        return standin
     if env == "staging":
         return STAGING_SUPABASE_URL
     return PROD_SUPABASE_URL
+
+
+_PUBLIC_PATH = "/storage/v1/object/public/"
+
+
+def resolve_storage_url(key, env: str = "production", bucket: str = "headshots"):
+    """Turn a bucket-relative object key (e.g. 'eboard/ab123Primary.jpeg') into a public URL.
+
+    Absolute URLs are returned unchanged so rows written before keys were
+    introduced still resolve.
+    """
+    if not key:
+        return None
+    if key.startswith("http://") or key.startswith("https://"):
+        return key
+    return f"{get_supabase_url(env)}{_PUBLIC_PATH}{bucket}/{key}"
+
+
+def storage_key_from_url(url, bucket: str = "headshots"):
+    """Inverse of resolve_storage_url: strip the project domain and bucket from a public URL."""
+    if not url:
+        return url
+    marker = f"{_PUBLIC_PATH}{bucket}/"
+    if marker in url:
+        return url.split(marker, 1)[1]
+    return url
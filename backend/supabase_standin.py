@@ -0,0 +1,782 @@
+import sys
+import json
+import time
+import uuid
+import random
+import fnmatch
+import hashlib
+import argparse
+import threading
+from datetime import datetime, timezone
+from flask import Flask, request, Response
+from werkzeug.serving import make_server, WSGIRequestHandler
+
+# In-memory stand-in for the slice of PostgREST and Storage this project uses,
+# so point_service/sync_service can be benchmarked and exercised offline.
+# Each environment gets its own path prefix and data:
+#
+#   python backend/supabase_standin.py --port 54321 --latency-ms 20 --error-rate 0.01
+#   SUPABASE_STANDIN_URL=http://127.0.0.1:54321 python web/app.py
+#
+# Tables are created on first use.  The app's tables have their columns
+# declared (COLUMNS), so `select *` returns every column and an omitted one
+# reads as its default or null, as in Postgres; other tables are schemaless.
+# Only the constraints and triggers the app depends on are modelled: generated uuid ids, unique netids,
+# the points_totals trigger and the upsert_members_with_role and
+# reconcile_points_totals functions.  Other RPCs answer "function not found",
+# which sends sync verification down its local-digest path.
+
+DEFAULT_PORT = 54321
+MAX_ROWS = 1000  # PostgREST max-rows, same as supabase_clients.PAGE_SIZE
+LIST_LIMIT = 100  # Storage list() page when no limit is given
+
+# Columns per table, from the migrations and the columns the app reads and writes
+COLUMNS = {
+    "members": ("id", "netid", "first_name", "last_name", "email", "role", "position", "major",
+                "graduation_year", "bio", "ask_about", "linkedin_url", "instagram_url", "headshot_url",
+                "secondary_headshot_url", "course", "office_hours", "review_sessions", "ta_semester",
+                "profile_hashes", "created_at"),
+    "events": ("id", "name", "description", "date", "semester", "flyer_url", "flyer_images",
+               "instagram_url", "created_at"),
+    "points_tracking": ("id", "member_id", "points", "semester", "reason", "created_at"),
+    "points_totals": ("member_id", "semester", "total", "updated_at"),
+    "points_history": ("member_id", "semester", "total", "entries", "archive_key", "archived_at"),
+}
+# Column defaults; the rest default to null
+DEFAULTS = {
+    "members": {"profile_hashes": dict, "created_at": lambda: _now()},
+    "events": {"created_at": lambda: _now()},
+    "points_tracking": {"created_at": lambda: _now()},
+    "points_totals": {"total": lambda: 0, "updated_at": lambda: _now()},
+    "points_history": {"archived_at": lambda: _now()},
+}
+PRIMARY_KEYS = {
+    "points_totals": ("member_id", "semester"),
+    "points_history": ("member_id", "semester"),
+}
+UNIQUE_KEYS = {"members": [("netid",)]}
+TOTAL_COLUMNS = {"points_tracking": "points", "points_history": "total"}  # tables feeding points_totals
+CASCADE_FROM_MEMBERS = ("points_totals", "points_history")  # on delete cascade to members(id)
+_QUERY_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+_config_lock = threading.Lock()
+_config = {"latency_ms": 0.0, "jitter_ms": 0.0, "error_rate": 0.0, "error_status": 503, "max_rows": MAX_ROWS}
+_stats = {}  # "env api METHOD" -> count, plus "injected_errors"
+
+app = Flask("supabase_standin")
+
+
+class _ApiError(Exception):
+    def __init__(self, status, code, message, storage=False):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+        self.storage = storage
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+# ── Data ────────────────────────────────────────────────────────────────
+
+class _Table:
+    def __init__(self, name):
+        self.name = name
+        self.primary_key = PRIMARY_KEYS.get(name, ("id",))
+        self.rows = {}  # rowid -> row, in insertion order; rows are replaced, never mutated
+        self.next_rowid = 0
+        self.keys = {cols: {} for cols in [self.primary_key] + UNIQUE_KEYS.get(name, [])}
+
+    def find(self, cols, row):
+        """rowid of the row whose cols match row's, using a unique index when there is one."""
+        key = tuple(row.get(c) for c in cols)
+        if cols in self.keys:
+            return None if None in key else self.keys[cols].get(key)
+        return next((rowid for rowid, r in self.rows.items() if tuple(r.get(c) for c in cols) == key), None)
+
+    def check_unique(self, row, rowid=None):
+        for cols, index in self.keys.items():
+            key = tuple(row.get(c) for c in cols)
+            if None not in key and index.get(key, rowid) != rowid:
+                raise _ApiError(409, "23505", f'duplicate key value violates unique constraint '
+                                              f'"{self.name}_{"_".join(cols)}_key"')
+
+    def put(self, rowid, row):
+        old = self.rows.get(rowid)
+        if old is not None:
+            self._unindex(rowid, old)
+        self.rows[rowid] = row
+        for cols, index in self.keys.items():
+            key = tuple(row.get(c) for c in cols)
+            if None not in key:
+                index[key] = rowid
+
+    def pop(self, rowid):
+        row = self.rows.pop(rowid)
+        self._unindex(rowid, row)
+        return row
+
+    def _unindex(self, rowid, row):
+        for cols, index in self.keys.items():
+            key = tuple(row.get(c) for c in cols)
+            if index.get(key) == rowid:
+                del index[key]
+
+
+class _Database:
+    """One environment: tables, buckets and a lock that makes each request atomic."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.buckets = {}  # bucket -> {key: object}
+
+    def table(self, name):
+        if name not in self.tables:
+            self.tables[name] = _Table(name)
+        return self.tables[name]
+
+    # Writes go through these so the trigger emulation runs and a failed
+    # request can be undone from its journal of (table, rowid, old row).
+
+    def insert(self, name, row, journal):
+        table = self.table(name)
+        if name in COLUMNS:
+            defaults = DEFAULTS.get(name, {})
+            row = {**{c: defaults[c]() if c in defaults else None for c in COLUMNS[name]}, **row}
+        if table.primary_key == ("id",) and row.get("id") is None:
+            row["id"] = str(uuid.uuid4())
+        table.check_unique(row)
+        rowid = table.next_rowid
+        table.next_rowid += 1
+        table.put(rowid, row)
+        journal.append((table, rowid, None))
+        self._after_write(name, None, row, journal)
+        return row
+
+    def update(self, name, rowid, row, journal):
+        table = self.table(name)
+        table.check_unique(row, rowid)
+        old = table.rows[rowid]
+        table.put(rowid, row)
+        journal.append((table, rowid, old))
+        self._after_write(name, old, row, journal)
+        return row
+
+    def delete(self, name, rowid, journal):
+        table = self.table(name)
+        old = table.pop(rowid)
+        journal.append((table, rowid, old))
+        self._after_write(name, old, None, journal)
+        return old
+
+    def undo(self, journal):
+        for table, rowid, old in reversed(journal):
+            if old is None:
+                table.pop(rowid)
+            else:
+                table.put(rowid, old)
+
+    def _member_exists(self, member_id):
+        return self.table("members").find(("id",), {"id": member_id}) is not None
+
+    def _add_total(self, member_id, semester, delta, journal):
+        totals = self.table("points_totals")
+        rowid = totals.find(totals.primary_key, {"member_id": member_id, "semester": semester})
+        if rowid is None:
+            self.insert("points_totals", {"member_id": member_id, "semester": semester, "total": delta,
+                                          "updated_at": _now()}, journal)
+        else:
+            row = totals.rows[rowid]
+            self.update("points_totals", rowid, {**row, "total": (row.get("total") or 0) + delta,
+                                                 "updated_at": _now()}, journal)
+
+    def _after_write(self, name, old, new, journal):
+        """The points_totals triggers and the members(id) cascades from the migrations."""
+        column = TOTAL_COLUMNS.get(name)
+        if column:
+            if old is not None and old.get("member_id") is not None and self._member_exists(old["member_id"]):
+                self._add_total(old["member_id"], old.get("semester"), -(old.get(column) or 0), journal)
+            if new is not None and new.get("member_id") is not None:
+                self._add_total(new["member_id"], new.get("semester"), new.get(column) or 0, journal)
+        elif name == "members" and new is None:
+            for child in CASCADE_FROM_MEMBERS:
+                table = self.table(child)
+                for rowid in [r for r, row in table.rows.items() if row.get("member_id") == old.get("id")]:
+                    self.delete(child, rowid, journal)
+
+
+_dbs_lock = threading.Lock()
+_dbs = {}  # env -> _Database
+
+
+def _db(env):
+    with _dbs_lock:
+        if env not in _dbs:
+            _dbs[env] = _Database()
+        return _dbs[env]
+
+
+# ── Query parsing ───────────────────────────────────────────────────────
+
+def _split_top(text, sep=","):
+    """Split on sep outside parentheses and double quotes."""
+    parts, depth, quoted, current, escaped = [], 0, False, "", False
+    for char in text:
+        if escaped:
+            current += char
+            escaped = False
+            continue
+        if char == "\\" and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == "(" and not quoted:
+            depth += 1
+        elif char == ")" and not quoted:
+            depth -= 1
+        elif char == sep and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return [p.strip() for p in parts if p.strip()]
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == '"' and value[-1] == '"':
+        return value[1:-1].replace('\\"', '"').replace("\\\\", "\\")
+    return value
+
+
+def _parse_filters(args):
+    filters = []
+    for column, value in args.items(multi=True):
+        if column in _QUERY_PARAMS:
+            continue
+        negate = value.startswith("not.")
+        if negate:
+            value = value[4:]
+        op, _, operand = value.partition(".")
+        if op == "in":
+            operand = [_unquote(v) for v in _split_top(operand.strip()[1:-1])]
+        elif op not in ("eq", "neq", "gt", "gte", "lt", "lte", "is", "like", "ilike"):
+            raise _ApiError(400, "PGRST100", f'"failed to parse filter ({value})"')
+        filters.append((column, op, operand, negate))
+    return filters
+
+
+def _text(value):
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return str(value)
+
+
+def _compare(value, operand):
+    """Order a stored value against a filter operand: numbers numerically, everything else as text."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            number = float(operand)
+            return (value > number) - (value < number)
+        except ValueError:
+            pass
+    text = _text(value)
+    return (text > operand) - (text < operand)
+
+
+def _like(value, pattern, fold):
+    text = _text(value)
+    pattern = pattern.replace("%", "*")
+    return fnmatch.fnmatchcase(text.lower(), pattern.lower()) if fold else fnmatch.fnmatchcase(text, pattern)
+
+
+def _matches(row, filters):
+    for column, op, operand, negate in filters:
+        value = row.get(column)
+        if op == "is":
+            hit = value is None if operand == "null" else value is (operand == "true")
+        elif value is None:
+            hit = False  # SQL comparisons with null are never true
+        elif op == "in":
+            hit = any(_compare(value, o) == 0 for o in operand)
+        elif op in ("like", "ilike"):
+            hit = _like(value, operand, op == "ilike")
+        else:
+            c = _compare(value, operand)
+            hit = {"eq": c == 0, "neq": c != 0, "gt": c > 0, "gte": c >= 0, "lt": c < 0, "lte": c <= 0}[op]
+        if hit == negate:
+            return False
+    return True
+
+
+def _sort_key(value):
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, value, "")
+    return (1, 0, _text(value))
+
+
+def _sort(rows, order):
+    """Apply an order param like "semester.asc,total.desc.nullslast" (Postgres puts nulls last ascending)."""
+    for term in reversed(_split_top(order)):
+        column, *modifiers = term.split(".")
+        desc = "desc" in modifiers
+        nulls_first = "nullsfirst" in modifiers or (desc and "nullslast" not in modifiers)
+        present = sorted((r for r in rows if r.get(column) is not None), key=lambda r: _sort_key(r[column]), reverse=desc)
+        missing = [r for r in rows if r.get(column) is None]
+        rows = missing + present if nulls_first else present + missing
+    return rows
+
+
+def _embed(db, table_name, row, resource, columns):
+    """Resolve "members(netid)": many-to-one through <resource>_id, else one-to-many back to this table."""
+    target = db.table(resource)
+    foreign_key = f"{resource.rstrip('s')}_id"  # points_tracking.member_id -> members.id
+    if foreign_key in row:
+        rowid = target.find(("id",), {"id": row[foreign_key]})
+        return None if rowid is None else _project(db, resource, target.rows[rowid], columns)
+    back = f"{table_name.rstrip('s')}_id"
+    return [_project(db, resource, r, columns) for r in target.rows.values() if r.get(back) == row.get("id")]
+
+
+def _project(db, table_name, row, select):
+    out = {}
+    for item in _split_top(select or "*"):
+        if item == "*":
+            out.update(row)
+        elif item.endswith(")") and "(" in item:
+            name, inner = item[:-1].split("(", 1)
+            alias, _, resource = name.rpartition(":")
+            resource = resource.split("!")[0]
+            out[alias or resource] = _embed(db, table_name, row, resource, inner)
+        else:
+            alias, _, column = item.rpartition(":")
+            column = _unquote(column.split("::")[0])
+            out[alias or column] = row.get(column)
+    return out
+
+
+def _prefer():
+    prefer = {}
+    for part in request.headers.get("Prefer", "").split(","):
+        key, _, value = part.strip().partition("=")
+        if key:
+            prefer[key] = value
+    return prefer
+
+
+def _json_body():
+    body = request.get_json(force=True, silent=True)
+    if body is None and request.get_data():
+        raise _ApiError(400, "PGRST102", "Empty or invalid json")
+    return body
+
+
+def _window(args):
+    """(offset, limit) from offset/limit params or a Range header, capped at max-rows."""
+    offset = int(args.get("offset", 0))
+    limit = int(args["limit"]) if "limit" in args else None
+    range_header = request.headers.get("Range")
+    if range_header and "-" in range_header:
+        first, _, last = range_header.partition("-")
+        offset = int(first)
+        limit = int(last) - offset + 1 if last else None
+    with _config_lock:
+        max_rows = _config["max_rows"]
+    return offset, max_rows if limit is None else min(limit, max_rows)
+
+
+def _json_response(data, status=200, headers=None):
+    return Response(json.dumps(data, default=str), status=status, mimetype="application/json", headers=headers or {})
+
+
+# ── PostgREST ───────────────────────────────────────────────────────────
+
+@app.route("/<env>/rest/v1/<table_name>", methods=["GET", "HEAD"])
+def select_rows(env, table_name):
+    db = _db(env)
+    filters = _parse_filters(request.args)
+    with db.lock:
+        rows = [r for r in db.table(table_name).rows.values() if _matches(r, filters)]
+        if "order" in request.args:
+            rows = _sort(rows, request.args["order"])
+        total = len(rows)
+        offset, limit = _window(request.args)
+        rows = [_project(db, table_name, r, request.args.get("select")) for r in rows[offset:offset + limit]]
+    counted = total if _prefer().get("count") else "*"
+    content_range = f"{offset}-{offset + len(rows) - 1}/{counted}" if rows else f"*/{counted}"
+    return _json_response(rows, headers={"Content-Range": content_range})
+
+
+def _write_response(db, table_name, rows, status):
+    prefer = _prefer()
+    if prefer.get("return") != "representation":
+        return Response(status=204 if status == 200 else status)
+    select = request.args.get("select")
+    return _json_response([_project(db, table_name, r, select) for r in rows], status=status,
+                          headers={"Content-Range": f"*/{len(rows)}"})
+
+
+@app.route("/<env>/rest/v1/<table_name>", methods=["POST"])
+def insert_rows(env, table_name):
+    """Insert, or upsert when Prefer carries resolution=merge-duplicates / ignore-duplicates."""
+    db = _db(env)
+    body = _json_body()
+    rows = body if isinstance(body, list) else [body or {}]
+    prefer = _prefer()
+    if "columns" in request.args:
+        # Bulk inserts list every key; rows missing one get null, as PostgREST does
+        columns = [_unquote(c) for c in _split_top(request.args["columns"])]
+        if prefer.get("missing") == "default":
+            rows = [{c: r[c] for c in columns if c in r} for r in rows]
+        else:
+            rows = [{c: r.get(c) for c in columns} for r in rows]
+    resolution = prefer.get("resolution")
+    journal, written = [], []
+    with db.lock:
+        table = db.table(table_name)
+        conflict = tuple(c.strip() for c in request.args["on_conflict"].split(",")) \
+            if request.args.get("on_conflict") else table.primary_key
+        try:
+            for row in rows:
+                row = dict(row)
+                rowid = table.find(conflict, row) if resolution else None
+                if rowid is None:
+                    written.append(db.insert(table_name, row, journal))
+                elif resolution != "ignore-duplicates":
+                    written.append(db.update(table_name, rowid, {**table.rows[rowid], **row}, journal))
+        except _ApiError:
+            db.undo(journal)
+            raise
+        return _write_response(db, table_name, written, 201)
+
+
+@app.route("/<env>/rest/v1/<table_name>", methods=["PATCH", "DELETE"])
+def change_rows(env, table_name):
+    db = _db(env)
+    filters = _parse_filters(request.args)
+    if not filters:
+        # Supabase runs pg-safeupdate, so unfiltered updates and deletes are refused
+        raise _ApiError(400, "21000", f"{request.method.replace('PATCH', 'UPDATE')} requires a WHERE clause")
+    changes = _json_body() if request.method == "PATCH" else None
+    journal, written = [], []
+    with db.lock:
+        table = db.table(table_name)
+        try:
+            for rowid in [rowid for rowid, r in table.rows.items() if _matches(r, filters)]:
+                if changes is None:
+                    written.append(db.delete(table_name, rowid, journal))
+                else:
+                    written.append(db.update(table_name, rowid, {**table.rows[rowid], **changes}, journal))
+        except _ApiError:
+            db.undo(journal)
+            raise
+        return _write_response(db, table_name, written, 200)
+
+
+def _rpc_upsert_members_with_role(db, args, journal):
+    """Same merge as the SQL function: upsert by netid with the given columns, append p_role once."""
+    members = db.table("members")
+    role = args.get("p_role")
+    out = []
+    for member in args.get("p_members") or []:
+        values = {k: v for k, v in member.items() if k not in ("id", "role")}
+        rowid = members.find(("netid",), values)
+        if rowid is None:
+            out.append(db.insert("members", {**values, "role": [role]}, journal))
+        else:
+            old = members.rows[rowid]
+            roles = list(old.get("role") or [])
+            if role not in roles:
+                roles.append(role)
+            merged = {**old, **values, "role": roles}
+            if "profile_hashes" in values:
+                # jsonb ||, so an eboard import keeps the TA hash and vice versa
+                merged["profile_hashes"] = {**(old.get("profile_hashes") or {}), **(values["profile_hashes"] or {})}
+            out.append(db.update("members", rowid, merged, journal))
+    return out
+
+
+def _rpc_reconcile_points_totals(db, args, journal):
+    """Rebuild points_totals from points_tracking and points_history; returns how many totals drifted."""
+    expected = {}
+    for name, column in TOTAL_COLUMNS.items():
+        for row in db.table(name).rows.values():
+            if row.get("member_id") is not None:
+                key = (row["member_id"], row.get("semester"))
+                expected[key] = expected.get(key, 0) + (row.get(column) or 0)
+    totals = db.table("points_totals")
+    actual = {(r["member_id"], r["semester"]): (rowid, r) for rowid, r in totals.rows.items()}
+    drift = 0
+    for key in set(expected) | set(actual):
+        rowid, row = actual.get(key, (None, None))
+        if row is not None and row.get("total") == expected.get(key):
+            continue
+        drift += 1
+        if key not in expected:
+            db.delete("points_totals", rowid, journal)
+        elif row is None:
+            db.insert("points_totals", {"member_id": key[0], "semester": key[1], "total": expected[key],
+                                        "updated_at": _now()}, journal)
+        else:
+            db.update("points_totals", rowid, {**row, "total": expected[key], "updated_at": _now()}, journal)
+    return drift
+
+
+RPCS = {
+    "upsert_members_with_role": _rpc_upsert_members_with_role,
+    "reconcile_points_totals": _rpc_reconcile_points_totals,
+}
+
+
+@app.route("/<env>/rest/v1/rpc/<fn>", methods=["GET", "POST"])
+def call_rpc(env, fn):
+    if fn not in RPCS:
+        raise _ApiError(404, "PGRST202", f"Could not find the function public.{fn} in the schema cache")
+    db = _db(env)
+    journal = []
+    with db.lock:
+        try:
+            result = RPCS[fn](db, _json_body() or {}, journal)
+        except _ApiError:
+            db.undo(journal)
+            raise
+        return _json_response(result)
+
+
+# ── Storage ─────────────────────────────────────────────────────────────
+
+def _object_info(name, obj):
+    return {
+        "name": name, "id": obj["id"], "created_at": obj["created_at"], "updated_at": obj["updated_at"],
+        "last_accessed_at": obj["updated_at"],
+        "metadata": {"eTag": obj["etag"], "size": len(obj["data"]), "mimetype": obj["content_type"],
+                     "cacheControl": f"max-age={obj['cache_control']}", "lastModified": obj["updated_at"],
+                     "contentLength": len(obj["data"]), "httpStatusCode": 200},
+    }
+
+
+@app.route("/<env>/storage/v1/object/list/<bucket>", methods=["POST"])
+def list_objects(env, bucket):
+    """One folder level under prefix, sorted, then offset/limit, like storage.from_(b).list()."""
+    db = _db(env)
+    options = _json_body() or {}
+    folder = (options.get("prefix") or "").strip("/")
+    base = f"{folder}/" if folder else ""
+    search = (options.get("search") or "").lower()
+    entries = {}
+    with db.lock:
+        for key, obj in db.buckets.get(bucket, {}).items():
+            if not key.startswith(base):
+                continue
+            name, sep, _ = key[len(base):].partition("/")
+            if search and search not in name.lower():
+                continue
+            if sep:
+                entries.setdefault(name, {"name": name, "id": None, "created_at": None, "updated_at": None,
+                                          "last_accessed_at": None, "metadata": None})
+            else:
+                entries[name] = _object_info(name, obj)
+    sort_by = options.get("sortBy") or {}
+    column = sort_by.get("column") or "name"
+    listed = sorted(entries.values(), key=lambda e: _sort_key(e.get(column) or ""),
+                    reverse=(sort_by.get("order") or "asc").lower() == "desc")
+    offset = int(options.get("offset") or 0)
+    limit = int(options.get("limit") or LIST_LIMIT)
+    return _json_response(listed[offset:offset + limit])
+
+
+@app.route("/<env>/storage/v1/object/<bucket>/<path:key>", methods=["POST", "PUT"])
+def upload_object(env, bucket, key):
+    """POST creates (or replaces with x-upsert: true), PUT replaces an existing object."""
+    db = _db(env)
+    upload = request.files.get("file")
+    data = upload.read() if upload else request.get_data()
+    content_type = (upload.mimetype if upload else request.content_type) or "application/octet-stream"
+    cache_control = request.form.get("cacheControl") or "3600"
+    upsert = request.headers.get("x-upsert", "false").lower() == "true"
+    with db.lock:
+        objects = db.buckets.setdefault(bucket, {})
+        existing = objects.get(key)
+        if request.method == "POST" and existing and not upsert:
+            raise _ApiError(409, "Duplicate", "The resource already exists", storage=True)
+        if request.method == "PUT" and not existing:
+            raise _ApiError(404, "not_found", "Object not found", storage=True)
+        now = _now()
+        obj = {"id": existing["id"] if existing else str(uuid.uuid4()), "data": data,
+               "content_type": content_type, "cache_control": cache_control,
+               "etag": f'"{hashlib.md5(data).hexdigest()}"',
+               "created_at": existing["created_at"] if existing else now, "updated_at": now}
+        objects[key] = obj
+    return _json_response({"Key": f"{bucket}/{key}", "Id": obj["id"]})
+
+
+@app.route("/<env>/storage/v1/object/<bucket>/<path:key>", methods=["GET"])
+@app.route("/<env>/storage/v1/object/public/<bucket>/<path:key>", methods=["GET"])
+@app.route("/<env>/storage/v1/object/authenticated/<bucket>/<path:key>", methods=["GET"])
+def download_object(env, bucket, key):
+    db = _db(env)
+    with db.lock:
+        obj = db.buckets.get(bucket, {}).get(key)
+    if obj is None:
+        raise _ApiError(404, "not_found", "Object not found", storage=True)
+    return Response(obj["data"], mimetype=obj["content_type"],
+                    headers={"Cache-Control": f"max-age={obj['cache_control']}", "ETag": obj["etag"]})
+
+
+@app.route("/<env>/storage/v1/object/<bucket>", methods=["DELETE"])
+def remove_objects(env, bucket):
+    db = _db(env)
+    removed = []
+    with db.lock:
+        objects = db.buckets.get(bucket, {})
+        for key in (_json_body() or {}).get("prefixes") or []:
+            obj = objects.pop(key, None)
+            if obj is not None:
+                removed.append({**_object_info(key, obj), "bucket_id": bucket})
+    return _json_response(removed)
+
+
+# ── Latency, error injection and control ────────────────────────────────
+
+def _api_of(path):
+    if "/rest/v1/rpc/" in path:
+        return "rpc"
+    return "rest" if "/rest/v1/" in path else "storage"
+
+
+@app.before_request
+def _inject():
+    """Delay every data request and fail a share of them, before any data is touched."""
+    if request.path.startswith("/_standin"):
+        return None
+    env = request.path.strip("/").split("/", 1)[0]
+    api = _api_of(request.path)
+    with _config_lock:
+        config = dict(_config)
+        name = f"{env} {api} {request.method}"
+        _stats[name] = _stats.get(name, 0) + 1
+    delay_ms = config["latency_ms"] + random.uniform(0, config["jitter_ms"])
+    if delay_ms > 0:
+        time.sleep(delay_ms / 1000)
+    if config["error_rate"] and random.random() < config["error_rate"]:
+        with _config_lock:
+            _stats["injected_errors"] = _stats.get("injected_errors", 0) + 1
+        return _error_response(_ApiError(config["error_status"], "injected", "Injected failure",
+                                         storage=api == "storage"))
+    return None
+
+
+@app.errorhandler(_ApiError)
+def _error_response(e):
+    if e.storage:
+        body = {"statusCode": str(e.status), "error": e.code, "message": e.message}
+    else:
+        body = {"code": e.code, "message": e.message, "details": None, "hint": None}
+    return _json_response(body, status=e.status)
+
+
+def configure(**changes):
+    """Change latency_ms, jitter_ms, error_rate, error_status or max_rows; returns the new settings."""
+    unknown = set(changes) - set(_config)
+    if unknown:
+        raise Exception(f"Unknown stand-in settings: {', '.join(sorted(unknown))}")
+    with _config_lock:
+        for key, value in changes.items():
+            _config[key] = type(_config[key])(value)
+        return dict(_config)
+
+
+def reset(env=None):
+    """Drop the data of one environment (or all of them) and clear the request counts."""
+    with _dbs_lock:
+        if env is None:
+            _dbs.clear()
+        else:
+            _dbs.pop(env, None)
+    with _config_lock:
+        _stats.clear()
+
+
+def stats():
+    with _config_lock:
+        return dict(_stats)
+
+
+@app.route("/_standin/config", methods=["GET", "POST"])
+def config_route():
+    try:
+        return _json_response(configure(**(request.get_json(force=True, silent=True) or {})))
+    except Exception as e:
+        return _json_response({"error": str(e)}, status=400)
+
+
+@app.route("/_standin/reset", methods=["POST"])
+def reset_route():
+    reset(request.args.get("env"))
+    return _json_response({"reset": request.args.get("env") or "all"})
+
+
+@app.route("/_standin/stats")
+def stats_route():
+    return _json_response(stats())
+
+
+class _QuietHandler(WSGIRequestHandler):
+    """Skip the per-request access log, which would dominate a benchmark's output and time."""
+
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+_servers = []
+
+
+def start_standin(host="127.0.0.1", port=0, **settings):
+    """
+    Serve the stand-in from a background thread and return its base URL.
+
+    port=0 picks a free port.  Point the app at the URL with
+    SUPABASE_STANDIN_URL; stop_standin() shuts every started server down.
+    """
+    configure(**settings)
+    server = make_server(host, port, app, threaded=True, request_handler=_QuietHandler)
+    threading.Thread(target=server.serve_forever, name="supabase-standin", daemon=True).start()
+    _servers.append(server)
+    return f"http://{host}:{server.server_port}"
+
+
+def stop_standin():
+    while _servers:
+        _servers.pop().shutdown()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="In-memory PostgREST and Storage stand-in for benchmarks and tests.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay added to every request")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="extra random delay, up to this much")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with --error-status")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--max-rows", type=int, default=MAX_ROWS)
+    parser.add_argument("--log-requests", action="store_true", help="print an access log line per request")
+    args = parser.parse_args(argv)
+    configure(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, error_rate=args.error_rate,
+              error_status=args.error_status, max_rows=args.max_rows)
+    server = make_server(args.host, args.port, app, threaded=True,
+                         request_handler=WSGIRequestHandler if args.log_requests else _QuietHandler)
+    print(f"Supabase stand-in on http://{args.host}:{server.server_port} "
+          f"(set SUPABASE_STANDIN_URL to this; environments are path prefixes)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    sys.exit(main())
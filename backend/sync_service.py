@@ -1,6 +1,19 @@
+import re
+import json
 import time
+import hashlib
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from supabase_clients import get_client, get_supabase_url
+from supabase_clients import get_client, iter_pages
+from storage_service import (list_headshots, list_folder, referenced_headshot_keys, referenced_flyer_keys,
+                             IMMUTABLE_CACHE_CONTROL)
+from leaderboard_service import invalidate_totals
+from member_cache import clear_members
+from job_service import report_progress
+from trace_service import traced, set_attributes, in_current_trace
+
+INSERT_CHUNK = 500
+MAX_WORKERS = 8
+HISTORY_ORDER = "member_id,semester"  # points_history has no id; page by its primary key
 
 
 def _retry(fn, max_attempts=3, base_delay=2.0):
@@ -12,10 +25,106 @@ def _retry(fn, max_attempts=3, base_delay=2.0):
         except Exception as e:
             last_error = e
             if attempt < max_attempts:
+                set_attributes(retries=attempt)
                 time.sleep(base_delay * (2 ** (attempt - 1)))
     raise last_error
 
 
+@traced(attrs=("table_name",))
+def _fetch_all(client, table_name, columns="*", order="id"):
+    """Read every row of a table into a single list."""
+    rows = []
+    for page in iter_pages(client, table_name, columns, order=order):
+        rows.extend(page)
+    return rows
+
+
+class _RowStore:
+    """
+    Column-oriented copy of a table held in memory during sync.
+
+    Each column is a plain list, so a row costs one pointer per column instead
+    of a full dict.  Short strings (semester codes, reasons, roles, positions)
+    are deduplicated through a per-store pool, so thousands of points rows share
+    one 'fa25' object.  Dicts are only rebuilt on the way out, one at a time.
+    """
+
+    __slots__ = ("columns", "_data", "_pool", "_len")
+    INTERN_MAX_LEN = 64
+
+    def __init__(self):
+        self.columns = []
+        self._data = {}
+        self._pool = {}
+        self._len = 0
+
+    @classmethod
+    def from_pages(cls, pages):
+        store = cls()
+        for page in pages:
+            for row in page:
+                store.append(row)
+        return store
+
+    def _compact(self, value):
+        if isinstance(value, str) and len(value) <= self.INTERN_MAX_LEN:
+            return self._pool.setdefault(value, value)
+        if isinstance(value, list):
+            return [self._compact(v) for v in value]
+        return value
+
+    def append(self, row):
+        for col in row:
+            if col not in self._data:
+                self.columns.append(col)
+                self._data[col] = [None] * self._len
+        for col in self.columns:
+            self._data[col].append(self._compact(row.get(col)))
+        self._len += 1
+
+    def __len__(self):
+        return self._len
+
+    def column(self, name):
+        """Return a column's values in row order (None-filled if absent)."""
+        return self._data.get(name) or [None] * self._len
+
+    def iter_rows(self, exclude=()):
+        """Yield each row as a fresh dict, skipping excluded columns."""
+        cols = [(c, self._data[c]) for c in self.columns if c not in exclude]
+        for i in range(self._len):
+            yield {c: values[i] for c, values in cols}
+
+
+def _chunked(rows, size=INSERT_CHUNK):
+    """Group an iterable into lists of at most size items."""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+@traced(attrs=("table_name",))
+def _insert_stream(client, table_name, rows):
+    """Insert rows from an iterator in chunks; returns (inserted, errors)."""
+    inserted = 0
+    attempted = 0
+    errors = []
+    for chunk in _chunked(rows):
+        try:
+            _retry(lambda c=chunk: client.table(table_name).insert(c).execute())
+            inserted += len(chunk)
+        except Exception as e:
+            errors.append(f"Bulk {table_name} insert ({len(chunk)} rows): {str(e)}")
+        attempted += len(chunk)
+        report_progress(done=attempted)
+    return inserted, errors
+
+
 def _diff_headshot_lists(src_files, dst_files):
     """Compare file lists and return src entries that are new or changed vs dst."""
     dst_index = {f["name"]: f for f in dst_files}
@@ -36,39 +145,91 @@ def _diff_headshot_lists(src_files, dst_files):
     return changed
 
 
-def _rewrite_urls(members, old_url, new_url):
-    """Rewrite headshot URLs from one Supabase domain to another."""
-    result = []
-    for member in members:
-        m = {k: v for k, v in member.items() if k != 'id'}
-        if m.get('headshot_url') and old_url:
-            m['headshot_url'] = m['headshot_url'].replace(old_url, new_url)
-        if m.get('secondary_headshot_url') and old_url:
-            m['secondary_headshot_url'] = m['secondary_headshot_url'].replace(old_url, new_url)
-        result.append(m)
-    return result
+def _iter_remapped_points(member_ids, points, src_id_to_netid, netid_to_dst_id, errors):
+    """Lazily yield points rows with member_id remapped; unmappable rows go to errors."""
+    for i, member_id in enumerate(member_ids):
+        netid = src_id_to_netid.get(member_id)
+        if not netid or netid not in netid_to_dst_id:
+            errors.append(f"Points row {points['id'][i]}: could not map member_id={member_id}")
+            continue
+        yield {
+            "member_id": netid_to_dst_id[netid],
+            "points": points["points"][i],
+            "semester": points["semester"][i],
+            "reason": points["reason"][i],
+        }
+
+
+def _iter_remapped_history(rows, src_id_to_netid, netid_to_dst_id, errors):
+    """Yield points_history rows with member_id remapped via netid; unmappable rows go to errors."""
+    for row in rows:
+        netid = src_id_to_netid.get(row["member_id"])
+        if not netid or netid not in netid_to_dst_id:
+            errors.append(f"Points history {row['semester']}: could not map member_id={row['member_id']}")
+            continue
+        yield {**row, "member_id": netid_to_dst_id[netid]}
+
+
+# Upload options for objects copied by key; flyers are content-hashed, so immutable
+ARCHIVE_OPTIONS = {"content-type": "application/gzip", "x-upsert": "true"}
+FLYER_OPTIONS = {"content-type": "image/webp", "cache-control": IMMUTABLE_CACHE_CONTROL, "x-upsert": "true"}
+
+
+@traced(attrs=("source", "destination", "bucket", "keys"))
+def _copy_missing_objects(source, destination, bucket, keys, options, results):
+    """
+    Copy objects the destination's rows refer to but its bucket lacks.
+
+    Used for semester archives and event flyers, whose keys are copied with
+    the rows; returns how many objects were copied.
+    """
+    if not keys:
+        return 0
+    dst = get_client(destination)
+    existing = set()
+    for folder in sorted({key.rsplit("/", 1)[0] for key in keys if "/" in key}):
+        existing.update(f"{folder}/{f['name']}" for f in list_folder(dst, bucket, folder))
+    missing = sorted(keys - existing)
+    if not missing:
+        return 0
+
+    src = get_client(source)
+
+    def _download_one(client, key):
+        return key, _retry(lambda: client.storage.from_(bucket).download(key))
+
+    downloaded = []
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = {pool.submit(in_current_trace(_download_one), src, key): key for key in missing}
+        for future in as_completed(futures):
+            try:
+                downloaded.append(future.result())
+            except Exception as e:
+                results["errors"].append(f"{bucket.capitalize()} download {futures[future]}: {str(e)}")
+
+    writer = get_client(destination)
+    copied = 0
+    for key, data in downloaded:
+        try:
+            _retry(lambda k=key, d=data: writer.storage.from_(bucket).upload(k, d, options))
+            copied += 1
+        except Exception as e:
+            results["errors"].append(f"{bucket.capitalize()} upload {key}: {str(e)}")
+    return copied
 
 
 def _remap_points(points, src_members, dst_members):
     """Remap member_id in points_tracking from source IDs to destination IDs via netid."""
     src_id_to_netid = {m["id"]: m["netid"] for m in src_members}
     netid_to_dst_id = {m["netid"]: m["id"] for m in dst_members}
-    remapped = []
+    columns = {c: [pt.get(c) for pt in points] for c in ("id", "points", "semester", "reason")}
     errors = []
-    for pt in points:
-        netid = src_id_to_netid.get(pt["member_id"])
-        if not netid or netid not in netid_to_dst_id:
-            errors.append(f"Points row {pt.get('id')}: could not map member_id={pt['member_id']}")
-            continue
-        remapped.append({
-            "member_id": netid_to_dst_id[netid],
-            "points": pt["points"],
-            "semester": pt["semester"],
-            "reason": pt.get("reason"),
-        })
+    remapped = list(_iter_remapped_points([pt["member_id"] for pt in points], columns,
+                                          src_id_to_netid, netid_to_dst_id, errors))
     return remapped, errors
 
 
+@traced(attrs=("table_name",))
 def _delete_all_rows(client, table_name):
     """Delete all rows from a Supabase table.
     supabase-py requires a filter on delete; we use neq against a nil UUID."""
@@ -76,6 +237,7 @@ def _delete_all_rows(client, table_name):
     client.table(table_name).delete().neq("id", NIL_UUID).execute()
 
 
+@traced()
 def _delete_extra_headshots(client, src_file_list, dst_file_list):
     """Remove headshot files in destination that are not present in source."""
     src_names = {f["name"] for f in src_file_list}
@@ -85,141 +247,166 @@ def _delete_extra_headshots(client, src_file_list, dst_file_list):
     return len(extras)
 
 
-def pull_from_production():
+@traced(attrs=("source", "destination"))
+def _sync_environment(source, destination):
     """
-    Copy all data from production Supabase into staging Supabase.
+    Replace all data in destination with the data in source.
+
+    Order matters:
+    1. Members first (because points_tracking has FK to members)
+    2. Events
+    3. Points tracking and archived semester summaries (need member_id remapping)
+    4. Headshot files from storage (incremental — only new/changed files)
+    5. Semester archives and event flyers the copied rows point at
+
+    Source tables are held as compact _RowStores; rows are rebuilt, stripped
+    and rewritten lazily as they stream to the destination in chunks, so at
+    most one chunk of dicts exists at a time.
 
     NOTE: supabase-py v2 has a shared-header bug — two clients created
     in the same process overwrite each other's API key.  We work around
     this by reading ALL data from the source first, then creating the
     destination client to write.
     """
-    results = {"members": 0, "events": 0, "points": 0, "headshots": 0, "skipped_headshots": 0, "deleted_headshots": 0, "errors": []}
-    MAX_WORKERS = 8
+    results = {"members": 0, "events": 0, "points": 0, "headshots": 0, "skipped_headshots": 0, "deleted_headshots": 0,
+               "flyers": 0, "errors": []}
+    src_label = source.capitalize()
+    dst_label = destination.capitalize()
 
     try:
-        # ── Phase 1: READ db data + list production files ──
-        prod = get_client("production")
-        prod_members = prod.table("members").select("*").execute().data or []
-        prod_events = prod.table("events").select("*").execute().data or []
-        prod_points = prod.table("points_tracking").select("*").execute().data or []
-
-        prod_file_list = []
+        # ── Phase 1: READ db data + list source files ──
+        report_progress(f"Reading {source}")
+        src = get_client(source)
+        src_members = _RowStore.from_pages(iter_pages(src, "members"))
+        src_events = _RowStore.from_pages(iter_pages(src, "events"))
+        src_points = _RowStore.from_pages(iter_pages(src, "points_tracking", "id, member_id, points, semester, reason"))
+        src_history = _fetch_all(src, "points_history", order=HISTORY_ORDER)
+
+        src_file_list = []
         try:
-            prod_file_list = prod.storage.from_("headshots").list("eboard", {"limit": 1000})
+            src_file_list = list_headshots(src)
         except Exception as e:
-            results["errors"].append(f"Production storage list error: {str(e)}")
+            results["errors"].append(f"{src_label} storage list error: {str(e)}")
+
+        # Only copy headshot versions some member still points at; anything
+        # else in the destination is garbage-collected in Step 5
+        referenced = referenced_headshot_keys(
+            {"headshot_url": a, "secondary_headshot_url": b}
+            for a, b in zip(src_members.column("headshot_url"), src_members.column("secondary_headshot_url")))
+        src_file_list = [f for f in src_file_list if f"eboard/{f['name']}" in referenced]
 
-        del prod
+        del src
 
         # ── Phase 2: CLEAR destination, then INSERT source data ──
-        staging = get_client("staging")
-        prod_url = get_supabase_url("production")
-        staging_url = get_supabase_url("staging")
+        dst = get_client(destination)
 
+        report_progress(f"Clearing {destination}")
         # Step 1: Delete all destination data (FK order: points first, then events, then members)
-        try:
-            _delete_all_rows(staging, "points_tracking")
-        except Exception as e:
-            results["errors"].append(f"Delete staging points_tracking: {str(e)}")
-
-        try:
-            _delete_all_rows(staging, "events")
-        except Exception as e:
-            results["errors"].append(f"Delete staging events: {str(e)}")
-
-        try:
-            _delete_all_rows(staging, "members")
-        except Exception as e:
-            results["errors"].append(f"Delete staging members: {str(e)}")
-
-        # Step 2: Insert all members (with URL rewriting)
-        member_copies = _rewrite_urls(prod_members, prod_url, staging_url)
-        if member_copies:
+        for table_name in ("points_tracking", "events", "members"):
             try:
-                staging.table("members").insert(member_copies).execute()
-                results["members"] = len(member_copies)
+                _delete_all_rows(dst, table_name)
             except Exception as e:
-                results["errors"].append(f"Bulk member insert: {str(e)}")
+                results["errors"].append(f"Delete {destination} {table_name}: {str(e)}")
 
+        report_progress("Copying members", 0, len(src_members))
+        # Step 2: Insert all members (strip id; headshots are stored as
+        # environment-agnostic keys, so rows copy over unchanged)
+        results["members"], errs = _insert_stream(dst, "members", src_members.iter_rows(exclude=("id",)))
+        results["errors"].extend(errs)
+
+        report_progress("Copying events", 0, len(src_events))
         # Step 3: Insert all events (strip id)
-        event_copies = [{k: v for k, v in ev.items() if k != 'id'} for ev in prod_events]
-        if event_copies:
-            try:
-                staging.table("events").insert(event_copies).execute()
-                results["events"] = len(event_copies)
-            except Exception as e:
-                results["errors"].append(f"Bulk event insert: {str(e)}")
+        results["events"], errs = _insert_stream(dst, "events", src_events.iter_rows(exclude=("id",)))
+        results["errors"].extend(errs)
 
+        report_progress("Copying points", 0, len(src_points))
         # Step 4: Insert all points (remap member_id via netid)
-        staging_members = staging.table("members").select("id, netid").execute().data or []
-        remapped, pt_errors = _remap_points(prod_points, prod_members, staging_members)
+        dst_members = _fetch_all(dst, "members", "id, netid")
+        src_id_to_netid = dict(zip(src_members.column("id"), src_members.column("netid")))
+        netid_to_dst_id = {m["netid"]: m["id"] for m in dst_members}
+        del dst_members
+        pt_errors = []
+        points_columns = {c: src_points.column(c) for c in ("id", "points", "semester", "reason")}
+        point_rows = _iter_remapped_points(src_points.column("member_id"), points_columns,
+                                           src_id_to_netid, netid_to_dst_id, pt_errors)
+        results["points"], errs = _insert_stream(dst, "points_tracking", point_rows)
         results["errors"].extend(pt_errors)
-        if remapped:
-            try:
-                staging.table("points_tracking").insert(remapped).execute()
-                results["points"] = len(remapped)
-            except Exception as e:
-                results["errors"].append(f"Bulk points insert: {str(e)}")
+        results["errors"].extend(errs)
+
+        # Closed semesters: one summary row per member (members were cleared,
+        # so the destination's old summaries went with them)
+        hist_errors = []
+        report_progress("Copying points history", 0, len(src_history))
+        _, errs = _insert_stream(dst, "points_history",
+                                 _iter_remapped_history(src_history, src_id_to_netid, netid_to_dst_id, hist_errors))
+        results["errors"].extend(hist_errors)
+        results["errors"].extend(errs)
+        archive_keys = {row["archive_key"] for row in src_history}
+        flyer_keys = referenced_flyer_keys({"flyer_images": f} for f in src_events.column("flyer_images"))
+        del src_members, src_events, src_points, src_history
+        # points_totals was rebuilt row by row by its trigger; reload the cache
+        invalidate_totals(destination)
+        clear_members(destination)  # member ids were all reassigned
 
         # Step 5: Diff headshot file lists + delete extras
-        staging_file_list = []
+        dst_file_list = []
         try:
-            staging_file_list = staging.storage.from_("headshots").list("eboard", {"limit": 1000})
+            dst_file_list = list_headshots(dst)
         except Exception as e:
-            results["errors"].append(f"Staging storage list error: {str(e)}")
+            results["errors"].append(f"{dst_label} storage list error: {str(e)}")
 
         try:
-            results["deleted_headshots"] = _delete_extra_headshots(staging, prod_file_list, staging_file_list)
+            results["deleted_headshots"] = _delete_extra_headshots(dst, src_file_list, dst_file_list)
         except Exception as e:
-            results["errors"].append(f"Delete extra staging headshots: {str(e)}")
+            results["errors"].append(f"Delete extra {destination} headshots: {str(e)}")
 
-        changed_files = _diff_headshot_lists(prod_file_list, staging_file_list)
-        results["skipped_headshots"] = len(prod_file_list) - len(changed_files)
+        changed_files = _diff_headshot_lists(src_file_list, dst_file_list)
+        results["skipped_headshots"] = len(src_file_list) - len(changed_files)
 
-        del staging
+        del dst
 
         if changed_files:
-            # ── Phase 3: Download changed headshots from production (parallel) ──
-            prod2 = get_client("production")
+            report_progress("Copying headshots", 0, len(changed_files) * 2)
+            # ── Phase 3: Download changed headshots from source (parallel) ──
+            src2 = get_client(source)
 
             def _download_one(file_info):
                 name = file_info["name"]
                 path = f"eboard/{name}"
                 ctype = (file_info.get("metadata") or {}).get("mimetype", "image/jpeg")
-                data = _retry(lambda p=path: prod2.storage.from_("headshots").download(p))
+                data = _retry(lambda p=path: src2.storage.from_("headshots").download(p))
                 return (path, data, ctype)
 
             downloaded = []
             with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
-                futures = {pool.submit(_download_one, fi): fi for fi in changed_files}
+                futures = {pool.submit(in_current_trace(_download_one), fi): fi for fi in changed_files}
                 for future in as_completed(futures):
                     fi = futures[future]
                     try:
                         downloaded.append(future.result())
                     except Exception as e:
                         results["errors"].append(f"Headshot download eboard/{fi['name']}: {str(e)}")
+                    report_progress(done=len(downloaded))
 
-            del prod2
+            del src2
 
-            # ── Phase 4: Upload changed headshots to staging (parallel) ──
-            staging2 = get_client("staging")
+            # ── Phase 4: Upload changed headshots to destination (parallel) ──
+            dst2 = get_client(destination)
 
             def _upload_one(item):
                 fpath, fbytes, content_type = item
                 def _do_upload():
+                    options = {"content-type": content_type, "cache-control": IMMUTABLE_CACHE_CONTROL}
                     try:
-                        staging2.storage.from_("headshots").upload(
-                            fpath, fbytes, {"content-type": content_type, "x-upsert": "true"})
+                        dst2.storage.from_("headshots").upload(fpath, fbytes, {**options, "x-upsert": "true"})
                     except Exception:
-                        staging2.storage.from_("headshots").remove([fpath])
-                        staging2.storage.from_("headshots").upload(
-                            fpath, fbytes, {"content-type": content_type})
+                        dst2.storage.from_("headshots").remove([fpath])
+                        dst2.storage.from_("headshots").upload(fpath, fbytes, options)
                 _retry(_do_upload)
                 return fpath
 
             with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
-                futures = {pool.submit(_upload_one, item): item[0] for item in downloaded}
+                futures = {pool.submit(in_current_trace(_upload_one), item): item[0] for item in downloaded}
                 for future in as_completed(futures):
                     path = futures[future]
                     try:
@@ -227,6 +414,15 @@ def pull_from_production():
                         results["headshots"] += 1
                     except Exception as e:
                         results["errors"].append(f"Headshot upload {path}: {str(e)}")
+                    report_progress(done=len(downloaded) + results["headshots"])
+
+            del dst2
+
+        # Step 6: Semester archives, so a closed semester can be reopened in either env,
+        # and flyer images, which the copied events name by key
+        _copy_missing_objects(source, destination, "archives", archive_keys, ARCHIVE_OPTIONS, results)
+        report_progress("Copying flyers")
+        results["flyers"] = _copy_missing_objects(source, destination, "flyers", flyer_keys, FLYER_OPTIONS, results)
 
     except Exception as e:
         results["errors"].append(f"Sync error: {str(e)}")
@@ -234,156 +430,222 @@ def pull_from_production():
     return results
 
 
+@traced()
+def pull_from_production():
+    """Copy all data from production Supabase into staging Supabase."""
+    return _sync_environment("production", "staging")
+
+
+@traced()
 def push_to_production():
+    """Sync all data from staging Supabase to production Supabase."""
+    return _sync_environment("staging", "production")
+
+
+# ── Environment verification ──────────────────────────────────────────────
+
+VERIFY_TABLES = ["members", "events", "points_tracking", "points_history"]
+# Number of hashed key ranges per table; larger tables get finer ranges so a
+# mismatch drills into a small slice of rows.
+VERIFY_BUCKETS = {"members": 16, "events": 4, "points_tracking": 64, "points_history": 16}
+_PUBLIC_PREFIX_RE = re.compile(r"^.*/storage/v1/object/public/")
+
+
+def _key_bucket(key, buckets):
+    """Map a natural key to a bucket the same way sync_row_digests() does in SQL."""
+    return int(hashlib.md5((key or "").encode()).hexdigest()[:8], 16) % buckets
+
+
+def _digest_value(row_digest):
+    """Integer contribution of one row digest to an order-independent bucket sum."""
+    return int(row_digest[:15], 16)
+
+
+def _canonical_rows(table_name, rows, id_to_netid=None):
+    """Yield (key, canonical_row) pairs matching the SQL canonical form."""
+    for row in rows:
+        if table_name == "members":
+            c = {k: v for k, v in row.items() if k not in ("id", "created_at", "updated_at")}
+            for field in ("headshot_url", "secondary_headshot_url"):
+                if c.get(field):
+                    c[field] = _PUBLIC_PREFIX_RE.sub("", c[field])
+                else:
+                    c[field] = c.get(field)
+            yield row.get("netid"), c
+        elif table_name == "events":
+            c = {k: v for k, v in row.items() if k not in ("id", "created_at", "updated_at")}
+            yield f"{row.get('name') or ''}|{row.get('date') or ''}", c
+        elif table_name == "points_history":
+            netid = (id_to_netid or {}).get(row.get("member_id"))
+            yield netid, {"netid": netid, "semester": row.get("semester"), "total": row.get("total"),
+                          "entries": row.get("entries"), "archive_key": row.get("archive_key")}
+        else:
+            netid = (id_to_netid or {}).get(row.get("member_id"))
+            yield netid, {"netid": netid, "points": row.get("points"),
+                          "semester": row.get("semester"), "reason": row.get("reason")}
+
+
+@traced()
+def _local_row_digests(client, buckets):
+    """Fallback when the digest functions are not installed: hash rows client-side.
+
+    Returns {table: [(bucket, key, digest, row), ...]}.  Only used when either
+    environment is missing the migration, so both sides are hashed the same way.
+    """
+    members = _fetch_all(client, "members")
+    id_to_netid = {m["id"]: m["netid"] for m in members}
+    sources = {
+        "members": members,
+        "events": _fetch_all(client, "events"),
+        "points_tracking": _fetch_all(client, "points_tracking", "member_id, points, semester, reason"),
+        "points_history": _fetch_all(client, "points_history", "member_id, semester, total, entries, archive_key",
+                                     order=HISTORY_ORDER),
+    }
+    out = {}
+    for table_name in VERIFY_TABLES:
+        n = buckets[table_name]
+        entries = []
+        for key, row in _canonical_rows(table_name, sources[table_name], id_to_netid):
+            blob = json.dumps(row, sort_keys=True, separators=(",", ":"), default=str)
+            entries.append((_key_bucket(key, n), key, hashlib.md5(blob.encode()).hexdigest(), row))
+        out[table_name] = entries
+    return out
+
+
+def _summarize_buckets(entries):
+    """Aggregate (bucket, key, digest, row) entries into {bucket: (count, digest)}."""
+    sums = {}
+    for bucket, _key, digest, _row in entries:
+        count, total = sums.get(bucket, (0, 0))
+        sums[bucket] = (count + 1, total + _digest_value(digest))
+    return {b: (count, str(total)) for b, (count, total) in sums.items()}
+
+
+@traced(attrs=("env", "mode"))
+def _collect_digests(env, mode, buckets):
+    """Compute per-bucket digests for every table and headshot checksums in one env.
+
+    mode is "server" (use the sync_* SQL functions) or "local".  Returns a dict
+    with "mode", "tables" ({table: {bucket: (count, digest)}}), "rows" (local
+    mode only, kept for drill-down) and "headshots" ({name: checksum}).
     """
-    Sync all data from staging Supabase to production Supabase.
+    client = get_client(env)
+    collected = {"mode": mode, "tables": {}, "rows": {}, "headshots": {}}
+    if mode == "server":
+        for table_name in VERIFY_TABLES:
+            data = client.rpc("sync_table_digests", {"p_table": table_name, "p_buckets": buckets[table_name]}).execute().data or []
+            collected["tables"][table_name] = {d["bucket"]: (d["row_count"], d["digest"]) for d in data}
+    else:
+        collected["rows"] = _local_row_digests(client, buckets)
+        collected["tables"] = {t: _summarize_buckets(e) for t, e in collected["rows"].items()}
+
+    for f in list_headshots(client):
+        meta = f.get("metadata") or {}
+        collected["headshots"][f["name"]] = meta.get("eTag") or f"{meta.get('size')}:{f.get('updated_at')}"
+    del client
+    return collected
+
+
+@traced(attrs=("env", "table_name", "bucket_ids"))
+def _bucket_rows(env, collected, table_name, buckets, bucket_ids):
+    """Return {bucket: [(key, digest, row), ...]} for the given buckets of one table."""
+    out = {b: [] for b in bucket_ids}
+    if collected["mode"] == "server":
+        client = get_client(env)
+        data = client.rpc("sync_bucket_rows", {"p_table": table_name, "p_buckets": buckets[table_name],
+                                               "p_bucket_ids": list(bucket_ids)}).execute().data or []
+        del client
+        for d in data:
+            out[d["bucket"]].append((d["row_key"], d["row_digest"], d["row_data"]))
+    else:
+        for bucket, key, digest, row in collected["rows"][table_name]:
+            if bucket in out:
+                out[bucket].append((key, digest, row))
+    return out
+
+
+def _diff_bucket_rows(src_rows, dst_rows):
+    """Multiset-compare rows of one bucket; return (missing_in_dest, extra_in_dest)."""
+    dst_pool = {}
+    for key, digest, row in dst_rows:
+        dst_pool.setdefault(digest, []).append((key, row))
+    missing = []
+    for key, digest, row in src_rows:
+        if dst_pool.get(digest):
+            dst_pool[digest].pop()
+        else:
+            missing.append({"key": key, "row": row})
+    extra = [{"key": key, "row": row} for pairs in dst_pool.values() for key, row in pairs]
+    return missing, extra
+
+
+@traced(attrs=("source", "destination"))
+def verify_environments(source="staging", destination="production"):
+    """
+    Check whether two environments hold the same data without copying it.
 
-    Order matters:
-    1. Members first (because points_tracking has FK to members)
-    2. Events
-    3. Points tracking (needs member_id remapping)
-    4. Headshot files from storage (incremental — only new/changed files)
+    Each side reports per-bucket row counts and order-independent digests for
+    members, events, points_tracking and points_history, plus storage checksums for headshots.
+    Only buckets whose digests disagree are drilled into to list the exact rows
+    that differ.  Uses the sync_* SQL functions when installed on both sides,
+    otherwise falls back to hashing rows client-side.
 
-    NOTE: supabase-py v2 has a shared-header bug — two clients created
-    in the same process overwrite each other's API key.  We work around
-    this by reading ALL data from the source first, then creating the
-    destination client to write.
+    Like push/pull, clients are created one at a time to avoid the supabase-py
+    shared-header bug.
     """
-    results = {"members": 0, "events": 0, "points": 0, "headshots": 0, "skipped_headshots": 0, "deleted_headshots": 0, "errors": []}
-    MAX_WORKERS = 8
+    results = {"match": True, "mode": None, "tables": {}, "headshots": {}, "errors": []}
+    buckets = VERIFY_BUCKETS
 
     try:
-        # ── Phase 1: READ db data + list staging files ──
-        staging = get_client("staging")
-        staging_members = staging.table("members").select("*").execute().data or []
-        staging_events = staging.table("events").select("*").execute().data or []
-        staging_points = staging.table("points_tracking").select("*").execute().data or []
-
-        staging_file_list = []
-        try:
-            staging_file_list = staging.storage.from_("headshots").list("eboard", {"limit": 1000})
-        except Exception as e:
-            results["errors"].append(f"Staging storage list error: {str(e)}")
-
-        del staging
-
-        # ── Phase 2: CLEAR destination, then INSERT source data ──
-        prod = get_client("production")
-        staging_url = get_supabase_url("staging")
-        prod_url = get_supabase_url("production")
-
-        # Step 1: Delete all destination data (FK order: points first, then events, then members)
-        try:
-            _delete_all_rows(prod, "points_tracking")
-        except Exception as e:
-            results["errors"].append(f"Delete production points_tracking: {str(e)}")
-
-        try:
-            _delete_all_rows(prod, "events")
-        except Exception as e:
-            results["errors"].append(f"Delete production events: {str(e)}")
-
-        try:
-            _delete_all_rows(prod, "members")
-        except Exception as e:
-            results["errors"].append(f"Delete production members: {str(e)}")
-
-        # Step 2: Insert all members (with URL rewriting)
-        member_copies = _rewrite_urls(staging_members, staging_url, prod_url)
-        if member_copies:
-            try:
-                prod.table("members").insert(member_copies).execute()
-                results["members"] = len(member_copies)
-            except Exception as e:
-                results["errors"].append(f"Bulk member insert: {str(e)}")
-
-        # Step 3: Insert all events (strip id)
-        event_copies = [{k: v for k, v in ev.items() if k != 'id'} for ev in staging_events]
-        if event_copies:
-            try:
-                prod.table("events").insert(event_copies).execute()
-                results["events"] = len(event_copies)
-            except Exception as e:
-                results["errors"].append(f"Bulk event insert: {str(e)}")
-
-        # Step 4: Insert all points (remap member_id via netid)
-        prod_members = prod.table("members").select("id, netid").execute().data or []
-        remapped, pt_errors = _remap_points(staging_points, staging_members, prod_members)
-        results["errors"].extend(pt_errors)
-        if remapped:
-            try:
-                prod.table("points_tracking").insert(remapped).execute()
-                results["points"] = len(remapped)
-            except Exception as e:
-                results["errors"].append(f"Bulk points insert: {str(e)}")
-
-        # Step 5: Diff headshot file lists + delete extras
-        prod_file_list = []
         try:
-            prod_file_list = prod.storage.from_("headshots").list("eboard", {"limit": 1000})
+            src = _collect_digests(source, "server", buckets)
+            dst = _collect_digests(destination, "server", buckets)
         except Exception as e:
-            results["errors"].append(f"Production storage list error: {str(e)}")
-
-        try:
-            results["deleted_headshots"] = _delete_extra_headshots(prod, staging_file_list, prod_file_list)
-        except Exception as e:
-            results["errors"].append(f"Delete extra production headshots: {str(e)}")
-
-        changed_files = _diff_headshot_lists(staging_file_list, prod_file_list)
-        results["skipped_headshots"] = len(staging_file_list) - len(changed_files)
-
-        del prod
-
-        if changed_files:
-            # ── Phase 3: Download changed headshots from staging (parallel) ──
-            staging2 = get_client("staging")
-
-            def _download_one(file_info):
-                name = file_info["name"]
-                path = f"eboard/{name}"
-                ctype = (file_info.get("metadata") or {}).get("mimetype", "image/jpeg")
-                data = _retry(lambda p=path: staging2.storage.from_("headshots").download(p))
-                return (path, data, ctype)
-
-            downloaded = []
-            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
-                futures = {pool.submit(_download_one, fi): fi for fi in changed_files}
-                for future in as_completed(futures):
-                    fi = futures[future]
-                    try:
-                        downloaded.append(future.result())
-                    except Exception as e:
-                        results["errors"].append(f"Headshot download eboard/{fi['name']}: {str(e)}")
-
-            del staging2
-
-            # ── Phase 4: Upload changed headshots to production (parallel) ──
-            prod2 = get_client("production")
-
-            def _upload_one(item):
-                fpath, fbytes, content_type = item
-                def _do_upload():
-                    try:
-                        prod2.storage.from_("headshots").upload(
-                            fpath, fbytes, {"content-type": content_type, "x-upsert": "true"})
-                    except Exception:
-                        prod2.storage.from_("headshots").remove([fpath])
-                        prod2.storage.from_("headshots").upload(
-                            fpath, fbytes, {"content-type": content_type})
-                _retry(_do_upload)
-                return fpath
-
-            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
-                futures = {pool.submit(_upload_one, item): item[0] for item in downloaded}
-                for future in as_completed(futures):
-                    path = futures[future]
-                    try:
-                        future.result()
-                        results["headshots"] += 1
-                    except Exception as e:
-                        results["errors"].append(f"Headshot upload {path}: {str(e)}")
+            print(f"Digest functions unavailable ({str(e)}); hashing rows locally")
+            src = _collect_digests(source, "local", buckets)
+            dst = _collect_digests(destination, "local", buckets)
+        results["mode"] = src["mode"]
+
+        for table_name in VERIFY_TABLES:
+            src_buckets = src["tables"][table_name]
+            dst_buckets = dst["tables"][table_name]
+            mismatched = sorted(b for b in set(src_buckets) | set(dst_buckets)
+                                if src_buckets.get(b) != dst_buckets.get(b))
+            table_result = {
+                "source_count": sum(c for c, _ in src_buckets.values()),
+                "destination_count": sum(c for c, _ in dst_buckets.values()),
+                "mismatched_ranges": mismatched,
+                "missing_in_destination": [],
+                "extra_in_destination": [],
+            }
+            if mismatched:
+                results["match"] = False
+                try:
+                    src_rows = _bucket_rows(source, src, table_name, buckets, mismatched)
+                    dst_rows = _bucket_rows(destination, dst, table_name, buckets, mismatched)
+                    for b in mismatched:
+                        missing, extra = _diff_bucket_rows(src_rows[b], dst_rows[b])
+                        table_result["missing_in_destination"].extend(missing)
+                        table_result["extra_in_destination"].extend(extra)
+                except Exception as e:
+                    results["errors"].append(f"Drill-down {table_name}: {str(e)}")
+            results["tables"][table_name] = table_result
+
+        src_files = src["headshots"]
+        dst_files = dst["headshots"]
+        headshot_result = {
+            "source_count": len(src_files),
+            "destination_count": len(dst_files),
+            "missing_in_destination": sorted(n for n in src_files if n not in dst_files),
+            "extra_in_destination": sorted(n for n in dst_files if n not in src_files),
+            "changed": sorted(n for n in src_files if n in dst_files and src_files[n] != dst_files[n]),
+        }
+        if headshot_result["missing_in_destination"] or headshot_result["extra_in_destination"] or headshot_result["changed"]:
+            results["match"] = False
+        results["headshots"] = headshot_result
 
     except Exception as e:
-        results["errors"].append(f"Sync error: {str(e)}")
+        results["match"] = False
+        results["errors"].append(f"Verify error: {str(e)}")
 
     return results
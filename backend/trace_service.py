@@ -0,0 +1,303 @@
+import os
+import json
+import time
+import uuid
+import inspect
+import functools
+import threading
+import contextvars
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+
+TRACE_DIR = Path(__file__).parent.parent / 'traces'
+TRACE_FILE = TRACE_DIR / 'spans.jsonl'
+TRACE_MAX_BYTES = 20 * 1024 * 1024  # rotate spans.jsonl to spans.jsonl.1 past this
+MAX_SPANS_PER_TRACE = 5000  # raw spans kept per trace; the per-operation summary counts every span
+RECENT_TRACES = 50  # trace summaries kept in memory for /traces
+
+_current = contextvars.ContextVar("current_span", default=None)
+_export_lock = threading.Lock()
+_recent = deque(maxlen=RECENT_TRACES)
+
+
+def tracing_enabled():
+    """TRACING=0 turns span collection off entirely."""
+    return os.getenv("TRACING", "1") != "0"
+
+
+def _min_trace_ms():
+    """Only traces at least this long (TRACE_MIN_MS, default 100) are exported, so polling routes stay out."""
+    try:
+        return float(os.getenv("TRACE_MIN_MS", "100"))
+    except ValueError:
+        return 100.0
+
+
+class _Trace:
+    def __init__(self):
+        self.id = uuid.uuid4().hex[:16]
+        self.lock = threading.Lock()
+        self.spans = []  # finished span records, up to MAX_SPANS_PER_TRACE
+        self.dropped = 0
+        self.ops = {}  # name -> [count, total ms, self ms, max ms]
+        self.keep = False  # export even if shorter than TRACE_MIN_MS
+
+
+class Span:
+    __slots__ = ("trace", "id", "parent", "name", "attrs", "start", "start_wall", "child_ms", "error")
+
+    def __init__(self, name, parent, attrs):
+        self.trace = parent.trace if parent else _Trace()
+        self.id = uuid.uuid4().hex[:12]
+        self.parent = parent
+        self.name = name
+        self.attrs = attrs
+        self.start = time.perf_counter()
+        self.start_wall = time.time()
+        self.child_ms = 0.0
+        self.error = None
+
+    @property
+    def trace_id(self):
+        return self.trace.id
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class _NoSpan:
+    """Stand-in when tracing is off, so callers can still call .set()."""
+    trace_id = None
+
+    def set(self, **attrs):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+def current_span():
+    return _current.get() or _NO_SPAN
+
+
+def set_attributes(**attrs):
+    """Add attributes (bytes, retries, counts...) to the span that is currently open."""
+    current_span().set(**attrs)
+
+
+def keep_trace():
+    """Export the current trace however short it turns out, e.g. because a job record links to it."""
+    span = _current.get()
+    if span is not None:
+        span.trace.keep = True
+
+
+def start_span(name, **attrs):
+    """Open a span under the current one (or a new trace). Returns the handle finish_span takes."""
+    if not tracing_enabled():
+        return None
+    span = Span(name, _current.get(), attrs)
+    return span, _current.set(span)
+
+
+def finish_span(handle, error=None):
+    if handle is None:
+        return
+    span, token = handle
+    try:
+        _current.reset(token)
+    except ValueError:
+        # Finished from a different context than it started in (e.g. a request teardown)
+        _current.set(span.parent)
+    duration_ms = (time.perf_counter() - span.start) * 1000
+    if error is not None:
+        span.error = str(error)[:300]
+    trace = span.trace
+    with trace.lock:
+        if span.parent is not None:
+            span.parent.child_ms += duration_ms
+        op = trace.ops.setdefault(span.name, [0, 0.0, 0.0, 0.0])
+        op[0] += 1
+        op[1] += duration_ms
+        op[2] += max(duration_ms - span.child_ms, 0.0)
+        op[3] = max(op[3], duration_ms)
+        if len(trace.spans) < MAX_SPANS_PER_TRACE:
+            trace.spans.append({
+                "type": "span", "trace_id": trace.id, "span_id": span.id,
+                "parent_id": span.parent.id if span.parent else None, "name": span.name,
+                "start": span.start_wall, "duration_ms": round(duration_ms, 3),
+                "attrs": span.attrs, "error": span.error, "thread": threading.current_thread().name,
+            })
+        else:
+            trace.dropped += 1
+    if span.parent is None:
+        _export(span, duration_ms)
+
+
+@contextmanager
+def span(name, **attrs):
+    """Run a block inside a span: `with span("sync.copy_members", rows=n) as s: ... s.set(bytes=...)`."""
+    handle = start_span(name, **attrs)
+    try:
+        yield handle[0] if handle else _NO_SPAN
+    except BaseException as e:
+        finish_span(handle, e)
+        raise
+    finish_span(handle)
+
+
+def traced(name=None, attrs=()):
+    """
+    Decorator that runs the function inside a span.
+
+    attrs names arguments to record on the span; list/dict/set arguments are
+    recorded as <name>_count so a span shows how many netids or rows it handled.
+    """
+    def decorate(fn):
+        op = name or f"{fn.__module__.replace('_service', '')}.{fn.__name__}"
+        signature = inspect.signature(fn)
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not tracing_enabled():
+                return fn(*args, **kwargs)
+            values = {}
+            if attrs:
+                bound = signature.bind_partial(*args, **kwargs).arguments
+                for arg in attrs:
+                    if arg in bound:
+                        value = bound[arg]
+                        if isinstance(value, (list, tuple, set, dict)):
+                            values[f"{arg}_count"] = len(value)
+                        else:
+                            values[arg] = value
+            with span(op, **values):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def in_current_trace(fn):
+    """
+    Wrap fn so a worker thread (executor.submit) runs it in the caller's context.
+
+    It runs as a child of the span open here, and the caller's other context
+    (open round-trip budgets, request accounting) carries over too.
+    """
+    context = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def run(*args, **kwargs):
+        # A context can only be entered by one thread at a time, so each call runs in its own copy
+        return context.copy().run(fn, *args, **kwargs)
+    return run
+
+
+# ── Export and summaries ────────────────────────────────────────────────
+
+def _summary_rows(ops):
+    rows = [{"name": name, "count": c, "total_ms": round(total, 1), "self_ms": round(self_ms, 1),
+             "max_ms": round(mx, 1)} for name, (c, total, self_ms, mx) in ops.items()]
+    return sorted(rows, key=lambda r: r["self_ms"], reverse=True)
+
+
+def _export(root, duration_ms):
+    trace = root.trace
+    if duration_ms < _min_trace_ms() and not trace.keep:
+        return
+    record = {
+        "type": "trace", "trace_id": trace.id, "name": root.name, "attrs": root.attrs,
+        "started_at": datetime.fromtimestamp(root.start_wall, timezone.utc).isoformat(),
+        "duration_ms": round(duration_ms, 1), "error": root.error,
+        "spans": len(trace.spans) + trace.dropped, "dropped_spans": trace.dropped,
+        "summary": _summary_rows(trace.ops),
+    }
+    with _export_lock:
+        _recent.appendleft({**record, "_spans": trace.spans})
+        try:
+            TRACE_DIR.mkdir(exist_ok=True)
+            if TRACE_FILE.exists() and TRACE_FILE.stat().st_size > TRACE_MAX_BYTES:
+                os.replace(TRACE_FILE, TRACE_FILE.with_suffix(".jsonl.1"))
+            with open(TRACE_FILE, "a") as f:
+                for s in trace.spans:
+                    f.write(json.dumps(s, default=str) + "\n")
+                f.write(json.dumps(record, default=str) + "\n")
+        except OSError as e:
+            print(f"Warning: could not write trace {trace.id}: {str(e)}")
+
+
+def list_traces(limit=20):
+    """The most recent exported traces (newest first), without their spans."""
+    with _export_lock:
+        return [{k: v for k, v in t.items() if k not in ("_spans", "summary")} for t in list(_recent)[:limit]]
+
+
+def _read_trace_from_file(trace_id):
+    record, spans = None, []
+    for path in (TRACE_FILE.with_suffix(".jsonl.1"), TRACE_FILE):
+        if not path.exists():
+            continue
+        with open(path) as f:
+            for line in f:
+                if trace_id not in line:
+                    continue
+                entry = json.loads(line)
+                if entry.get("trace_id") != trace_id:
+                    continue
+                if entry["type"] == "trace":
+                    record = entry
+                else:
+                    spans.append(entry)
+    return (record, spans) if record else (None, None)
+
+
+def get_trace(trace_id):
+    """
+    Return {trace, summary, timeline} for one trace, or None.
+
+    summary is one row per operation (count, total, self and max ms), sorted
+    by self time so the loop that dominates is on top. timeline lists the
+    kept spans in start order with their offset from the root and depth.
+    """
+    with _export_lock:
+        found = next((t for t in _recent if t["trace_id"] == trace_id), None)
+    if found:
+        record, spans = {k: v for k, v in found.items() if k != "_spans"}, found["_spans"]
+    else:
+        record, spans = _read_trace_from_file(trace_id)
+        if record is None:
+            return None
+
+    depth = {}
+    by_id = {s["span_id"]: s for s in spans}
+
+    def depth_of(s):
+        if s["span_id"] not in depth:
+            parent = by_id.get(s["parent_id"])
+            depth[s["span_id"]] = 0 if parent is None else depth_of(parent) + 1
+        return depth[s["span_id"]]
+
+    start = min((s["start"] for s in spans), default=0)
+    timeline = [{"offset_ms": round((s["start"] - start) * 1000, 1), "duration_ms": s["duration_ms"],
+                 "depth": depth_of(s), "name": s["name"], "attrs": s["attrs"], "error": s["error"]}
+                for s in sorted(spans, key=lambda s: s["start"])]
+    summary = record.pop("summary")
+    return {"trace": record, "summary": summary, "timeline": timeline}
+
+
+def format_trace(trace):
+    """Plain-text rendering of get_trace(): the per-operation table, then the indented timeline."""
+    info = trace["trace"]
+    lines = [f"{info['name']}  {info['duration_ms']} ms  ({info['spans']} spans"
+             + (f", {info['dropped_spans']} not kept" if info["dropped_spans"] else "") + ")", "",
+             f"{'operation':<48}{'count':>8}{'total ms':>12}{'self ms':>12}{'max ms':>10}"]
+    for row in trace["summary"]:
+        lines.append(f"{row['name'][:47]:<48}{row['count']:>8}{row['total_ms']:>12}{row['self_ms']:>12}{row['max_ms']:>10}")
+    lines += ["", "timeline (offset ms, duration ms):"]
+    for s in trace["timeline"]:
+        attrs = " ".join(f"{k}={v}" for k, v in s["attrs"].items())
+        error = f"  ERROR {s['error']}" if s["error"] else ""
+        lines.append(f"{s['offset_ms']:>10} {s['duration_ms']:>10}  {'  ' * s['depth']}{s['name']} {attrs}{error}")
+    return "\n".join(lines) + "\n"
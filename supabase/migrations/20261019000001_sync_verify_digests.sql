@@ -0,0 +1,66 @@
+-- Order-independent content digests used by sync_service.verify_environments().
+--
+-- Rows are reduced to an environment-agnostic canonical form (no surrogate ids
+-- or timestamps, points keyed by netid instead of member_id, headshot URLs
+-- stripped of the project domain) so that staging and production produce the
+-- same digest for the same data.  Rows are bucketed by md5 of their natural
+-- key; the Python fallback in sync_service uses the same bucketing.
+
+create or replace function public.sync_row_digests(p_table text, p_buckets int default 1)
+returns table(bucket int, row_key text, row_digest text, row_data jsonb)
+language plpgsql stable as $$
+begin
+    if p_table = 'members' then
+        return query
+        select (('x' || substr(md5(coalesce(c.k, '')), 1, 8))::bit(32)::bigint % p_buckets)::int,
+               c.k, md5(c.j::text), c.j
+        from (
+            select m.netid as k,
+                   (to_jsonb(m) - 'id' - 'created_at' - 'updated_at')
+                   || jsonb_build_object(
+                        'headshot_url', regexp_replace(m.headshot_url, '^.*/storage/v1/object/public/', ''),
+                        'secondary_headshot_url', regexp_replace(m.secondary_headshot_url, '^.*/storage/v1/object/public/', '')
+                   ) as j
+            from public.members m
+        ) c;
+    elsif p_table = 'events' then
+        return query
+        select (('x' || substr(md5(coalesce(c.k, '')), 1, 8))::bit(32)::bigint % p_buckets)::int,
+               c.k, md5(c.j::text), c.j
+        from (
+            select coalesce(e.name, '') || '|' || coalesce(e.date::text, '') as k,
+                   to_jsonb(e) - 'id' - 'created_at' - 'updated_at' as j
+            from public.events e
+        ) c;
+    elsif p_table = 'points_tracking' then
+        return query
+        select (('x' || substr(md5(coalesce(c.k, '')), 1, 8))::bit(32)::bigint % p_buckets)::int,
+               c.k, md5(c.j::text), c.j
+        from (
+            select m.netid as k,
+                   jsonb_build_object('netid', m.netid, 'points', p.points,
+                                      'semester', p.semester, 'reason', p.reason) as j
+            from public.points_tracking p
+            left join public.members m on m.id = p.member_id
+        ) c;
+    else
+        raise exception 'sync_row_digests: unsupported table %', p_table;
+    end if;
+end;
+$$;
+
+create or replace function public.sync_table_digests(p_table text, p_buckets int default 1)
+returns table(bucket int, row_count bigint, digest text)
+language sql stable as $$
+    select d.bucket, count(*),
+           sum(('x' || substr(d.row_digest, 1, 15))::bit(60)::bigint::numeric)::text
+    from public.sync_row_digests(p_table, p_buckets) d
+    group by d.bucket;
+$$;
+
+create or replace function public.sync_bucket_rows(p_table text, p_buckets int, p_bucket_ids int[])
+returns table(bucket int, row_key text, row_digest text, row_data jsonb)
+language sql stable as $$
+    select * from public.sync_row_digests(p_table, p_buckets) d
+    where d.bucket = any(p_bucket_ids);
+$$;
@@ -0,0 +1,12 @@
+-- Store headshots as bucket-relative object keys (e.g. 'eboard/ab123Primary.jpeg')
+-- instead of absolute public URLs tied to one Supabase project.  Readers turn
+-- keys into URLs with supabase_clients.resolve_storage_url(); absolute URLs
+-- that slip through still resolve unchanged.
+
+update public.members
+set headshot_url = regexp_replace(headshot_url, '^.*/storage/v1/object/public/headshots/', '')
+where headshot_url like '%/storage/v1/object/public/headshots/%';
+
+update public.members
+set secondary_headshot_url = regexp_replace(secondary_headshot_url, '^.*/storage/v1/object/public/headshots/', '')
+where secondary_headshot_url like '%/storage/v1/object/public/headshots/%';
@@ -0,0 +1,75 @@
+-- Per-member, per-semester points totals, maintained incrementally by a
+-- trigger on points_tracking so every writer (dashboard, form ingestion, sync,
+-- manual SQL) keeps it current.  reconcile_points_totals() rebuilds it from
+-- scratch and returns how many rows were out of date.
+
+create table if not exists public.points_totals (
+    member_id uuid not null references public.members(id) on delete cascade,
+    semester text not null,
+    total integer not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (member_id, semester)
+);
+
+create index if not exists points_totals_semester_total_idx
+    on public.points_totals (semester, total desc);
+
+create or replace function public.apply_points_total_delta(p_member_id uuid, p_semester text, p_delta integer)
+returns void language sql as $$
+    insert into public.points_totals (member_id, semester, total)
+    values (p_member_id, p_semester, p_delta)
+    on conflict (member_id, semester)
+    do update set total = public.points_totals.total + excluded.total, updated_at = now();
+$$;
+
+create or replace function public.points_tracking_totals_trigger()
+returns trigger language plpgsql as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') and old.member_id is not null then
+        -- The member row may already be gone (cascade); nothing to decrement then.
+        if exists (select 1 from public.members where id = old.member_id) then
+            perform public.apply_points_total_delta(old.member_id, old.semester, -coalesce(old.points, 0));
+        end if;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') and new.member_id is not null then
+        perform public.apply_points_total_delta(new.member_id, new.semester, coalesce(new.points, 0));
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists points_tracking_totals on public.points_tracking;
+create trigger points_tracking_totals
+    after insert or update or delete on public.points_tracking
+    for each row execute function public.points_tracking_totals_trigger();
+
+create or replace function public.reconcile_points_totals()
+returns integer language plpgsql as $$
+declare
+    drift integer;
+begin
+    create temporary table _expected on commit drop as
+        select member_id, semester, sum(coalesce(points, 0))::integer as total
+        from public.points_tracking
+        where member_id is not null
+        group by member_id, semester;
+
+    select count(*) into drift
+    from _expected e
+    full join public.points_totals t using (member_id, semester)
+    where e.total is distinct from t.total;
+
+    delete from public.points_totals t
+    where not exists (select 1 from _expected e where e.member_id = t.member_id and e.semester = t.semester);
+
+    insert into public.points_totals (member_id, semester, total)
+    select member_id, semester, total from _expected
+    on conflict (member_id, semester)
+    do update set total = excluded.total, updated_at = now()
+    where public.points_totals.total is distinct from excluded.total;
+
+    return drift;
+end;
+$$;
+
+select public.reconcile_points_totals();
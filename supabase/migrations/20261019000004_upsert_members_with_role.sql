@@ -0,0 +1,38 @@
+-- Bulk roster upsert with an atomic role merge.
+--
+-- p_members is a JSON array of member objects keyed by netid.  Each object is
+-- upserted with only the columns it carries (so e.g. a missing headshot_url
+-- leaves the stored one alone), and p_role is appended to members.role unless
+-- already present.  The append happens under the row lock taken by
+-- ON CONFLICT, so concurrent imports cannot lose each other's roles.
+
+create or replace function public.upsert_members_with_role(p_members jsonb, p_role text)
+returns setof public.members
+language plpgsql as $$
+declare
+    m jsonb;
+    cols text;
+    sets text;
+    r public.members;
+begin
+    for m in select value from jsonb_array_elements(p_members) loop
+        select string_agg(quote_ident(k), ', '),
+               string_agg(format('%1$I = excluded.%1$I', k), ', ') filter (where k <> 'netid')
+          into cols, sets
+          from jsonb_object_keys(m) as k
+         where k not in ('id', 'role');
+
+        execute format(
+            'insert into public.members as t (%1$s, role)
+             select %1$s, array[$2]::text[] from jsonb_populate_record(null::public.members, $1)
+             on conflict (netid) do update set %2$s
+                 role = case when $2 = any(coalesce(t.role, ''{}''::text[])) then t.role
+                             else coalesce(t.role, ''{}''::text[]) || $2 end
+             returning *',
+            cols, coalesce(sets || ',', ''))
+          into r
+          using m, p_role;
+        return next r;
+    end loop;
+end;
+$$;
@@ -0,0 +1,40 @@
+-- Per-role hashes of the normalized profile last written by ingestion, e.g.
+-- {"eboard": "<sha256>", "ta": "<sha256>"}.  Ingestion compares against these
+-- to skip upserting members whose form answers haven't changed.
+
+alter table public.members add column if not exists profile_hashes jsonb not null default '{}'::jsonb;
+
+-- Same as before, except profile_hashes is merged rather than replaced so an
+-- eboard import doesn't clobber the TA hash (and vice versa).
+create or replace function public.upsert_members_with_role(p_members jsonb, p_role text)
+returns setof public.members
+language plpgsql as $$
+declare
+    m jsonb;
+    cols text;
+    sets text;
+    r public.members;
+begin
+    for m in select value from jsonb_array_elements(p_members) loop
+        select string_agg(quote_ident(k), ', '),
+               string_agg(case when k = 'profile_hashes'
+                               then 'profile_hashes = coalesce(t.profile_hashes, ''{}''::jsonb) || excluded.profile_hashes'
+                               else format('%1$I = excluded.%1$I', k) end, ', ') filter (where k <> 'netid')
+          into cols, sets
+          from jsonb_object_keys(m) as k
+         where k not in ('id', 'role');
+
+        execute format(
+            'insert into public.members as t (%1$s, role)
+             select %1$s, array[$2]::text[] from jsonb_populate_record(null::public.members, $1)
+             on conflict (netid) do update set %2$s
+                 role = case when $2 = any(coalesce(t.role, ''{}''::text[])) then t.role
+                             else coalesce(t.role, ''{}''::text[]) || $2 end
+             returning *',
+            cols, coalesce(sets || ',', ''))
+          into r
+          using m, p_role;
+        return next r;
+    end loop;
+end;
+$$;
@@ -0,0 +1,9 @@
+-- Resized flyer images for events, stored as {"<width>": "<object key>"} in
+-- the public 'flyers' bucket (e.g. {"1200": "events/<hash>-1200.webp"}).
+-- Resolve keys with supabase_clients.resolve_storage_url(key, bucket="flyers").
+
+alter table public.events add column if not exists flyer_images jsonb;
+
+insert into storage.buckets (id, name, public)
+values ('flyers', 'flyers', true)
+on conflict (id) do nothing;
@@ -0,0 +1,10 @@
+-- Precomputed JSON for the public site (eboard.json, tas.json, events.json
+-- under data/), written by publish_service.publish_site.  The bucket is public
+-- so the site fetches these files directly instead of querying tables.
+
+insert into storage.buckets (id, name, public)
+values ('site', 'site', true)
+on conflict (id) do nothing;
+
+-- TA course, used to group the published TA directory
+alter table public.members add column if not exists course text;
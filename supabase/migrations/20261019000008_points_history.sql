@@ -0,0 +1,126 @@
+-- Semester archival.  Closing a semester moves its points_tracking rows into a
+-- gzipped archive in the private 'archives' bucket and leaves one summary row
+-- per member in points_history.  points_totals counts both tables, so closing
+-- (insert history, delete raw rows) and reopening (the reverse) are net zero.
+
+create table if not exists public.points_history (
+    member_id uuid not null references public.members(id) on delete cascade,
+    semester text not null,
+    total integer not null,
+    entries integer not null,
+    archive_key text not null,
+    archived_at timestamptz not null default now(),
+    primary key (member_id, semester)
+);
+
+create index if not exists points_history_semester_idx on public.points_history (semester);
+
+insert into storage.buckets (id, name, public)
+values ('archives', 'archives', false)
+on conflict (id) do nothing;
+
+create or replace function public.points_history_totals_trigger()
+returns trigger language plpgsql as $$
+begin
+    if tg_op in ('UPDATE', 'DELETE') then
+        if exists (select 1 from public.members where id = old.member_id) then
+            perform public.apply_points_total_delta(old.member_id, old.semester, -old.total);
+        end if;
+    end if;
+    if tg_op in ('INSERT', 'UPDATE') then
+        perform public.apply_points_total_delta(new.member_id, new.semester, new.total);
+    end if;
+    return null;
+end;
+$$;
+
+drop trigger if exists points_history_totals on public.points_history;
+create trigger points_history_totals
+    after insert or update or delete on public.points_history
+    for each row execute function public.points_history_totals_trigger();
+
+-- Same as before, but archived semesters count toward the expected totals.
+create or replace function public.reconcile_points_totals()
+returns integer language plpgsql as $$
+declare
+    drift integer;
+begin
+    create temporary table _expected on commit drop as
+        select member_id, semester, sum(total)::integer as total
+        from (
+            select member_id, semester, coalesce(points, 0) as total
+            from public.points_tracking
+            where member_id is not null
+            union all
+            select member_id, semester, total from public.points_history
+        ) rows
+        group by member_id, semester;
+
+    select count(*) into drift
+    from _expected e
+    full join public.points_totals t using (member_id, semester)
+    where e.total is distinct from t.total;
+
+    delete from public.points_totals t
+    where not exists (select 1 from _expected e where e.member_id = t.member_id and e.semester = t.semester);
+
+    insert into public.points_totals (member_id, semester, total)
+    select member_id, semester, total from _expected
+    on conflict (member_id, semester)
+    do update set total = excluded.total, updated_at = now()
+    where public.points_totals.total is distinct from excluded.total;
+
+    return drift;
+end;
+$$;
+
+-- Swap a semester's raw rows for per-member summaries.  The caller passes the
+-- row count and points sum of the archive it already uploaded and verified;
+-- the table is locked against new awards and must still match them exactly.
+create or replace function public.close_semester(p_semester text, p_expected_rows integer,
+                                                 p_expected_total bigint, p_archive_key text)
+returns integer language plpgsql as $$
+declare
+    n integer;
+    s bigint;
+begin
+    if exists (select 1 from public.points_history where semester = p_semester) then
+        raise exception 'Semester % is already archived; reopen it first', p_semester;
+    end if;
+
+    lock table public.points_tracking in share row exclusive mode;
+
+    select count(*), coalesce(sum(coalesce(points, 0)), 0) into n, s
+    from public.points_tracking where semester = p_semester;
+    if n <> p_expected_rows or s <> p_expected_total then
+        raise exception 'Points for % changed since the archive was written (table has % rows / % points, archive has % / %)',
+            p_semester, n, s, p_expected_rows, p_expected_total;
+    end if;
+
+    insert into public.points_history (member_id, semester, total, entries, archive_key)
+    select member_id, semester, sum(coalesce(points, 0))::integer, count(*)::integer, p_archive_key
+    from public.points_tracking
+    where semester = p_semester and member_id is not null
+    group by member_id, semester;
+
+    delete from public.points_tracking where semester = p_semester;
+    return n;
+end;
+$$;
+
+-- Put archived rows (already remapped to current member ids) back and drop
+-- the summaries.  Columns match what sync copies; ids are reassigned.
+create or replace function public.reopen_semester(p_semester text, p_rows jsonb)
+returns integer language plpgsql as $$
+declare
+    n integer;
+begin
+    delete from public.points_history where semester = p_semester;
+
+    insert into public.points_tracking (member_id, points, semester, reason)
+    select member_id, points, semester, reason
+    from jsonb_populate_recordset(null::public.points_tracking, p_rows);
+    get diagnostics n = row_count;
+    return n;
+end;
+$$;
@@ -0,0 +1,58 @@
+-- Add points_history to the verify digests.  Closed semesters live only as
+-- summaries there, so without it verify_environments() could report a match
+-- while one environment was missing a semester.  Same canonical form as the
+-- Python fallback in sync_service: keyed by netid, archived_at left out.
+
+create or replace function public.sync_row_digests(p_table text, p_buckets int default 1)
+returns table(bucket int, row_key text, row_digest text, row_data jsonb)
+language plpgsql stable as $$
+begin
+    if p_table = 'members' then
+        return query
+        select (('x' || substr(md5(coalesce(c.k, '')), 1, 8))::bit(32)::bigint % p_buckets)::int,
+               c.k, md5(c.j::text), c.j
+        from (
+            select m.netid as k,
+                   (to_jsonb(m) - 'id' - 'created_at' - 'updated_at')
+                   || jsonb_build_object(
+                        'headshot_url', regexp_replace(m.headshot_url, '^.*/storage/v1/object/public/', ''),
+                        'secondary_headshot_url', regexp_replace(m.secondary_headshot_url, '^.*/storage/v1/object/public/', '')
+                   ) as j
+            from public.members m
+        ) c;
+    elsif p_table = 'events' then
+        return query
+        select (('x' || substr(md5(coalesce(c.k, '')), 1, 8))::bit(32)::bigint % p_buckets)::int,
+               c.k, md5(c.j::text), c.j
+        from (
+            select coalesce(e.name, '') || '|' || coalesce(e.date::text, '') as k,
+                   to_jsonb(e) - 'id' - 'created_at' - 'updated_at' as j
+            from public.events e
+        ) c;
+    elsif p_table = 'points_tracking' then
+        return query
+        select (('x' || substr(md5(coalesce(c.k, '')), 1, 8))::bit(32)::bigint % p_buckets)::int,
+               c.k, md5(c.j::text), c.j
+        from (
+            select m.netid as k,
+                   jsonb_build_object('netid', m.netid, 'points', p.points,
+                                      'semester', p.semester, 'reason', p.reason) as j
+            from public.points_tracking p
+            left join public.members m on m.id = p.member_id
+        ) c;
+    elsif p_table = 'points_history' then
+        return query
+        select (('x' || substr(md5(coalesce(c.k, '')), 1, 8))::bit(32)::bigint % p_buckets)::int,
+               c.k, md5(c.j::text), c.j
+        from (
+            select m.netid as k,
+                   jsonb_build_object('netid', m.netid, 'semester', h.semester, 'total', h.total,
+                                      'entries', h.entries, 'archive_key', h.archive_key) as j
+            from public.points_history h
+            left join public.members m on m.id = h.member_id
+        ) c;
+    else
+        raise exception 'sync_row_digests: unsupported table %', p_table;
+    end if;
+end;
+$$;
@@ -0,0 +1,139 @@
+import os
+import sys
+import json
+from types import SimpleNamespace
+from pathlib import Path
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+import requests
+import requests.adapters
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "backend"))
+
+import supabase_standin  # noqa: E402
+from metrics_service import install_http_instrumentation  # noqa: E402
+
+
+class FakeGoogle:
+    """
+    Just enough of the Forms and Drive APIs for the import paths.
+
+    Calls still go through requests' HTTPAdapter.send, so the HTTP
+    instrumentation (and any open round-trip budget) counts them.
+    """
+
+    def __init__(self):
+        self.forms = {}  # form id -> (form, [response])
+        self.files = {}  # drive file id -> (bytes, mime type)
+
+    def reset(self):
+        self.forms.clear()
+        self.files.clear()
+
+    def add_form(self, form_id, title, questions, answers):
+        """
+        questions: [question title]; answers: [{question title: answer}], one per response.
+
+        An answer is text, or a Drive file id added with add_file for an upload question.
+        """
+        qids = {q: f"q{i}" for i, q in enumerate(questions)}
+        form = {"info": {"title": title},
+                "items": [{"title": q, "questionItem": {"question": {"questionId": qids[q]}}} for q in questions]}
+
+        def answer_of(q, value):
+            if value in self.files:
+                return {"questionId": qids[q], "fileUploadAnswers": {"answers": [{"fileId": value}]}}
+            return {"questionId": qids[q], "textAnswers": {"answers": [{"value": value}]}}
+        responses = [{"responseId": f"{form_id}-r{i}", "lastSubmittedTime": f"2026-10-19T12:00:{i % 60:02d}Z",
+                      "answers": {qids[q]: answer_of(q, v) for q, v in answer.items()}}
+                     for i, answer in enumerate(answers)]
+        self.forms[form_id] = (form, responses)
+        return qids
+
+    def add_file(self, file_id, data, mime_type):
+        self.files[file_id] = (data, mime_type)
+
+    def respond(self, request):
+        url = urlparse(request.url)
+        parts = url.path.strip("/").split("/")
+        if url.hostname == "forms.googleapis.com" and parts[:2] == ["v1", "forms"] and parts[2] in self.forms:
+            form, responses = self.forms[parts[2]]
+            return self._json(request, {"responses": responses} if parts[3:] == ["responses"] else form)
+        if url.hostname == "www.googleapis.com" and parts[:3] == ["drive", "v3", "files"] and parts[3] in self.files:
+            data, mime = self.files[parts[3]]
+            if parse_qs(url.query).get("alt") == ["media"]:
+                return self._response(request, 200, data, mime)
+            return self._json(request, {"id": parts[3], "name": parts[3], "mimeType": mime})
+        return self._json(request, {"error": {"code": 404, "message": "Requested entity was not found."}}, 404)
+
+    @staticmethod
+    def _json(request, body, status=200):
+        return FakeGoogle._response(request, status, json.dumps(body).encode(), "application/json")
+
+    @staticmethod
+    def _response(request, status, body, content_type):
+        response = requests.Response()
+        response.status_code = status
+        response._content = body
+        response.headers["Content-Type"] = content_type
+        response.headers["Content-Length"] = str(len(body))
+        response.url = request.url
+        response.request = request
+        return response
+
+
+_google = FakeGoogle()
+_send = requests.adapters.HTTPAdapter.send
+
+
+def _routed_send(self, request, *args, **kwargs):
+    if (urlparse(request.url).hostname or "").endswith("googleapis.com"):
+        return _google.respond(request)
+    return _send(self, request, *args, **kwargs)
+
+
+# Route Google before the instrumentation wraps send, so calls to the fake are counted too
+requests.adapters.HTTPAdapter.send = _routed_send
+install_http_instrumentation()
+
+
+@pytest.fixture(scope="session", autouse=True)
+def standin():
+    """One in-memory Supabase for the run; each environment lives under its own path prefix."""
+    os.environ["SUPABASE_STANDIN_URL"] = supabase_standin.start_standin()
+    yield
+    supabase_standin.stop_standin()
+
+
+@pytest.fixture(autouse=True)
+def clean_state(tmp_path, monkeypatch):
+    """Empty stand-in and caches per test; dead letters go to a temp dir, Slack is never called and declared budgets are off."""
+    import member_cache
+    import checkin_service
+    import leaderboard_service
+    import dead_letter_service
+    import point_service
+
+    supabase_standin.reset()
+    _google.reset()
+    member_cache.clear_members()
+    for env in ("production", "staging"):
+        leaderboard_service.invalidate_totals(env)
+    monkeypatch.setattr(checkin_service, "_indexes", {})
+    monkeypatch.setattr(dead_letter_service, "DEAD_LETTER_DIR", tmp_path / "dead_letters")
+    monkeypatch.setattr(point_service, "send_points_notification", lambda *args, **kwargs: None)
+    monkeypatch.setattr(point_service, "queue_points_notification", lambda *args, **kwargs: None)
+    # Tests open their own budgets; declared ones would record counts on theirs
+    monkeypatch.delenv("ROUND_TRIP_BUDGETS", raising=False)
+    yield
+
+
+@pytest.fixture
+def google():
+    return _google
+
+
+@pytest.fixture
+def credentials():
+    return SimpleNamespace(token="test-token")
@@ -0,0 +1,35 @@
+import pytest
+
+from budget_service import (RoundTripBudgetExceeded, budget_counts, call_budget, note_call,
+                            recent_overruns, round_trip_budget)
+
+
+def test_limit_resolved_from_counts_recorded_in_the_block():
+    with pytest.raises(RoundTripBudgetExceeded, match=r"made 3 supabase calls \(budget 2\)"):
+        with round_trip_budget("import", supabase=lambda args: args["rows"]):
+            budget_counts(rows=2)
+            for _ in range(3):
+                note_call("supabase_postgrest")
+
+
+def test_report_mode_records_the_overrun_instead_of_raising():
+    with round_trip_budget("import", on_exceed="report", google=1):
+        note_call("google_forms")
+        note_call("google_drive")
+    assert recent_overruns()[0]["operation"] == "import"
+
+
+def test_declared_budget_sees_arguments_and_counts(monkeypatch):
+    monkeypatch.setenv("ROUND_TRIP_BUDGETS", "on")
+
+    @call_budget(supabase=lambda args: args["chunks"] + args.get("extra", 0))
+    def write(chunks, calls):
+        budget_counts(extra=1)
+        for _ in range(calls):
+            note_call("supabase_postgrest")
+
+    before = len(recent_overruns())
+    write(2, 3)
+    assert len(recent_overruns()) == before
+    write(2, 4)
+    assert "made 4 supabase calls (budget 3)" in recent_overruns()[0]["report"]
@@ -0,0 +1,25 @@
+from checkin_service import search_members
+from supabase_clients import get_client
+
+
+def _seed():
+    get_client("staging").table("members").insert([
+        {"netid": "ac123", "first_name": "Anna", "last_name": "Christopherson"},
+        {"netid": "bj456", "first_name": "Ben", "last_name": "Jones"},
+    ]).execute()
+
+
+def test_search_by_name_prefix():
+    _seed()
+    assert search_members("ann chris", env="staging") == [{"netid": "ac123", "name": "Anna Christopherson"}]
+
+
+def test_search_falls_back_to_trigrams_when_prefix_hits_no_full_token():
+    _seed()
+    # "christophers" (the indexed prefix) matches, but no name starts with the whole word
+    assert search_members("Christophersen", env="staging") == [{"netid": "ac123", "name": "Anna Christopherson"}]
+
+
+def test_search_falls_back_to_trigrams_for_typos():
+    _seed()
+    assert search_members("Jnoes Ben", env="staging")[0]["netid"] == "bj456"
@@ -0,0 +1,34 @@
+import leaderboard_service
+from leaderboard_service import get_member_total
+from point_service import add_points_batch, current_semester
+
+
+def _award(netid, points):
+    add_points_batch([{"line": 1, "netid": netid, "points": points, "reason": "Info Session", "error": None}],
+                     env="staging")
+
+
+def test_award_during_first_load_is_not_lost(monkeypatch):
+    _award("ab123", 5)
+    load = leaderboard_service._load
+    calls = []
+
+    def load_then_award(env):
+        loaded = load(env)
+        if not calls:
+            _award("ab123", 3)  # lands after the scan read ab123's total
+        calls.append(env)
+        return loaded
+    monkeypatch.setattr(leaderboard_service, "_load", load_then_award)
+
+    assert get_member_total("ab123", current_semester(), env="staging")["total"] == 8
+    assert len(calls) == 2
+    assert get_member_total("ab123", current_semester(), env="staging")["total"] == 8
+    assert len(calls) == 2  # the second load was cached
+
+
+def test_awards_after_load_update_the_cache():
+    _award("ab123", 5)
+    assert get_member_total("ab123", current_semester(), env="staging")["total"] == 5
+    _award("ab123", 2)
+    assert get_member_total("ab123", current_semester(), env="staging")["total"] == 7
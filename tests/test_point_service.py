@@ -0,0 +1,171 @@
+import io
+
+import pytest
+
+from budget_service import BUDGETS, RoundTripBudgetExceeded, round_trip_budget
+from dead_letter_service import list_failures
+from point_service import retrieve_event_responses, retrieve_eboard_responses, retrieve_ta_responses
+from supabase_clients import get_client
+
+def _declared_budget(fn, **args):
+    """Check a call against the budget fn declares, raising on overrun."""
+    label = f"{fn.__module__}.{fn.__name__}"
+    return round_trip_budget(label, on_exceed="raise", args=args, **BUDGETS[label])
+
+
+def _add_members(env, *netids):
+    get_client(env).table("members").insert(
+        [{"netid": n, "first_name": n, "last_name": "", "email": f"{n}@cornell.edu"} for n in netids]).execute()
+
+
+EVENT_QUESTIONS = ["Name", "NetID"]
+
+
+def _attendee(netid):
+    return {"Name": f"Member {netid}", "NetID": netid}
+
+
+def test_event_import_stays_within_its_supabase_budget(google, credentials):
+    for env in ("production", "staging"):
+        _add_members(env, "ab123")
+    google.add_form("event-form", "Game Night", EVENT_QUESTIONS, [_attendee("ab123"), _attendee("cd456")])
+
+    with _declared_budget(retrieve_event_responses, env="production") as counter:
+        retrieve_event_responses("event-form", 5, credentials, env="production")
+
+    # Per environment: the directory page, two inserts, and a lookup and create for cd456
+    assert counter.used("supabase") == 10
+    assert counter.limits == {"google_forms": 2, "supabase": 12}
+    points = get_client("staging").table("points_tracking").select("points").execute().data
+    assert [p["points"] for p in points] == [5, 5]
+
+
+def test_event_import_over_budget_when_lookups_skip_the_cache(google, credentials, monkeypatch):
+    import member_cache
+    _add_members("staging", "ab123", "ef789", "gh012")
+    google.add_form("event-form", "Game Night", EVENT_QUESTIONS,
+                    [_attendee(n) for n in ("ab123", "ef789", "gh012", "cd456")])
+
+    def select_every_time(netid, env="production", client=None):
+        rows = (client or get_client(env)).table("members").select("id, netid, email, role") \
+            .eq("netid", netid.lower()).execute().data
+        return rows[0] if rows else None
+    monkeypatch.setattr(member_cache, "get_member", select_every_time)
+
+    with pytest.raises(RoundTripBudgetExceeded, match=r"made 10 supabase calls \(budget 8\)"):
+        with _declared_budget(retrieve_event_responses, env="staging"):
+            retrieve_event_responses("event-form", 5, credentials, env="staging")
+
+
+TA_QUESTIONS = ["Full name", "NetID", "Graduation year", "Course", "Office hours", "Review sessions"]
+
+
+def _ta(name, netid):
+    return {"Full name": name, "NetID": netid, "Graduation year": "2027", "Course": "CS 1110",
+            "Office hours": "Mon 3pm", "Review sessions": "Before prelims"}
+
+
+def test_ta_import_dead_letters_a_malformed_response(google, credentials):
+    malformed = _ta("", "cd456")
+    del malformed["Full name"]  # no name answer: building the row fails
+    google.add_form("ta-form", "TA Directory", TA_QUESTIONS, [_ta("Ada Lovelace", "ab123"), malformed])
+
+    summary = retrieve_ta_responses("ta-form", credentials, env="staging")
+
+    assert summary == {"new": 1, "changed": 0, "unchanged": 0}
+    members = get_client("staging").table("members").select("netid").execute().data
+    assert [m["netid"] for m in members] == ["ab123"]
+    failures = list_failures("staging", kind="ta_form")
+    assert [f["key"] for f in failures] == ["ta-form-r1"]
+    assert failures[0]["payload"]["answers"]
+
+
+def test_ta_import_dead_letters_every_row_when_the_upsert_fails(google, credentials, monkeypatch):
+    import point_service
+    google.add_form("ta-form", "TA Directory", TA_QUESTIONS, [_ta("Ada Lovelace", "ab123")])
+
+    def fail(*args, **kwargs):
+        raise Exception("database unavailable")
+    monkeypatch.setattr(point_service, "upsert_roster_changes", fail)
+
+    with pytest.raises(Exception, match="database unavailable"):
+        retrieve_ta_responses("ta-form", credentials, env="staging")
+    assert [f["key"] for f in list_failures("staging", kind="ta_form")] == ["ta-form-r0"]
+
+
+def test_ta_import_stays_within_its_supabase_budget(google, credentials):
+    google.add_form("ta-form", "TA Directory", TA_QUESTIONS,
+                    [_ta("Ada Lovelace", "ab123"), _ta("Charles Babbage", "cd456"), _ta("Grace Hopper", "ef789")])
+
+    with _declared_budget(retrieve_ta_responses, env="staging") as counter:
+        retrieve_ta_responses("ta-form", credentials, env="staging")
+
+    assert counter.used("supabase") == 2  # stored hashes and one upsert
+    assert counter.limits == {"google_forms": 2, "supabase": 2}
+
+
+EBOARD_QUESTIONS = ["Full name", "NetID", "Graduation year", "Position", "Headshot", "Short bio"]
+
+
+def _jpeg(color):
+    from PIL import Image
+    out = io.BytesIO()
+    Image.new("RGB", (40, 30), color).save(out, format="JPEG")
+    return out.getvalue()
+
+
+def _eboard(name, netid, bio, headshot):
+    return {"Full name": name, "NetID": netid, "Graduation year": "2027", "Position": "President",
+            "Headshot": headshot, "Short bio": bio}
+
+
+def test_eboard_form_import_skips_unchanged_responses_before_headshots(google, credentials):
+    google.add_file("photo-ada", _jpeg("red"), "image/jpeg")
+    google.add_file("photo-cd", _jpeg("blue"), "image/jpeg")
+    answers = [_eboard("Ada Lovelace", "ab123", "Engines", "photo-ada"),
+               _eboard("Charles Babbage", "cd456", "Difference", "photo-cd")]
+    google.add_form("eboard-form", "Eboard", EBOARD_QUESTIONS, answers)
+    assert retrieve_eboard_responses("eboard-form", credentials, env="staging") == {
+        "new": 2, "changed": 0, "unchanged": 0}
+
+    with round_trip_budget("unchanged re-import") as unchanged:
+        summary = retrieve_eboard_responses("eboard-form", credentials, env="staging")
+    assert summary == {"new": 0, "changed": 0, "unchanged": 2}
+    assert unchanged.used("google_drive") == 0
+    assert unchanged.used("supabase_storage") == 0
+
+    answers[1] = _eboard("Charles Babbage", "cd456", "Analytical", "photo-cd")
+    google.add_form("eboard-form", "Eboard", EBOARD_QUESTIONS, answers)
+    with round_trip_budget("one changed response") as changed:
+        summary = retrieve_eboard_responses("eboard-form", credentials, env="staging")
+    assert summary == {"new": 0, "changed": 1, "unchanged": 1}
+    assert changed.used("google_drive") == 2  # metadata and download for the one changed response
+    bios = {m["netid"]: m["bio"] for m in get_client("staging").table("members").select("netid, bio").execute().data}
+    assert bios == {"ab123": "Engines", "cd456": "Analytical"}
+
+
+def test_eboard_form_import_uses_each_members_latest_response(google, credentials):
+    google.add_file("photo-ada", _jpeg("red"), "image/jpeg")
+    answers = [_eboard("Ada Lovelace", "ab123", "Old bio", "photo-ada"),
+               _eboard("Ada Lovelace", "ab123", "New bio", "photo-ada")]
+    google.add_form("eboard-form", "Eboard", EBOARD_QUESTIONS, answers)
+    retrieve_eboard_responses("eboard-form", credentials, env="staging")
+    retrieve_eboard_responses("eboard-form", credentials, env="staging")
+    rows = get_client("staging").table("members").select("bio").eq("netid", "ab123").execute().data
+    assert rows == [{"bio": "New bio"}]
+
+
+def test_eboard_import_stays_within_its_budget(google, credentials):
+    google.add_file("photo-ada", _jpeg("red"), "image/jpeg")
+    google.add_file("photo-cd", _jpeg("blue"), "image/jpeg")
+    google.add_form("eboard-form", "Eboard", EBOARD_QUESTIONS,
+                    [_eboard("Ada Lovelace", "ab123", "Engines", "photo-ada"),
+                     _eboard("Charles Babbage", "cd456", "Difference", "photo-cd")])
+
+    with _declared_budget(retrieve_eboard_responses, env="staging") as counter:
+        retrieve_eboard_responses("eboard-form", credentials, env="staging")
+
+    # Hashes, two uploads, the roster's hashes and upsert, then the cleanup's member page and listing
+    assert counter.used("supabase") == 7
+    assert counter.used("google_drive") == 4
+    assert counter.limits == {"google_forms": 2, "google_drive": 8, "supabase": 9}
@@ -0,0 +1,24 @@
+from supabase_clients import get_client
+from point_service import upsert_roster_changes
+
+
+def _upsert(sb, role, hashes):
+    return sb.rpc("upsert_members_with_role", {
+        "p_members": [{"netid": "ab123", "first_name": "Ada", "profile_hashes": hashes}], "p_role": role,
+    }).execute().data
+
+
+def test_upsert_members_with_role_merges_profile_hashes():
+    sb = get_client("staging")
+    _upsert(sb, "ta", {"ta": "t1"})
+    rows = _upsert(sb, "eboard", {"eboard": "e1"})
+    assert rows[0]["profile_hashes"] == {"ta": "t1", "eboard": "e1"}
+    assert rows[0]["role"] == ["ta", "eboard"]
+
+
+def test_eboard_import_keeps_ta_rows_unchanged():
+    ta = {"netid": "ab123", "first_name": "Ada", "last_name": "Lovelace", "course": "CS 1110"}
+    eboard = {"netid": "ab123", "first_name": "Ada", "last_name": "Lovelace", "position": "President"}
+    upsert_roster_changes([ta], "ta", "staging")
+    upsert_roster_changes([eboard], "eboard", "staging")
+    assert upsert_roster_changes([ta], "ta", "staging") == {"new": 0, "changed": 0, "unchanged": 1}
@@ -0,0 +1,41 @@
+from supabase_clients import get_client
+from sync_service import push_to_production, verify_environments
+from snapshot_service import export_snapshot, restore_snapshot
+
+
+def _seed(env):
+    sb = get_client(env)
+    # One insert each, so every row is written with a different set of columns
+    members = [sb.table("members").insert(m).execute().data[0] for m in (
+        {"netid": "ab123", "first_name": "Ada", "last_name": "Lovelace", "role": ["eboard"], "position": "President"},
+        {"netid": "cd456", "first_name": "Charles", "last_name": "Babbage", "course": "CS 1110"},
+        {"netid": "ef789", "first_name": "Grace"},
+    )]
+    sb.table("events").insert({"name": "Info Session", "date": "2026-09-01T00:00:00+00:00",
+                               "semester": "FA26"}).execute()
+    sb.table("points_tracking").insert([
+        {"member_id": m["id"], "points": 5, "semester": "FA26", "reason": "Info Session"} for m in members
+    ]).execute()
+    sb.table("points_history").insert({"member_id": members[0]["id"], "semester": "SP26", "total": 12,
+                                       "entries": 3, "archive_key": "points/SP26-abc.ndjson.gz"}).execute()
+    sb.storage.from_("archives").upload("points/SP26-abc.ndjson.gz", b"archived rows",
+                                        {"content-type": "application/gzip"})
+
+
+def _assert_match(results):
+    assert results["errors"] == []
+    assert results["match"], {t: r for t, r in results["tables"].items() if r["mismatched_ranges"]}
+
+
+def test_verify_matches_right_after_push():
+    _seed("staging")
+    assert push_to_production()["errors"] == []
+    _assert_match(verify_environments())
+
+
+def test_verify_matches_right_after_restore(tmp_path):
+    _seed("staging")
+    snapshot = export_snapshot("staging", path=tmp_path / "staging.zip")
+    assert snapshot["errors"] == []
+    restore_snapshot(snapshot["path"], env="production")
+    _assert_match(verify_environments())
@@ -1,7 +1,8 @@
-from flask import Flask, session, redirect, request, send_file, jsonify
+from flask import Flask, session, redirect, request, send_file, jsonify, g, Response
 from google_auth_oauthlib.flow import Flow
 from google.oauth2.credentials import Credentials
 from dotenv import load_dotenv
+import hashlib
 import os
 import re
 import secrets
@@ -15,12 +16,49 @@ os.environ['OAUTHLIB_INSECURE_TRANSPORT'] = '1'  # Allows HTTP (instead of HTTPS
 backend_dir = Path(__file__).parent.parent / 'backend'
 sys.path.append(str(backend_dir))
 
-from point_service import add_or_update_points, retrieve_event_responses, retrieve_eboard_responses, retrieve_eboard_from_sheet, retrieve_ta_responses, add_event
-from sync_service import push_to_production, pull_from_production
+from point_service import add_or_update_points, parse_points_csv, add_points_batch, retrieve_event_responses, retrieve_event_responses_batch, retrieve_eboard_responses, retrieve_eboard_from_sheet, retrieve_ta_responses, add_event, current_semester, retry_failed_responses
+from dead_letter_service import list_failures
+from live_service import start_live_event, stop_live_event, list_live_events
+from checkin_service import start_kiosk, close_kiosk, list_kiosks, get_kiosk, search_members, check_in
+from sync_service import push_to_production, pull_from_production, verify_environments
+from snapshot_service import export_snapshot, restore_snapshot, list_snapshots
+from leaderboard_service import get_leaderboard, get_member_total, start_reconciliation_job
+from event_service import parse_events_ics, read_events_sheet, add_events_bulk
+from publish_service import publish_site
+from archive_service import close_semester, reopen_semester, list_archived_semesters
+from job_service import submit_job, list_jobs, get_job
+from metrics_service import (install_http_instrumentation, start_request, end_request, metrics_text,
+                             metrics_snapshot, list_profiles, PROFILE_DIR)
+from trace_service import start_span, finish_span, list_traces, get_trace, format_trace
 
 app = Flask(__name__)
 app.secret_key = os.getenv('FLASK_SECRET_KEY')
 
+# Time every outbound call (Supabase, Google, Slack) and attribute it to the request that made it
+install_http_instrumentation()
+
+@app.before_request
+def _start_request_metrics():
+    g.metrics = start_request()
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    g.span = start_span(f"route {request.method} {route}", env=session.get('env', 'staging'))
+
+@app.after_request
+def _note_response_status(response):
+    g.status = response.status_code
+    return response
+
+@app.teardown_request
+def _record_request_metrics(exc):
+    if 'metrics' not in g:
+        return
+    if g.get('span'):
+        g.span[0].set(status=g.get('status', 500))
+    finish_span(g.get('span'), exc)
+    # Unhandled exceptions skip after_request, so anything without a status was a 500
+    route = request.url_rule.rule if request.url_rule else 'unmatched'
+    end_request(g.metrics, request.method, route, g.get('status', 500))
+
 def extract_form_id(input_str):
     """Extract Google Form ID from a URL or return the raw ID."""
     input_str = input_str.strip()
@@ -45,6 +83,30 @@ def extract_sheet_id(input_str):
         raise ValueError("Could not extract sheet ID from this URL. Please paste the sheet link or just the sheet ID.")
     return input_str
 
+def _roster_summary_text(summary):
+    """Format an upsert_roster_changes summary for the dashboard message."""
+    if not summary:
+        return ""
+    return f" New: {summary['new']}, changed: {summary['changed']}, unchanged: {summary['unchanged']}."
+
+def _import_envs(env):
+    """Environments an import writes: production imports mirror points into staging."""
+    return ["production", "staging"] if env == "production" else [env]
+
+
+def _job_message(job, created):
+    """Dashboard message for a submitted background job."""
+    if created:
+        return f"Started: {job['label']}. Progress is shown under Jobs."
+    return f"Already running: {job['label']}. Progress is shown under Jobs."
+
+def _publish_text(env):
+    """Refresh the public site data for env and format the outcome for the dashboard message."""
+    results = publish_site(env)
+    if results['errors']:
+        return f" Site data not published: {results['errors']}"
+    return f" Site data: {len(results['uploaded'])} updated."
+
 SCOPES = [
     'https://www.googleapis.com/auth/forms.responses.readonly',
     'https://www.googleapis.com/auth/forms.body.readonly',
@@ -140,6 +202,41 @@ def update_points():
         session['message'] = f"Error: {str(e)}"
     return redirect('/')
 
+@app.route('/update_points_batch', methods=['POST'])
+def update_points_batch():
+    if 'credentials' not in session:
+        return redirect('/login')
+
+    # Accept either an uploaded .csv file or pasted CSV text
+    upload = request.files.get('csv_file')
+    if upload and upload.filename:
+        csv_text = upload.read().decode('utf-8-sig', errors='replace')
+    else:
+        csv_text = request.form.get('csv_text', '')
+    default_reason = request.form.get('reason', '').strip() or None
+    if not csv_text.strip():
+        session['message'] = "Error: Paste CSV rows or choose a CSV file."
+        return redirect('/')
+
+    env = session.get('env', 'staging')
+
+    def _process():
+        rows = add_points_batch(parse_points_csv(csv_text, default_reason), env=env)
+        counts = {}
+        for row in rows:
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        summary = ", ".join(f"{n} {status}" for status, n in counts.items())
+        problems = [f"line {r['line']} ({r['netid'] or '?'}): {r['error'] or r['status']}"
+                    for r in rows if r['status'] != 'added']
+        problem_text = f" Issues: {'; '.join(problems)}" if problems else ""
+        return f"Batch points complete! {summary}.{problem_text}"
+
+    csv_hash = hashlib.sha256(csv_text.encode()).hexdigest()
+    job, created = submit_job("points_batch", env, {'csv': csv_hash, 'reason': default_reason},
+                              "Add batch points", _process, envs=_import_envs(env))
+    session['message'] = _job_message(job, created)
+    return redirect('/')
+
 @app.route('/process_form/<form_type>', methods=['POST'])
 def process_form(form_type):
     # If user is not logged in, redirect to login page 
@@ -164,19 +261,161 @@ def process_form(form_type):
         return redirect('/login')
 
     env = session.get('env', 'staging')
-    try:
+
+    def _process():
         # Retrieve and process the form responses
+        summary = None
         if form_type == 'eboard':
-            retrieve_eboard_responses(form_id, credentials, env=env)
+            summary = retrieve_eboard_responses(form_id, credentials, env=env)
         elif form_type == 'ta':
-            retrieve_ta_responses(form_id, credentials, env=env)
+            summary = retrieve_ta_responses(form_id, credentials, env=env)
         else:
             retrieve_event_responses(form_id, points_value, credentials, env=env)
-        session['message'] = "Form responses processed successfully!"
+        message = "Form responses processed successfully!" + _roster_summary_text(summary)
+        if summary is not None:
+            message += _publish_text(env)
+        return message
+
+    job, created = submit_job(f"form_{form_type}", env, {'form_id': form_id, 'points': points_value},
+                              f"Import {form_type} form {form_id}", _process, envs=_import_envs(env))
+    session['message'] = _job_message(job, created)
+    return redirect('/')
+    
+@app.route('/process_forms', methods=['POST'])
+def process_forms():
+    if 'credentials' not in session:
+        return redirect('/login')
+    # One form per line: "<form link or ID>, <points>"
+    forms = []
+    try:
+        for line_no, line in enumerate(request.form['forms'].strip().splitlines(), start=1):
+            if not line.strip():
+                continue
+            link, _, points = line.rpartition(',')
+            if not link or not points.strip().lstrip('-').isdigit():
+                raise ValueError(f"Line {line_no} should be a form link or ID, a comma, then the points.")
+            forms.append((extract_form_id(link), int(points)))
+    except ValueError as e:
+        session['message'] = f"Error: {str(e)}"
+        return redirect('/')
+    if not forms:
+        session['message'] = "Error: Paste at least one form link and point value."
+        return redirect('/')
+
+    credentials = get_credentials()
+    if not credentials:
+        return redirect('/login')
+
+    env = session.get('env', 'staging')
+
+    def _process():
+        report = retrieve_event_responses_batch(forms, credentials, env=env)
+        per_form = "; ".join(
+            f"{f['title']}: {f['added']} added" + (f", {f['failed']} failed" if f['failed'] else "")
+            + (f" (error: {f['error']})" if f['error'] else "")
+            for f in report['forms'])
+        return f"Batch form import complete! Added: {report['added']}, failed: {report['failed']}. {per_form}"
+
+    job, created = submit_job("forms_batch", env, sorted(forms), f"Import {len(forms)} event forms", _process,
+                              envs=_import_envs(env))
+    session['message'] = _job_message(job, created)
+    return redirect('/')
+
+@app.route('/live_event/start', methods=['POST'])
+def live_event_start():
+    if 'credentials' not in session:
+        return redirect('/login')
+    try:
+        form_id = extract_form_id(request.form['form_id'])
+        points_value = int(request.form['points_value'])
+    except ValueError as e:
+        session['message'] = f"Error: {str(e)}"
+        return redirect('/')
+
+    credentials = get_credentials()
+    if not credentials:
+        return redirect('/login')
+
+    env = session.get('env', 'staging')
+    try:
+        live = start_live_event(form_id, points_value, credentials, env=env)
+        session['message'] = f"Live sign-in started for {live['title']}! Points are awarded every few seconds until the form closes."
     except Exception as e:
         session['message'] = f"Error: {str(e)}"
     return redirect('/')
-    
+
+@app.route('/live_event/stop', methods=['POST'])
+def live_event_stop():
+    if 'credentials' not in session:
+        return redirect('/login')
+    env = session.get('env', 'staging')
+    if stop_live_event(request.form['form_id'], env=env):
+        session['message'] = "Live sign-in stopping after its current poll."
+    else:
+        session['message'] = "Error: No live sign-in is running for that form."
+    return redirect('/')
+
+@app.route('/live_events')
+def live_events():
+    if 'credentials' not in session:
+        return jsonify({'events': []})
+    return jsonify({'events': list_live_events(session.get('env', 'staging'))})
+
+@app.route('/kiosk/start', methods=['POST'])
+def kiosk_start():
+    if 'credentials' not in session:
+        return redirect('/login')
+    env = session.get('env', 'staging')
+    try:
+        kiosk = start_kiosk(request.form['title'].strip(), int(request.form['points_value']), env=env)
+        session['message'] = f"Kiosk open for {kiosk['title']}! Open {request.host_url}checkin?kiosk={kiosk['token']} on each tablet."
+    except Exception as e:
+        session['message'] = f"Error: {str(e)}"
+    return redirect('/')
+
+@app.route('/kiosk/close', methods=['POST'])
+def kiosk_close():
+    if 'credentials' not in session:
+        return redirect('/login')
+    if close_kiosk(request.form['token']):
+        session['message'] = "Kiosk closed and all check-ins saved."
+    else:
+        session['message'] = "Error: Kiosk not found."
+    return redirect('/')
+
+@app.route('/kiosks')
+def kiosks():
+    if 'credentials' not in session:
+        return jsonify({'kiosks': []})
+    return jsonify({'kiosks': list_kiosks(session.get('env', 'staging'))})
+
+# Tablet-facing check-in routes: the kiosk token stands in for a login
+@app.route('/checkin', methods=['GET', 'POST'])
+def checkin():
+    token = request.values.get('kiosk', '')
+    if not get_kiosk(token):
+        return jsonify({'error': 'This kiosk is closed or the link is wrong.'}), 404
+    if request.method == 'GET':
+        return send_file('checkin.html')
+    data = request.get_json(silent=True) or request.form
+    try:
+        return jsonify(check_in(token, data.get('netid', ''), data.get('name') or None))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/checkin/search')
+def checkin_search():
+    kiosk = get_kiosk(request.args.get('kiosk', ''))
+    if not kiosk:
+        return jsonify({'error': 'This kiosk is closed or the link is wrong.'}), 404
+    query = request.args.get('q', '')
+    if len(query.strip()) < 2:
+        return jsonify({'members': []})
+    try:
+        return jsonify({'members': search_members(query, env=kiosk['env'])})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/process_sheet/eboard', methods=['POST'])
 def process_sheet_eboard():
     if 'credentials' not in session:
@@ -192,11 +431,18 @@ def process_sheet_eboard():
         return redirect('/login')
 
     env = session.get('env', 'staging')
-    try:
-        retrieve_eboard_from_sheet(sheet_id, credentials, env=env)
-        session['message'] = "Sheet responses processed successfully!"
-    except Exception as e:
-        session['message'] = f"Error: {str(e)}"
+    tabs = [t.strip() for t in request.form.get('tabs', '').split(',') if t.strip()] or None
+    force = bool(request.form.get('force'))
+
+    def _process():
+        summary = retrieve_eboard_from_sheet(sheet_id, credentials, env=env, tabs=tabs, force=force)
+        if summary and summary.get('skipped'):
+            return "Sheet unchanged since the last import; nothing to do."
+        return "Sheet responses processed successfully!" + _roster_summary_text(summary) + _publish_text(env)
+
+    job, created = submit_job("sheet_eboard", env, {'sheet_id': sheet_id, 'tabs': tabs, 'force': force},
+                              f"Import eboard sheet {sheet_id}", _process, envs=_import_envs(env))
+    session['message'] = _job_message(job, created)
     return redirect('/')
 
 @app.route('/add_event', methods=['POST'])
@@ -217,12 +463,92 @@ def process_event():
     year = request.form['year']
     env = session.get('env', 'staging')
     try:
-        add_event(name, description, flyer_url, insta, month, day, year, env=env)
-        session['message'] = "Event added successfully!"
+        add_event(name, description, flyer_url, insta, month, day, year, env=env, credentials=credentials)
+        session['message'] = "Event added successfully!" + _publish_text(env)
     except Exception as e:
         session['message'] = f"Error: {str(e)}"
     return redirect('/')
 
+@app.route('/import_events', methods=['POST'])
+def import_events():
+    if 'credentials' not in session:
+        return redirect('/login')
+
+    env = session.get('env', 'staging')
+    upload = request.files.get('ics_file')
+    credentials = get_credentials()
+    try:
+        if upload and upload.filename:
+            ics_text = upload.read().decode('utf-8-sig', errors='replace')
+            source = hashlib.sha256(ics_text.encode()).hexdigest()
+            read_candidates = lambda: parse_events_ics(ics_text)
+        elif request.form.get('sheet_id', '').strip():
+            if not credentials:
+                return redirect('/login')
+            source = extract_sheet_id(request.form['sheet_id'])
+            read_candidates = lambda: read_events_sheet(source, credentials)
+        else:
+            session['message'] = "Error: Paste a Google Sheet link or choose an .ics file."
+            return redirect('/')
+    except ValueError as e:
+        session['message'] = f"Error: {str(e)}"
+        return redirect('/')
+
+    def _process():
+        report = add_events_bulk(read_candidates(), env=env, credentials=credentials)
+        invalid_text = f" Skipped: {'; '.join(report['invalid'])}" if report['invalid'] else ""
+        message = f"Event import complete! Added: {len(report['added'])}, already existed: {len(report['duplicates'])}.{invalid_text}"
+        if report['added']:
+            message += _publish_text(env)
+        return message
+
+    job, created = submit_job("import_events", env, {'source': source}, "Import events", _process)
+    session['message'] = _job_message(job, created)
+    return redirect('/')
+
+@app.route('/failed_responses')
+def failed_responses():
+    if 'credentials' not in session:
+        return jsonify({'failures': []})
+    failures = list_failures(session.get('env', 'staging'))
+    return jsonify({'failures': [{k: f[k] for k in ('id', 'kind', 'source', 'key', 'error', 'attempts', 'last_failed_at')}
+                                 for f in failures]})
+
+@app.route('/retry_failed', methods=['POST'])
+def retry_failed():
+    if 'credentials' not in session:
+        return redirect('/login')
+    credentials = get_credentials()
+    if not credentials:
+        return redirect('/login')
+    env = session.get('env', 'staging')
+
+    def _process():
+        report = retry_failed_responses(credentials, env=env)
+        return f"Retry complete! Retried: {report['retried']}, succeeded: {report['succeeded']}, still failing: {report['failed']}."
+
+    job, created = submit_job("retry_failed", env, None, "Retry failed responses", _process,
+                              envs=_import_envs(env))
+    session['message'] = _job_message(job, created)
+    return redirect('/')
+
+@app.route('/jobs')
+def jobs():
+    if 'credentials' not in session:
+        return jsonify({'jobs': []})
+    env = session.get('env', 'staging')
+    # Syncs are filed under the environment they write to; show them from either side
+    return jsonify({'jobs': [j for j in list_jobs(limit=None) if j['env'] == env or j['kind'] in ('push', 'pull')][:20]})
+
+@app.route('/jobs/<job_id>')
+def job_status(job_id):
+    if 'credentials' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(job)
+
 @app.route('/set_env', methods=['POST'])
 def set_env():
     env = request.form.get('env', 'staging')
@@ -244,30 +570,214 @@ def get_message():
 def push_to_prod():
     if 'credentials' not in session:
         return redirect('/login')
-    try:
+
+    def _sync():
         results = push_to_production()
         error_text = f" Errors: {results['errors']}" if results['errors'] else ""
         skipped = results.get('skipped_headshots', 0)
         deleted = results.get('deleted_headshots', 0)
-        session['message'] = f"Push complete! Members: {results['members']}, Events: {results['events']}, Points: {results['points']}, Headshots: {results['headshots']} synced, {skipped} unchanged, {deleted} removed.{error_text}"
-    except Exception as e:
-        session['message'] = f"Error: {str(e)}"
+        return f"Push complete! Members: {results['members']}, Events: {results['events']}, Points: {results['points']}, Headshots: {results['headshots']} synced, {skipped} unchanged, {deleted} removed, Flyers: {results['flyers']} copied.{error_text}" + _publish_text("production")
+
+    job, created = submit_job("push", "production", None, "Push staging to production", _sync,
+                              envs=["staging", "production"])
+    session['message'] = _job_message(job, created)
     return redirect('/')
 
 @app.route('/pull_from_production', methods=['POST'])
 def pull_from_prod():
     if 'credentials' not in session:
         return redirect('/login')
-    try:
+
+    def _sync():
         results = pull_from_production()
         error_text = f" Errors: {results['errors']}" if results['errors'] else ""
         skipped = results.get('skipped_headshots', 0)
         deleted = results.get('deleted_headshots', 0)
-        session['message'] = f"Pull complete! Members: {results['members']}, Events: {results['events']}, Points: {results['points']}, Headshots: {results['headshots']} synced, {skipped} unchanged, {deleted} removed.{error_text}"
+        return f"Pull complete! Members: {results['members']}, Events: {results['events']}, Points: {results['points']}, Headshots: {results['headshots']} synced, {skipped} unchanged, {deleted} removed, Flyers: {results['flyers']} copied.{error_text}" + _publish_text("staging")
+
+    job, created = submit_job("pull", "staging", None, "Pull production into staging", _sync,
+                              envs=["production", "staging"])
+    session['message'] = _job_message(job, created)
+    return redirect('/')
+
+@app.route('/verify_environments', methods=['POST'])
+def verify_envs():
+    if 'credentials' not in session:
+        return redirect('/login')
+    try:
+        results = verify_environments()
+        error_text = f" Errors: {results['errors']}" if results['errors'] else ""
+        if results['match']:
+            session['message'] = f"Verify complete! Staging and production match.{error_text}"
+        else:
+            drift = []
+            for table, t in results['tables'].items():
+                if t['mismatched_ranges']:
+                    drift.append(f"{table}: {len(t['missing_in_destination'])} only in staging, {len(t['extra_in_destination'])} only in production")
+            h = results['headshots']
+            if h:
+                drift.append(f"headshots: {len(h['missing_in_destination'])} only in staging, {len(h['extra_in_destination'])} only in production, {len(h['changed'])} changed")
+            session['message'] = f"Verify complete! Drift found — {'; '.join(drift)}.{error_text}"
     except Exception as e:
         session['message'] = f"Error: {str(e)}"
     return redirect('/')
 
+@app.route('/snapshots')
+def snapshots():
+    if 'credentials' not in session:
+        return jsonify({'snapshots': []})
+    return jsonify({'snapshots': list_snapshots()})
+
+@app.route('/export_snapshot', methods=['POST'])
+def export_snap():
+    if 'credentials' not in session:
+        return redirect('/login')
+    env = session.get('env', 'staging')
+    try:
+        results = export_snapshot(env)
+        error_text = f" Errors: {results['errors']}" if results['errors'] else ""
+        session['message'] = f"Snapshot saved to {results['path']}! Members: {results['members']}, Events: {results['events']}, Points: {results['points']}, Headshots: {results['headshots']}, Flyers: {results['flyers']}.{error_text}"
+    except Exception as e:
+        session['message'] = f"Error: {str(e)}"
+    return redirect('/')
+
+@app.route('/restore_snapshot', methods=['POST'])
+def restore_snap():
+    if 'credentials' not in session:
+        return redirect('/login')
+    env = session.get('env', 'staging')
+    name = request.form['snapshot']
+    if name not in list_snapshots():
+        session['message'] = f"Error: Snapshot {name} not found."
+        return redirect('/')
+
+    def _restore():
+        results = restore_snapshot(name, env=env)
+        error_text = f" Errors: {results['errors']}" if results['errors'] else ""
+        return f"Restore into {env} complete! Members: {results['members']}, Events: {results['events']}, Points: {results['points']}, Headshots: {results['headshots']}, Flyers: {results['flyers']}.{error_text}" + _publish_text(env)
+
+    job, created = submit_job("restore", env, {'snapshot': name}, f"Restore {name} into {env}", _restore)
+    session['message'] = _job_message(job, created)
+    return redirect('/')
+
+@app.route('/archived_semesters')
+def archived_semesters():
+    if 'credentials' not in session:
+        return jsonify({'semesters': []})
+    try:
+        return jsonify({'semesters': list_archived_semesters(session.get('env', 'staging'))})
+    except Exception as e:
+        return jsonify({'semesters': [], 'error': str(e)})
+
+@app.route('/close_semester', methods=['POST'])
+def close_sem():
+    if 'credentials' not in session:
+        return redirect('/login')
+    env = session.get('env', 'staging')
+    semester = request.form['semester'].strip().lower()
+
+    def _close():
+        results = close_semester(semester, env=env)
+        if results['errors']:
+            raise Exception('; '.join(results['errors']))
+        return f"Closed {semester} in {env}! Archived {results['rows']} points rows for {results['members']} members to {results['archive']}."
+
+    job, created = submit_job("close_semester", env, {'semester': semester}, f"Close {semester}", _close)
+    session['message'] = _job_message(job, created)
+    return redirect('/')
+
+@app.route('/reopen_semester', methods=['POST'])
+def reopen_sem():
+    if 'credentials' not in session:
+        return redirect('/login')
+    env = session.get('env', 'staging')
+    semester = request.form['semester']
+
+    def _reopen():
+        results = reopen_semester(semester, env=env)
+        error_text = f" Errors: {results['errors']}" if results['errors'] else ""
+        return f"Reopened {semester} in {env}! Restored {results['rows']} points rows.{error_text}"
+
+    job, created = submit_job("reopen_semester", env, {'semester': semester}, f"Reopen {semester}", _reopen)
+    session['message'] = _job_message(job, created)
+    return redirect('/')
+
+@app.route('/publish_site', methods=['POST'])
+def publish():
+    if 'credentials' not in session:
+        return redirect('/login')
+    env = session.get('env', 'staging')
+    try:
+        results = publish_site(env)
+        error_text = f" Errors: {results['errors']}" if results['errors'] else ""
+        session['message'] = f"Publish to {env} complete! Updated: {len(results['uploaded'])}, unchanged: {len(results['unchanged'])}.{error_text}"
+    except Exception as e:
+        session['message'] = f"Error: {str(e)}"
+    return redirect('/')
+
+@app.route('/leaderboard')
+def leaderboard():
+    if 'credentials' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    env = session.get('env', 'staging')
+    semester = request.args.get('semester') or current_semester()
+    limit = max(1, min(request.args.get('limit', 10, type=int), 500))
+    try:
+        return jsonify({'semester': semester, 'leaders': get_leaderboard(semester, limit, env=env)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/leaderboard/<netid>')
+def leaderboard_member(netid):
+    if 'credentials' not in session:
+        return jsonify({'error': 'Not logged in'}), 401
+    env = session.get('env', 'staging')
+    semester = request.args.get('semester') or current_semester()
+    try:
+        return jsonify(get_member_total(netid, semester, env=env))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _metrics_allowed():
+    # Scrapers send METRICS_TOKEN as a bearer token; otherwise a dashboard login is required
+    token = os.getenv('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') == f'Bearer {token}':
+        return True
+    return 'credentials' in session
+
+@app.route('/metrics')
+def metrics():
+    if not _metrics_allowed():
+        return jsonify({'error': 'Not logged in'}), 401
+    if request.args.get('format') == 'json':
+        return jsonify({**metrics_snapshot(), 'profiles': list_profiles()})
+    return Response(metrics_text(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/metrics/profiles/<name>')
+def metrics_profile(name):
+    if not _metrics_allowed():
+        return jsonify({'error': 'Not logged in'}), 401
+    if name not in list_profiles():
+        return jsonify({'error': 'Profile not found'}), 404
+    return send_file(PROFILE_DIR / name, mimetype='text/plain', as_attachment=True)
+
+@app.route('/traces')
+def traces():
+    if not _metrics_allowed():
+        return jsonify({'error': 'Not logged in'}), 401
+    return jsonify({'traces': list_traces()})
+
+@app.route('/traces/<trace_id>')
+def trace_detail(trace_id):
+    if not _metrics_allowed():
+        return jsonify({'error': 'Not logged in'}), 401
+    trace = get_trace(trace_id)
+    if not trace:
+        return jsonify({'error': 'Trace not found (it may have been faster than TRACE_MIN_MS)'}), 404
+    if request.args.get('format') == 'json':
+        return jsonify(trace)
+    return Response(format_trace(trace), mimetype='text/plain')
+
 @app.route('/logout')
 def logout():
     # Clear the session
@@ -276,5 +786,7 @@ def logout():
     return redirect('/')
 
 if __name__ == '__main__':
+    # Periodically rebuild points totals to catch drift the trigger can't see
+    start_reconciliation_job()
     # Run the app on localhost:8080
     app.run('localhost',8080,debug=True)
\ No newline at end of file